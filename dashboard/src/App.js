@@ -107,9 +107,15 @@ function Navbar({ toggleTheme, mode }) {
   const secondaryRoutes = allRoutes.slice(5);
 
   useEffect(() => {
+    const token = localStorage.getItem('adminToken');
+    if (!token) return undefined;
+
     const ws = new WebSocket(
-      'ws://localhost/api/v1/transactions/ws/transactions',
+      `ws://localhost/api/v1/transactions/ws/transactions?token=${encodeURIComponent(token)}`,
     );
+    ws.onopen = () => {
+      ws.send(JSON.stringify({ action: 'subscribe', topics: ['admin:pending'] }));
+    };
     ws.onmessage = (event) => {
       const data = JSON.parse(event.data);
       if (data.type === 'NEW_TRANSACTION')
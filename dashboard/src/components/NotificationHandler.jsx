@@ -15,10 +15,18 @@ const NotificationHandler = () => {
   const [notificationType, setNotificationType] = useState('');
 
   useEffect(() => {
+    const token = localStorage.getItem('adminToken');
+    if (!token) return undefined;
+
     const ws = new WebSocket(
-      `ws://localhost/api/v1/transactions/ws/transactions`,
+      `ws://localhost/api/v1/transactions/ws/transactions?token=${encodeURIComponent(token)}`,
     );
 
+    // Le serveur n'envoie que les événements des sujets auxquels on est abonné
+    ws.onopen = () => {
+      ws.send(JSON.stringify({ action: 'subscribe', topics: ['admin:pending'] }));
+    };
+
     ws.onmessage = (event) => {
       const data = JSON.parse(event.data);
 
@@ -33,6 +41,12 @@ const NotificationHandler = () => {
         setNotification(data.data);
         setOpen(true);
       }
+
+      if (data.type === 'STATUS_CHANGE_BATCH') {
+        setNotificationType('batch');
+        setNotification(data.data);
+        setOpen(true);
+      }
     };
 
     return () => ws.close();
@@ -64,6 +78,23 @@ const NotificationHandler = () => {
               sx={{ mt: 1 }}
             />
           </>
+        ) : notificationType === 'batch' ? (
+          <>
+            <Typography variant="subtitle1" gutterBottom>
+              Mise à jour groupée 🚨
+            </Typography>
+            <Typography variant="body2">
+              {notification?.count} transaction(s) mise(s) à jour
+            </Typography>
+            <Typography variant="body2" sx={{ mt: 1 }}>
+              Références:{' '}
+              {notification?.items
+                ?.slice(0, 5)
+                .map((item) => item.reference)
+                .join(', ')}
+              {notification?.count > 5 ? '…' : ''}
+            </Typography>
+          </>
         ) : (
           <>
             <Typography variant="subtitle1" gutterBottom>
@@ -0,0 +1,73 @@
+"""add exchange rate history
+
+Revision ID: 3c9d5e2a7f14
+Revises: b7216ee0f974
+Create Date: 2026-10-18 10:02:11.540918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d5e2a7f14'
+down_revision: Union[str, None] = 'b7216ee0f974'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ex_rate_history',
+    sa.Column('id', sa.BIGINT(), autoincrement=True, nullable=False),
+    sa.Column('from_currency_id', sa.UUID(), nullable=False),
+    sa.Column('to_currency_id', sa.UUID(), nullable=False),
+    sa.Column('rate', sa.DECIMAL(), nullable=True),
+    sa.Column('valid_from', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_ex_rate_history_pair_valid_from', 'ex_rate_history', ['from_currency_id', 'to_currency_id', 'valid_from'], unique=False)
+    op.create_index('idx_ex_rate_history_valid_from_brin', 'ex_rate_history', ['valid_from'], unique=False, postgresql_using='brin')
+
+    op.execute("""
+        CREATE FUNCTION record_ex_rate_history() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                IF TG_OP = 'DELETE'
+                   OR NEW.from_currency_id <> OLD.from_currency_id
+                   OR NEW.to_currency_id <> OLD.to_currency_id THEN
+                    INSERT INTO ex_rate_history (from_currency_id, to_currency_id, rate)
+                    VALUES (OLD.from_currency_id, OLD.to_currency_id, NULL);
+                ELSIF NEW.rate IS NOT DISTINCT FROM OLD.rate THEN
+                    RETURN NEW;
+                END IF;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            INSERT INTO ex_rate_history (from_currency_id, to_currency_id, rate)
+            VALUES (NEW.from_currency_id, NEW.to_currency_id, NEW.rate);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER ex_rates_history
+        AFTER INSERT OR UPDATE OR DELETE ON ex_rates
+        FOR EACH ROW EXECUTE FUNCTION record_ex_rate_history()
+    """)
+
+    # Point de départ de l'historique : les taux en vigueur
+    op.execute("""
+        INSERT INTO ex_rate_history (from_currency_id, to_currency_id, rate)
+        SELECT from_currency_id, to_currency_id, rate FROM ex_rates
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS ex_rates_history ON ex_rates")
+    op.execute("DROP FUNCTION IF EXISTS record_ex_rate_history()")
+    op.drop_index('idx_ex_rate_history_valid_from_brin', table_name='ex_rate_history', postgresql_using='brin')
+    op.drop_index('idx_ex_rate_history_pair_valid_from', table_name='ex_rate_history')
+    op.drop_table('ex_rate_history')
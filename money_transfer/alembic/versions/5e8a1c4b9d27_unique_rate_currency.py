@@ -0,0 +1,34 @@
+"""unique rate currency
+
+Revision ID: 5e8a1c4b9d27
+Revises: 3c9d5e2a7f14
+Create Date: 2026-10-18 11:24:37.208114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1c4b9d27'
+down_revision: Union[str, None] = '3c9d5e2a7f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Doublons laissés par l'ancien add_rate (SELECT puis INSERT non atomiques) : on garde une ligne par devise
+    op.execute("""
+        DELETE FROM rates a
+        USING rates b
+        WHERE a.currency = b.currency AND a.ctid < b.ctid
+    """)
+    op.drop_index(op.f('ix_rates_currency'), table_name='rates')
+    op.create_unique_constraint('unique_rate_currency', 'rates', ['currency'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('unique_rate_currency', 'rates', type_='unique')
+    op.create_index(op.f('ix_rates_currency'), 'rates', ['currency'], unique=False)
@@ -0,0 +1,51 @@
+"""transaction keyset indexes
+
+Revision ID: 8d2f6b1e4a93
+Revises: 5e8a1c4b9d27
+Create Date: 2026-10-18 14:12:05.631240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f6b1e4a93'
+down_revision: Union[str, None] = '5e8a1c4b9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY : la table reste ouverte aux écritures pendant la construction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_transaction_timestamp_id', 'transactions',
+            [sa.text('timestamp DESC'), sa.text('id DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_transaction_status_timestamp_id', 'transactions',
+            ['status', sa.text('timestamp DESC'), sa.text('id DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_transaction_sender_visible_timestamp_id', 'transactions',
+            ['sender_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+            unique=False, postgresql_where=sa.text('NOT is_hidden'), postgresql_concurrently=True, if_not_exists=True
+        )
+        # Couvert par idx_transaction_status_timestamp_id
+        op.drop_index('idx_transaction_status', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_transaction_status', 'transactions', ['status'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('idx_transaction_sender_visible_timestamp_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_transaction_status_timestamp_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_transaction_timestamp_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
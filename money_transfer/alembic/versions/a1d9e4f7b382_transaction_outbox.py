@@ -0,0 +1,39 @@
+"""transaction outbox
+
+Revision ID: a1d9e4f7b382
+Revises: f5b2c8d7e614
+Create Date: 2026-10-19 14:27:03.815290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d9e4f7b382'
+down_revision: Union[str, None] = 'f5b2c8d7e614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('transaction_outbox',
+    sa.Column('id', sa.BIGINT(), sa.Identity(always=False), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('available_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sink', sa.VARCHAR(length=20), nullable=False),
+    sa.Column('event_type', sa.VARCHAR(length=50), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('attempts', sa.INTEGER(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_error', sa.TEXT(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # File d'attente : chaque ligne est insérée puis supprimée peu après, les tuples morts
+    # doivent être nettoyés souvent
+    op.execute("ALTER TABLE transaction_outbox SET (autovacuum_vacuum_scale_factor = 0, autovacuum_vacuum_threshold = 1000)")
+
+
+def downgrade() -> None:
+    op.drop_table('transaction_outbox')
@@ -0,0 +1,54 @@
+"""transaction reference allocator
+
+Revision ID: a4c8e2f19b36
+Revises: e3b7a9c41d52
+Create Date: 2026-10-18 18:05:44.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e2f19b36'
+down_revision: Union[str, None] = 'e3b7a9c41d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Chaque nextval réserve un bloc de 100 compteurs (voir src/services/reference_allocator.py)
+    op.execute("""
+        CREATE SEQUENCE IF NOT EXISTS transaction_reference_seq
+        AS bigint MINVALUE 0 MAXVALUE 89999999 START 0 INCREMENT BY 100 NO CYCLE
+    """)
+
+    # Contrainte différable : le script de re-numérotation échange des références entre
+    # lignes dans un même UPDATE, l'unicité est vérifiée en fin d'instruction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'transactions_reference_deferrable_key', 'transactions', ['reference'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True
+        )
+    op.drop_constraint('transactions_reference_key', 'transactions', type_='unique')
+    op.execute("""
+        ALTER TABLE transactions
+        ADD CONSTRAINT transactions_reference_key UNIQUE USING INDEX transactions_reference_deferrable_key
+        DEFERRABLE INITIALLY IMMEDIATE
+    """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'transactions_reference_immediate_key', 'transactions', ['reference'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True
+        )
+    op.drop_constraint('transactions_reference_key', 'transactions', type_='unique')
+    op.execute("""
+        ALTER TABLE transactions
+        ADD CONSTRAINT transactions_reference_key UNIQUE USING INDEX transactions_reference_immediate_key
+    """)
+    op.execute("DROP SEQUENCE IF EXISTS transaction_reference_seq")
@@ -0,0 +1,72 @@
+"""partition token blacklist by expiry
+
+Revision ID: b7216ee0f974
+Revises: 0e4c3de4684b
+Create Date: 2026-10-18 09:12:40.218337
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7216ee0f974'
+down_revision: Union[str, None] = '0e4c3de4684b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month(offset: int) -> date:
+    today = date.today()
+    month = today.month - 1 + offset
+    return date(today.year + month // 12, month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.rename_table('tokenblacklist', 'tokenblacklist_old')
+    op.execute("ALTER TABLE tokenblacklist_old RENAME CONSTRAINT tokenblacklist_pkey TO tokenblacklist_old_pkey")
+    op.execute("ALTER INDEX ix_tokenblacklist_token RENAME TO ix_tokenblacklist_old_token")
+
+    op.execute("""
+        CREATE TABLE tokenblacklist (
+            token_digest BYTEA NOT NULL,
+            expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            revoked_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT timezone('utc', now()),
+            PRIMARY KEY (token_digest, expires_at)
+        ) PARTITION BY RANGE (expires_at)
+    """)
+    op.create_index(op.f('ix_tokenblacklist_revoked_at'), 'tokenblacklist', ['revoked_at'], unique=False)
+    op.execute("CREATE TABLE tokenblacklist_default PARTITION OF tokenblacklist DEFAULT")
+    for offset in range(MONTHS_AHEAD + 1):
+        lower, upper = _month(offset), _month(offset + 1)
+        op.execute(
+            f"CREATE TABLE tokenblacklist_p{lower:%Y%m} PARTITION OF tokenblacklist "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+
+    # Seules les révocations encore utiles sont reprises
+    op.execute("""
+        INSERT INTO tokenblacklist (token_digest, expires_at)
+        SELECT sha256(convert_to(token, 'UTF8')), expires_at
+        FROM tokenblacklist_old
+        WHERE expires_at > timezone('utc', now())
+        ON CONFLICT DO NOTHING
+    """)
+    op.drop_table('tokenblacklist_old')
+
+
+def downgrade() -> None:
+    # Les tokens d'origine ne peuvent pas être reconstruits à partir de leur empreinte
+    op.drop_table('tokenblacklist')
+    op.create_table('tokenblacklist',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.VARCHAR(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tokenblacklist_token'), 'tokenblacklist', ['token'], unique=True)
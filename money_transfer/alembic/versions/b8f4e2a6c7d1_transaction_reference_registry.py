@@ -0,0 +1,84 @@
+"""transaction reference registry
+
+Revision ID: b8f4e2a6c7d1
+Revises: a1d9e4f7b382
+Create Date: 2026-10-20 09:41:18.264503
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f4e2a6c7d1'
+down_revision: Union[str, None] = 'a1d9e4f7b382'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DUPLICATES = "SELECT reference FROM transactions WHERE reference IS NOT NULL GROUP BY reference HAVING count(*) > 1"
+
+
+def upgrade() -> None:
+    # transactions_reference_key porte sur (reference, timestamp) depuis le partitionnement : l'unicité
+    # globale des références passe par cette table non partitionnée, écrite par trigger dans la même
+    # transaction. Les partitions archivées (détachées puis supprimées) y laissent leurs références
+    duplicates = op.get_bind().execute(sa.text(f"{DUPLICATES} LIMIT 10")).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Références en double dans transactions ({', '.join(duplicates)}...) : re-numéroter "
+            f"l'une des transactions de chaque paire avant de migrer ({DUPLICATES})"
+        )
+
+    op.create_table('transaction_references',
+    sa.Column('reference', sa.VARCHAR(length=8), nullable=False),
+    sa.PrimaryKeyConstraint('reference')
+    )
+    op.execute("INSERT INTO transaction_references (reference) SELECT reference FROM transactions WHERE reference IS NOT NULL")
+
+    # Triggers par instruction : les références retirées sont supprimées avant l'insertion des
+    # nouvelles, un même UPDATE peut donc échanger des références (update_reference_script.py)
+    op.execute("""
+        CREATE FUNCTION transaction_references_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO transaction_references (reference)
+                SELECT reference FROM new_rows WHERE reference IS NOT NULL;
+            ELSIF TG_OP = 'DELETE' THEN
+                DELETE FROM transaction_references r USING old_rows o WHERE r.reference = o.reference;
+            ELSE
+                DELETE FROM transaction_references r
+                USING old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE r.reference = o.reference AND n.reference IS DISTINCT FROM o.reference;
+                INSERT INTO transaction_references (reference)
+                SELECT n.reference FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.reference IS NOT NULL AND n.reference IS DISTINCT FROM o.reference;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_references_insert
+        AFTER INSERT ON transactions REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_references_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_references_update
+        AFTER UPDATE ON transactions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_references_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_references_delete
+        AFTER DELETE ON transactions REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_references_apply()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS transactions_references_delete ON transactions")
+    op.execute("DROP TRIGGER IF EXISTS transactions_references_update ON transactions")
+    op.execute("DROP TRIGGER IF EXISTS transactions_references_insert ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS transaction_references_apply()")
+    op.drop_table('transaction_references')
@@ -0,0 +1,32 @@
+"""transaction outbox dead letters
+
+Revision ID: c6a1d8f3e527
+Revises: b8f4e2a6c7d1
+Create Date: 2026-10-20 11:02:47.519836
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1d8f3e527'
+down_revision: Union[str, None] = 'b8f4e2a6c7d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transaction_outbox', sa.Column('dead_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+    # La réservation ne parcourt que les événements encore livrables
+    op.create_index(
+        'idx_transaction_outbox_pending', 'transaction_outbox', ['id'], unique=False,
+        postgresql_where=sa.text('dead_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_transaction_outbox_pending', table_name='transaction_outbox', postgresql_where=sa.text('dead_at IS NULL'))
+    op.drop_column('transaction_outbox', 'dead_at')
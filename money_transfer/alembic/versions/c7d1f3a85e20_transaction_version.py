@@ -0,0 +1,27 @@
+"""transaction version
+
+Revision ID: c7d1f3a85e20
+Revises: a4c8e2f19b36
+Create Date: 2026-10-18 20:31:09.114562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d1f3a85e20'
+down_revision: Union[str, None] = 'a4c8e2f19b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Valeur par défaut constante : pas de réécriture de la table
+    op.add_column('transactions', sa.Column('version', sa.INTEGER(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('transactions', 'version')
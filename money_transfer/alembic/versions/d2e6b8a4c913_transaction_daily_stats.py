@@ -0,0 +1,124 @@
+"""transaction daily stats
+
+Revision ID: d2e6b8a4c913
+Revises: c7d1f3a85e20
+Create Date: 2026-10-18 22:14:37.580226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e6b8a4c913'
+down_revision: Union[str, None] = 'c7d1f3a85e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GROUP_COLUMNS = "day, sender_country, receiver_country, sender_currency, receiver_currency, status"
+
+# Clé de regroupement d'une ligne de transactions (jour UTC, colonnes NULL ramenées à '')
+ROW_GROUP = """
+    (timestamp AT TIME ZONE 'UTC')::date AS day,
+    sender_country,
+    coalesce(receiver_country, '') AS receiver_country,
+    sender_currency,
+    coalesce(receiver_currency, '') AS receiver_currency,
+    status
+"""
+
+
+def apply_changes(changes: str) -> str:
+    """Ajoute aux agrégats les lignes de `changes` (clé de ROW_GROUP, n, montants signés)."""
+    return f"""
+        WITH delta AS (
+            SELECT {GROUP_COLUMNS},
+                   sum(n) AS count,
+                   coalesce(sum(sender_amount), 0) AS sender_amount,
+                   coalesce(sum(receiver_amount), 0) AS receiver_amount,
+                   coalesce(sum(fee_amount), 0) AS fee_amount
+            FROM ({changes}) AS changes (
+                {GROUP_COLUMNS}, n, sender_amount, receiver_amount, fee_amount
+            )
+            GROUP BY {GROUP_COLUMNS}
+        )
+        INSERT INTO transaction_daily_stats AS s
+            ({GROUP_COLUMNS}, count, sender_amount, receiver_amount, fee_amount)
+        SELECT * FROM delta
+        WHERE count <> 0 OR sender_amount <> 0 OR receiver_amount <> 0 OR fee_amount <> 0
+        ORDER BY {GROUP_COLUMNS}
+        ON CONFLICT ({GROUP_COLUMNS}) DO UPDATE SET
+            count = s.count + EXCLUDED.count,
+            sender_amount = s.sender_amount + EXCLUDED.sender_amount,
+            receiver_amount = s.receiver_amount + EXCLUDED.receiver_amount,
+            fee_amount = s.fee_amount + EXCLUDED.fee_amount;
+    """
+
+
+def upgrade() -> None:
+    op.create_table('transaction_daily_stats',
+    sa.Column('day', sa.DATE(), nullable=False),
+    sa.Column('sender_country', sa.VARCHAR(length=50), nullable=False),
+    sa.Column('receiver_country', sa.VARCHAR(length=50), nullable=False),
+    sa.Column('sender_currency', sa.VARCHAR(length=10), nullable=False),
+    sa.Column('receiver_currency', sa.VARCHAR(length=10), nullable=False),
+    sa.Column('status', sa.VARCHAR(length=20), nullable=False),
+    sa.Column('count', sa.BIGINT(), server_default=sa.text('0'), nullable=False),
+    sa.Column('sender_amount', sa.BIGINT(), server_default=sa.text('0'), nullable=False),
+    sa.Column('receiver_amount', sa.BIGINT(), server_default=sa.text('0'), nullable=False),
+    sa.Column('fee_amount', sa.BIGINT(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'sender_country', 'receiver_country', 'sender_currency', 'receiver_currency', 'status')
+    )
+
+    # Triggers par instruction : un lot (insertion multiple, mise à jour groupée des statuts)
+    # ne touche chaque ligne d'agrégat qu'une fois, dans un ordre fixe pour éviter les interblocages.
+    # Une table de transition n'existe que dans les triggers qui la déclarent : une branche par opération
+    added = f"SELECT {ROW_GROUP}, 1 AS n, sender_amount, receiver_amount, fee_amount FROM new_rows"
+    removed = f"SELECT {ROW_GROUP}, -1 AS n, -sender_amount, -receiver_amount, -fee_amount FROM old_rows"
+    op.execute(f"""
+        CREATE FUNCTION transaction_daily_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {apply_changes(added)}
+            ELSIF TG_OP = 'DELETE' THEN
+                {apply_changes(removed)}
+            ELSE
+                {apply_changes(added + " UNION ALL " + removed)}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_daily_stats_insert
+        AFTER INSERT ON transactions REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_daily_stats_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_daily_stats_update
+        AFTER UPDATE ON transactions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_daily_stats_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_daily_stats_delete
+        AFTER DELETE ON transactions REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_daily_stats_apply()
+    """)
+
+    op.execute(f"""
+        INSERT INTO transaction_daily_stats ({GROUP_COLUMNS}, count, sender_amount, receiver_amount, fee_amount)
+        SELECT {GROUP_COLUMNS}, count(*),
+               coalesce(sum(sender_amount), 0), coalesce(sum(receiver_amount), 0), coalesce(sum(fee_amount), 0)
+        FROM (SELECT {ROW_GROUP}, sender_amount, receiver_amount, fee_amount FROM transactions) t
+        GROUP BY {GROUP_COLUMNS}
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS transactions_daily_stats_delete ON transactions")
+    op.execute("DROP TRIGGER IF EXISTS transactions_daily_stats_update ON transactions")
+    op.execute("DROP TRIGGER IF EXISTS transactions_daily_stats_insert ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS transaction_daily_stats_apply()")
+    op.drop_table('transaction_daily_stats')
@@ -0,0 +1,108 @@
+"""transaction search trigram
+
+Revision ID: e3b7a9c41d52
+Revises: 8d2f6b1e4a93
+Create Date: 2026-10-18 16:40:27.318054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7a9c41d52'
+down_revision: Union[str, None] = '8d2f6b1e4a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.add_column('transactions', sa.Column('search_text', sa.TEXT(), nullable=True))
+
+    # Texte recherché : référence, bénéficiaire et expéditeur, en minuscules et sans accents
+    op.execute("""
+        CREATE FUNCTION transaction_search_document(
+            reference text, recipient_name text, recipient_phone text, sender_name text, sender_phone text
+        ) RETURNS text AS $$
+            SELECT lower(unaccent(concat_ws(' ', reference, recipient_name, recipient_phone, sender_name, sender_phone)))
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("""
+        CREATE FUNCTION transactions_search_text() RETURNS trigger AS $$
+        DECLARE
+            sender_name text;
+            sender_phone text;
+        BEGIN
+            SELECT full_name, phone INTO sender_name, sender_phone FROM users WHERE id = NEW.sender_id;
+            NEW.search_text := transaction_search_document(
+                NEW.reference, NEW.recipient_name, NEW.recipient_phone, sender_name, sender_phone
+            );
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_search_text
+        BEFORE INSERT OR UPDATE OF reference, recipient_name, recipient_phone, sender_id ON transactions
+        FOR EACH ROW EXECUTE FUNCTION transactions_search_text()
+    """)
+    # Le nom et le téléphone de l'expéditeur font partie du texte de ses transactions
+    op.execute("""
+        CREATE FUNCTION users_transactions_search_text() RETURNS trigger AS $$
+        BEGIN
+            UPDATE transactions
+            SET search_text = transaction_search_document(
+                reference, recipient_name, recipient_phone, NEW.full_name, NEW.phone
+            )
+            WHERE sender_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER users_transactions_search_text
+        AFTER UPDATE OF full_name, phone ON users
+        FOR EACH ROW
+        WHEN (OLD.full_name IS DISTINCT FROM NEW.full_name OR OLD.phone IS DISTINCT FROM NEW.phone)
+        EXECUTE FUNCTION users_transactions_search_text()
+    """)
+
+    op.execute("""
+        UPDATE transactions t
+        SET search_text = transaction_search_document(t.reference, t.recipient_name, t.recipient_phone, u.full_name, u.phone)
+        FROM users u
+        WHERE u.id = t.sender_id
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_transaction_search_text_trgm', 'transactions', ['search_text'],
+            unique=False, postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_transaction_corridor_timestamp_id', 'transactions',
+            ['sender_country', 'receiver_country', sa.text('timestamp DESC'), sa.text('id DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_transaction_currency_amount', 'transactions', ['sender_currency', 'sender_amount'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_transaction_currency_amount', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_transaction_corridor_timestamp_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_transaction_search_text_trgm', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+    op.execute("DROP TRIGGER IF EXISTS users_transactions_search_text ON users")
+    op.execute("DROP FUNCTION IF EXISTS users_transactions_search_text()")
+    op.execute("DROP TRIGGER IF EXISTS transactions_search_text ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS transactions_search_text()")
+    op.execute("DROP FUNCTION IF EXISTS transaction_search_document(text, text, text, text, text)")
+    op.drop_column('transactions', 'search_text')
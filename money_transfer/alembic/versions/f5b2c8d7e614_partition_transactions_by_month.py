@@ -0,0 +1,146 @@
+"""partition transactions by month
+
+Revision ID: f5b2c8d7e614
+Revises: d2e6b8a4c913
+Create Date: 2026-10-19 09:41:12.306845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b2c8d7e614'
+down_revision: Union[str, None] = 'd2e6b8a4c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, timestamp, reference, sender_id, sender_country, sender_currency, sender_amount, "
+    "receiver_country, receiver_currency, receiver_amount, conversion_rate, payment_type, "
+    "recipient_name, recipient_phone, recipient_type, include_fee, is_hidden, fee_amount, "
+    "status, search_text, version"
+)
+
+
+def create_indexes_and_triggers() -> None:
+    """Index et triggers communs à la table simple et à la table partitionnée (créés après le chargement)."""
+    op.execute("""
+        ALTER TABLE transactions ADD CONSTRAINT transactions_sender_id_fkey
+        FOREIGN KEY (sender_id) REFERENCES users (id)
+    """)
+    op.execute('CREATE INDEX idx_transaction_timestamp_id ON transactions ("timestamp" DESC, id DESC)')
+    op.execute('CREATE INDEX idx_transaction_status_timestamp_id ON transactions (status, "timestamp" DESC, id DESC)')
+    op.execute("""
+        CREATE INDEX idx_transaction_sender_visible_timestamp_id ON transactions (sender_id, "timestamp" DESC, id DESC)
+        WHERE NOT is_hidden
+    """)
+    op.execute("CREATE INDEX idx_transaction_search_text_trgm ON transactions USING gin (search_text gin_trgm_ops)")
+    op.execute("""
+        CREATE INDEX idx_transaction_corridor_timestamp_id
+        ON transactions (sender_country, receiver_country, "timestamp" DESC, id DESC)
+    """)
+    op.execute("CREATE INDEX idx_transaction_currency_amount ON transactions (sender_currency, sender_amount)")
+
+    # Fonctions créées par e3b7a9c41d52 et d2e6b8a4c913, inchangées
+    op.execute("""
+        CREATE TRIGGER transactions_search_text
+        BEFORE INSERT OR UPDATE OF reference, recipient_name, recipient_phone, sender_id ON transactions
+        FOR EACH ROW EXECUTE FUNCTION transactions_search_text()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_daily_stats_insert
+        AFTER INSERT ON transactions REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_daily_stats_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_daily_stats_update
+        AFTER UPDATE ON transactions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_daily_stats_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_daily_stats_delete
+        AFTER DELETE ON transactions REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION transaction_daily_stats_apply()
+    """)
+    op.execute("ANALYZE transactions")
+
+
+def upgrade() -> None:
+    # Migration hors ligne : la table est recopiée, les écritures doivent être arrêtées.
+    # Triggers et index sont créés après la copie : transaction_daily_stats et search_text
+    # sont déjà à jour et la copie n'a pas à les maintenir.
+    op.rename_table('transactions', 'transactions_old')
+    op.execute("""
+        CREATE TABLE transactions (LIKE transactions_old INCLUDING DEFAULTS)
+        PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute('ALTER TABLE transactions ALTER COLUMN "timestamp" SET NOT NULL, ALTER COLUMN "timestamp" SET DEFAULT now()')
+
+    # Partitions mensuelles en UTC (les mêmes jours que transaction_daily_stats), de la plus
+    # ancienne transaction à MONTHS_AHEAD mois après le mois courant ; les suivantes sont
+    # créées par ensure_transaction_partitions()
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(first, last, interval '1 month')::date
+                FROM (
+                    SELECT date_trunc('month', least(min("timestamp"), now()) AT TIME ZONE 'UTC') AS first,
+                           date_trunc('month', greatest(max("timestamp"), now()) AT TIME ZONE 'UTC')
+                               + interval '{MONTHS_AHEAD} months' AS last
+                    FROM transactions_old
+                ) bounds
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                    'transactions_p' || to_char(month, 'YYYYMM'),
+                    month || ' 00:00:00+00',
+                    (month + interval '1 month')::date || ' 00:00:00+00'
+                );
+            END LOOP;
+        END
+        $$
+    """)
+
+    # Les quelques transactions sans date sont rangées au mois de la migration
+    op.execute(f"""
+        INSERT INTO transactions ({COLUMNS})
+        SELECT {COLUMNS.replace('timestamp', 'coalesce("timestamp", now())', 1)}
+        FROM transactions_old
+    """)
+    op.drop_table('transactions_old')
+
+    # La clé de partition doit faire partie des contraintes d'unicité. L'unicité des références
+    # seules est garantie par reference_allocator ; la recherche par référence passe par
+    # l'index de transactions_reference_key (référence en tête), idx_transaction_reference n'est
+    # plus nécessaire
+    op.execute('ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY (id, "timestamp")')
+    op.execute("""
+        ALTER TABLE transactions ADD CONSTRAINT transactions_reference_key
+        UNIQUE (reference, "timestamp") DEFERRABLE INITIALLY IMMEDIATE
+    """)
+    create_indexes_and_triggers()
+
+
+def downgrade() -> None:
+    op.rename_table('transactions', 'transactions_partitioned')
+    op.execute("CREATE TABLE transactions (LIKE transactions_partitioned INCLUDING DEFAULTS)")
+    op.execute('ALTER TABLE transactions ALTER COLUMN "timestamp" DROP NOT NULL, ALTER COLUMN "timestamp" DROP DEFAULT')
+    # Les partitions archivées (détachées) ne sont pas reprises
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_partitioned")
+    op.drop_table('transactions_partitioned')
+
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY (id)")
+    op.execute("""
+        ALTER TABLE transactions ADD CONSTRAINT transactions_reference_key
+        UNIQUE (reference) DEFERRABLE INITIALLY IMMEDIATE
+    """)
+    op.create_index('idx_transaction_reference', 'transactions', ['reference'], unique=False)
+    create_indexes_and_triggers()
@@ -0,0 +1,64 @@
+"""
+Compare N appels à GET /exchange-rates/convert avec un seul POST /exchange-rates/convert/batch.
+Les taux sont synthétiques et installés directement dans le moteur : aucune base n'est nécessaire.
+
+Usage (depuis money_transfer/) :
+    python benchmarks/batch_conversion.py --items 200 --currencies 40
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+
+from src import app
+from src.services.rate_engine import rate_engine, RateMatrix
+
+
+def install_synthetic_rates(currencies: int):
+	codes = [f"C{i:02d}" for i in range(currencies)]
+	pairs = [
+		(a, b, Decimal(random.uniform(0.001, 1000)).quantize(Decimal("0.0001")))
+		for a in codes for b in codes if a != b
+	]
+	rate_engine.matrix = RateMatrix.build(codes, pairs)
+	return codes
+
+
+async def run(items: int, currencies: int):
+	codes = install_synthetic_rates(currencies)
+	requests = [
+		{"from_currency": random.choice(codes), "to_currency": random.choice(codes), "amount": str(random.randint(1, 100000))}
+		for _ in range(items)
+	]
+
+	transport = httpx.ASGITransport(app=app)
+	async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+		start = time.perf_counter()
+		for item in requests:
+			await client.get("/v1/exchange-rates/convert", params=item)
+		single = time.perf_counter() - start
+
+		start = time.perf_counter()
+		response = await client.post("/v1/exchange-rates/convert/batch", json={"items": requests})
+		batch = time.perf_counter() - start
+		assert len(response.json()) == items
+
+	print(f"{items} appels unitaires : {single * 1000:.1f} ms ({items} requêtes HTTP)")
+	print(f"1 appel groupé       : {batch * 1000:.1f} ms (1 requête HTTP)")
+	print(f"gain                 : x{single / batch:.1f}")
+	print("Avant le moteur en mémoire, chaque appel unitaire coûtait en plus 3 requêtes SQL.")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--items", type=int, default=200)
+	parser.add_argument("--currencies", type=int, default=40)
+	args = parser.parse_args()
+	asyncio.run(run(args.items, args.currencies))
@@ -0,0 +1,65 @@
+"""
+Compare le travail base de données par requête authentifiée pour la vérification
+de révocation : ancienne requête TokenBlacklist vs cache en mémoire.
+
+Usage (depuis money_transfer/, base de données configurée dans .env) :
+    python benchmarks/token_revocation.py --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import event
+from sqlmodel import select
+
+from src.auth.auth import create_access_token
+from src.auth.revocation import TokenRevocationCache, token_digest
+from src.db.models import TokenBlacklist
+from src.db.session import Session, engine
+
+
+class StatementCounter:
+	def __init__(self):
+		self.count = 0
+
+	def __call__(self, *args, **kwargs):
+		self.count += 1
+
+
+async def legacy_check(token, session):
+	stmt = select(TokenBlacklist.expires_at).where(TokenBlacklist.token_digest == token_digest(token))
+	result = await session.execute(stmt)
+	return result.first() is not None
+
+
+async def run(requests: int):
+	counter = StatementCounter()
+	event.listen(engine.sync_engine, "before_cursor_execute", counter)
+
+	token = create_access_token({"sub": str(uuid.uuid4())})
+	cache = TokenRevocationCache()
+	await cache.sync()
+
+	async with Session() as session:
+		for label, check in (("table TokenBlacklist", legacy_check), ("cache mémoire", cache.is_revoked)):
+			counter.count = 0
+			start = time.perf_counter()
+			for _ in range(requests):
+				await check(token, session)
+			elapsed = time.perf_counter() - start
+			print(
+				f"{label:<22} requêtes SQL/appel: {counter.count / requests:.2f}  "
+				f"latence moyenne: {elapsed / requests * 1e6:.1f} µs"
+			)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--requests", type=int, default=1000)
+	args = parser.parse_args()
+	asyncio.run(run(args.requests))
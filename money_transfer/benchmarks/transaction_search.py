@@ -0,0 +1,157 @@
+"""
+Compare l'ancienne recherche de transactions (ILIKE sur cinq colonnes, dont deux via
+EXISTS sur users, sans limite) avec la recherche trigramme paginée de
+src/services/transaction_search.py.
+
+Les données synthétiques (utilisateurs bench-*@bench.example.com, transactions
+recipient_type = 'bench') sont insérées par --seed et supprimées par --cleanup.
+
+Usage (depuis money_transfer/, base de données migrée configurée dans .env) :
+    python benchmarks/transaction_search.py --seed 1000000
+    python benchmarks/transaction_search.py --repeat 5
+    python benchmarks/transaction_search.py --cleanup
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import Response
+from sqlalchemy import or_, text
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+
+from src.db.models import Transaction, User
+from src.db.session import Session
+from src.services.transaction_search import TransactionFilters, search_page
+
+FIRST_NAMES = ["Aïssatou", "Mamadou", "Fatoumata", "Ibrahima", "Awa", "Cheikh", "Hélène", "Jérôme", "Ndèye", "Ousmane",
+			   "Mariétou", "Boubacar", "Khadija", "Séverine", "Moussa", "Adama", "Dmitri", "Olga", "François", "Zoé"]
+LAST_NAMES = ["Diallo", "Ndiaye", "Diop", "Fall", "Sow", "Ba", "Guèye", "Cissé", "Kâ", "Mbaye",
+			  "Lefèvre", "Dupré", "Ivanov", "Petrova", "Thiam", "Sarr", "Kouyaté", "Traoré", "Camara", "Sène"]
+
+CASES = [
+	("référence exacte", TransactionFilters(q="B00f4240")),
+	("nom sans accents", TransactionFilters(q="aissatou gueye")),
+	("téléphone partiel", TransactionFilters(q="0104729")),
+	("nom + corridor + montant", TransactionFilters(
+		q="diallo", sender_country="France", receiver_country="Sénégal", min_amount=100, max_amount=500
+	)),
+	("filtres seuls", TransactionFilters(status="En cours", currency="EUR", min_amount=900)),
+]
+
+
+async def seed(rows: int, users: int):
+	first, last = "ARRAY" + repr(FIRST_NAMES), "ARRAY" + repr(LAST_NAMES)
+	async with Session() as session:
+		await session.execute(text(f"""
+			INSERT INTO users (id, full_name, phone, email, country, hash_password, role, created_at, updated_at)
+			SELECT gen_random_uuid(),
+				   ({first})[1 + i % 20] || ' ' || ({last})[1 + (i / 20) % 20],
+				   '+2217' || lpad(i::text, 8, '0'),
+				   'bench-' || i || '@bench.example.com',
+				   'France', 'x', 'user', now(), now()
+			FROM generate_series(1, :users) AS i
+		"""), {"users": users})
+		await session.execute(text(f"""
+			INSERT INTO transactions (
+				id, timestamp, reference, sender_id, sender_country, sender_currency, sender_amount,
+				receiver_country, receiver_currency, receiver_amount, conversion_rate, payment_type,
+				recipient_name, recipient_phone, recipient_type, include_fee, is_hidden, fee_amount, status
+			)
+			SELECT gen_random_uuid(),
+				   now() - (i * interval '37 seconds'),
+				   'B' || lpad(to_hex(i), 7, '0'),
+				   s.id,
+				   (ARRAY['France', 'Russie'])[1 + i % 2],
+				   (ARRAY['EUR', 'RUB'])[1 + i % 2],
+				   1 + (i::bigint * 7919) % 1000,
+				   (ARRAY['Sénégal', 'Mali', 'Guinée'])[1 + i % 3],
+				   'XOF', (1 + (i::bigint * 7919) % 1000) * 655, 655.96, 'Wave',
+				   ({first})[1 + (i / 7) % 20] || ' ' || ({last})[1 + (i / 3) % 20],
+				   '+2237' || lpad(((i::bigint * 104729) % 100000000)::text, 8, '0'),
+				   'bench', false, false, 0,
+				   (ARRAY['En cours', 'Éffectuée', 'Annulée'])[1 + i % 3]
+			FROM generate_series(1, :rows) AS i
+			JOIN LATERAL (
+				SELECT id FROM users WHERE email = 'bench-' || (1 + i % :users) || '@bench.example.com'
+			) s ON true
+		"""), {"rows": rows, "users": users})
+		await session.execute(text("ANALYZE transactions"))
+		await session.execute(text("ANALYZE users"))
+		await session.commit()
+	print(f"{rows} transactions et {users} utilisateurs insérés")
+
+
+async def cleanup():
+	async with Session() as session:
+		await session.execute(text("DELETE FROM transactions WHERE recipient_type = 'bench'"))
+		await session.execute(text("DELETE FROM users WHERE email LIKE 'bench-%@bench.example.com'"))
+		await session.commit()
+	print("données synthétiques supprimées")
+
+
+async def legacy_search(session, filters: TransactionFilters):
+	query = select(Transaction).options(joinedload(Transaction.sender))
+	if filters.q:
+		q = filters.q
+		query = query.where(or_(
+			Transaction.reference.ilike(f"%{q}%"),
+			Transaction.sender.has(User.full_name.ilike(f"%{q}%")),
+			Transaction.sender.has(User.phone.ilike(f"%{q}%")),
+			Transaction.recipient_name.ilike(f"%{q}%"),
+			Transaction.recipient_phone.ilike(f"%{q}%")
+		))
+	if filters.status:
+		query = query.where(Transaction.status == filters.status)
+	if filters.min_amount is not None:
+		query = query.where(Transaction.sender_amount >= filters.min_amount)
+	if filters.max_amount is not None:
+		query = query.where(Transaction.sender_amount <= filters.max_amount)
+	if filters.sender_country:
+		query = query.where(Transaction.sender_country == filters.sender_country)
+	if filters.receiver_country:
+		query = query.where(Transaction.receiver_country == filters.receiver_country)
+	if filters.currency:
+		query = query.where(Transaction.sender_currency == filters.currency)
+	return (await session.execute(query)).scalars().all()
+
+
+async def timed(call, repeat: int) -> tuple[float, int]:
+	durations = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		rows = await call()
+		durations.append(time.perf_counter() - start)
+	return statistics.median(durations) * 1000, len(rows)
+
+
+async def run(repeat: int, limit: int):
+	async with Session() as session:
+		for label, filters in CASES:
+			legacy_ms, legacy_rows = await timed(lambda: legacy_search(session, filters), repeat)
+			page_ms, page_rows = await timed(lambda: search_page(session, filters, Response(), limit=limit), repeat)
+			print(
+				f"{label:<26} ILIKE: {legacy_ms:8.1f} ms ({legacy_rows} lignes)   "
+				f"trigrammes: {page_ms:7.1f} ms (page de {page_rows})"
+			)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--seed", type=int, default=0, help="transactions synthétiques à insérer")
+	parser.add_argument("--users", type=int, default=20000)
+	parser.add_argument("--cleanup", action="store_true")
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--limit", type=int, default=50)
+	args = parser.parse_args()
+	if args.cleanup:
+		asyncio.run(cleanup())
+	elif args.seed:
+		asyncio.run(seed(args.seed, args.users))
+	else:
+		asyncio.run(run(args.repeat, args.limit))
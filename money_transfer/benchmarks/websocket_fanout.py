@@ -0,0 +1,183 @@
+"""
+Latence de diffusion de transaction_hub (src/services/websocket_hub.py) vers des milliers de
+connexions websocket abonnées, avec ou sans clients lents.
+
+Le serveur (uvicorn, un sous-processus) expose le hub seul, sans base de données ; les
+clients tournent dans ce processus-ci. Chaque message porte son heure d'envoi : la latence
+mesurée va de la publication à la réception par chaque client. Les clients s'abonnent à
+admin:pending, ou avec --corridors N se répartissent entre N corridors dont chaque message
+n'en vise qu'un : seuls ses abonnés le reçoivent. Avec --redis, les messages
+passent par le canal Redis comme en production (REDIS_URL_LOCAL doit être joignable) ;
+sinon ils sont remis directement au hub du serveur.
+
+Usage (depuis money_transfer/) :
+    python benchmarks/websocket_fanout.py --connections 2000 --messages 50
+    python benchmarks/websocket_fanout.py --connections 2000 --slow 20 --payload 8192
+    python benchmarks/websocket_fanout.py --connections 5000 --corridors 50 --messages 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+
+def create_app(use_redis: bool):
+	from contextlib import asynccontextmanager
+
+	from fastapi import FastAPI, Request, WebSocket
+
+	from src.db import redis
+	from src.schemas.user import UserRead, UserRole
+	from src.services.websocket_hub import transaction_hub
+
+	@asynccontextmanager
+	async def lifespan(app: FastAPI):
+		listener = asyncio.create_task(redis.listen()) if use_redis else None
+		yield
+		if listener:
+			listener.cancel()
+
+	app = FastAPI(lifespan=lifespan)
+
+	@app.websocket("/ws")
+	async def websocket_endpoint(websocket: WebSocket):
+		# Pas d'authentification ici : un admin fictif, qui peut s'abonner à tous les sujets
+		await transaction_hub.serve(
+			websocket, UserRead.model_construct(id=uuid.uuid4(), role=UserRole.ADMIN), uuid.uuid4().bytes, time.time() + 86400
+		)
+
+	@app.post("/publish")
+	async def publish(request: Request):
+		message = await request.json()
+		message["sent"] = time.time()
+		if use_redis:
+			await transaction_hub.publish(message)
+		else:
+			await transaction_hub.on_message(message)
+		return {"connections": len(transaction_hub.connections)}
+
+	return app
+
+
+def serve(port: int, use_redis: bool):
+	import uvicorn
+
+	uvicorn.run(create_app(use_redis), host="127.0.0.1", port=port, log_level="warning")
+
+
+class Client:
+
+	def __init__(self, topic: str, slow: bool):
+		self.topic = topic
+		self.slow = slow
+		self.latencies = []
+
+	async def run(self, url: str, ready: asyncio.Event, done: asyncio.Event):
+		# max_queue=1 : un client qui ne lit pas cesse vite de vider sa socket
+		async with connect(url, max_queue=1 if self.slow else 16, ping_interval=None) as websocket:
+			await websocket.send(json.dumps({"action": "subscribe", "topics": [self.topic]}))
+			await websocket.recv()
+			ready.set()
+			try:
+				if self.slow:
+					await done.wait()
+					return
+				async for text in websocket:
+					self.latencies.append(time.time() - json.loads(text)["sent"])
+			except ConnectionClosed:
+				pass
+
+
+def percentile(values, q: float) -> float:
+	return statistics.quantiles(values, n=100)[int(q) - 1] if len(values) > 1 else (values[0] if values else 0)
+
+
+def topic(index: int, corridors: int) -> str:
+	return f"corridor:C{index % corridors}:X" if corridors else "admin:pending"
+
+
+async def run(connections: int, slow: int, corridors: int, messages: int, interval: float, payload: int, port: int):
+	url = f"ws://127.0.0.1:{port}/ws"
+	done = asyncio.Event()
+	clients = [Client(topic(index, corridors), slow=index < slow) for index in range(connections)]
+	tasks = []
+	start = time.perf_counter()
+	for batch in range(0, connections, 200):
+		events = []
+		for client in clients[batch:batch + 200]:
+			ready = asyncio.Event()
+			events.append(ready)
+			tasks.append(asyncio.create_task(client.run(url, ready, done)))
+		await asyncio.gather(*(event.wait() for event in events))
+	print(f"{connections} connexions ouvertes en {time.perf_counter() - start:.1f} s (dont {slow} lentes)")
+
+	body = {"type": "BENCH", "data": {"padding": "x" * payload}}
+	async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as http:
+		for seq in range(messages):
+			await http.post("/publish", json={**body, "seq": seq, "topics": [topic(seq, corridors)]})
+			await asyncio.sleep(interval)
+		await asyncio.sleep(1)
+		remaining = (await http.post("/publish", json={"type": "BENCH", "data": {}})).json()["connections"]
+	await asyncio.sleep(0.5)
+	done.set()
+	for task in tasks:
+		task.cancel()
+	await asyncio.gather(*tasks, return_exceptions=True)
+
+	fast = [client for client in clients if not client.slow]
+	latencies = sorted(latency for client in fast for latency in client.latencies)
+	sent = [topic(seq, corridors) for seq in range(messages)]
+	expected = sum(sent.count(client.topic) for client in fast)
+	received = sum(len(client.latencies) for client in fast)
+	print(f"messages reçus      : {received} / {expected} attendus (clients normaux)")
+	if latencies:
+		print(
+			f"latence (ms)        : p50 {percentile(latencies, 50) * 1000:.1f}  p95 {percentile(latencies, 95) * 1000:.1f}"
+			f"  p99 {percentile(latencies, 99) * 1000:.1f}  max {latencies[-1] * 1000:.1f}"
+		)
+	# Un client qui ne lit pas ne voit pas la trame de fermeture : les évictions sont comptées côté serveur
+	print(f"connexions fermées par le serveur : {connections - remaining} (clients lents : {slow})")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--connections", type=int, default=2000)
+	parser.add_argument("--slow", type=int, default=0, help="clients qui ne lisent jamais")
+	parser.add_argument("--corridors", type=int, default=0, help="répartir les clients entre N sujets corridor")
+	parser.add_argument("--messages", type=int, default=50)
+	parser.add_argument("--interval", type=float, default=0.02, help="secondes entre deux messages")
+	parser.add_argument("--payload", type=int, default=256, help="taille du message en octets")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--redis", action="store_true", help="passer par le canal Redis")
+	parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.serve:
+		serve(args.port, args.redis)
+		sys.exit()
+
+	server = subprocess.Popen(
+		[sys.executable, __file__, "--serve", "--port", str(args.port)] + (["--redis"] if args.redis else [])
+	)
+	try:
+		for _ in range(100):
+			try:
+				httpx.get(f"http://127.0.0.1:{args.port}/docs")
+				break
+			except httpx.ConnectError:
+				time.sleep(0.1)
+		asyncio.run(run(args.connections, args.slow, args.corridors, args.messages, args.interval, args.payload, args.port))
+	finally:
+		server.terminate()
+		server.wait()
@@ -1,15 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from src.api.endpoints.v1 import healthcheck, currency, country, receiving_type, payment_method, transaction, fees, exchange_rates, faqs, \
-    user
+    user, quote, stats
+from src.auth.hashing import hashing_pool
+from src.auth.revocation import revocation_cache
+from src.core.idempotency import IdempotencyMiddleware, IdempotentReplay, replay_handler
+from src.db import redis
+from src.services.outbox import outbox_dispatcher
+from src.workers.scheduler import scheduler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Le cache de révocation est chargé par l'écouteur pub/sub dès sa connexion
+    background_tasks = [
+        asyncio.create_task(redis.listen()),
+        asyncio.create_task(revocation_cache.run_periodic_sync()),
+        asyncio.create_task(outbox_dispatcher.run()),
+    ]
+    scheduler.start()
+    yield
+    scheduler.shutdown(wait=False)
+    for task in background_tasks:
+        task.cancel()
+    hashing_pool.shutdown()
+
 
 version = 'v1'
 app = FastAPI(
     title="Money transfer",
     version=version,
-    root_path="/api"
+    root_path="/api",
+    lifespan=lifespan
 )
 
 app.mount("/static", StaticFiles(directory='static'), name="static")
@@ -20,7 +47,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
+app.add_middleware(IdempotencyMiddleware)
+app.add_exception_handler(IdempotentReplay, replay_handler)
 
 app.include_router(healthcheck.router, tags=['Health Check'])
 app.include_router(currency.router, prefix=f"/{version}/currency", tags=['Currency'])
@@ -31,8 +61,10 @@ app.include_router(payment_method.router, prefix=f"/{version}/payment-type", tag
 app.include_router(transaction.router, prefix=f"/{version}/transactions", tags=['Transactions'])
 app.include_router(fees.router, prefix=f"/{version}/fees", tags=['Fees'])
 app.include_router(exchange_rates.router, prefix=f"/{version}/exchange-rates", tags=['Exchange Rates'])
+app.include_router(quote.router, prefix=f"/{version}/quotes", tags=['Quotes'])
 app.include_router(faqs.router, prefix=f"/{version}/faqs", tags=["FAQS"])
 app.include_router(user.router, prefix=f"/{version}/users", tags=['Users'])
+app.include_router(stats.router, prefix=f"/{version}/stats", tags=['Stats'])
 
 
 
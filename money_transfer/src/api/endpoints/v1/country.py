@@ -1,17 +1,21 @@
 from typing import List
 
-from fastapi import APIRouter, status, Depends, HTTPException, Response
+from fastapi import APIRouter, status, Depends, HTTPException, Response, Request
 from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.permission import admin_required
-from src.db.models import Country, Currency
+from src.core.catalog_cache import CatalogCache, bump_versions
+from src.db.models import Country, Currency, PaymentType, ReceivingType, Fee
 from src.db.session import get_session
 from src.schemas.currency import CountryModel, CountryCreate, UpdateCountrySchema
+from src.services.fee_engine import fee_engine
 
 router = APIRouter()
 
+countries_catalog = CatalogCache(Country, Currency, PaymentType, ReceivingType)
+
 async def get_country_or_404(
 		country_id: str,
 		session: AsyncSession = Depends(get_session)
@@ -24,17 +28,24 @@ async def get_country_or_404(
 	return country
 
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[CountryModel])
+@router.get(
+	"/", status_code=status.HTTP_200_OK, response_model=List[CountryModel],
+	dependencies=[Depends(countries_catalog)]
+)
 async def get_all_countries(
+		request: Request,
 		session: AsyncSession = Depends(get_session)
 ):
-	stmt = select(Country).options(
-		selectinload(Country.currency),
-		selectinload(Country.payment_types),
-		selectinload(Country.receiving_types)
-	)
-	result = await session.execute(stmt)
-	return result.scalars().all()
+	async def load():
+		stmt = select(Country).options(
+			selectinload(Country.currency),
+			selectinload(Country.payment_types),
+			selectinload(Country.receiving_types)
+		)
+		result = await session.execute(stmt)
+		return result.scalars().all()
+
+	return await countries_catalog.render(request, List[CountryModel], load)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=CountryModel, dependencies=[Depends(admin_required)])
@@ -57,6 +68,8 @@ async def add_country(
 	session.add(country)
 	await session.commit()
 	await session.refresh(country)
+	await bump_versions(Country)
+	await fee_engine.refresh()
 
 
 	stmt = select(Country).options(
@@ -83,6 +96,8 @@ async def update_country(
 	session.add(country)
 	await session.commit()
 	await session.refresh(country)
+	await bump_versions(Country)
+	await fee_engine.refresh()
 	return country
 
 
@@ -93,5 +108,8 @@ async def delete_country(
 ):
 	await session.delete(country)
 	await session.commit()
+	# Types de paiement/réception supprimés en cascade par l'ORM, frais par la base
+	await bump_versions(Country, PaymentType, ReceivingType, Fee)
+	await fee_engine.refresh()
 	return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -1,18 +1,22 @@
 import uuid
 from typing import List
 
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, status, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy_utils import Currency as CurrencyType
 from sqlmodel import select
 
 from src.auth.permission import admin_required
+from src.core.catalog_cache import CatalogCache, bump_versions
 from src.db.models import Currency
 from src.db.session import get_session
 from src.schemas.currency import CurrencyModel, CurrencyCreate
+from src.services.rate_engine import rate_engine
 
 router = APIRouter()
 
+currencies_catalog = CatalogCache(Currency)
+
 async def get_or_404_currency(id: uuid.UUID, session: AsyncSession = Depends(get_session)):
 	stmt = select(Currency).where(Currency.id == id)
 	result = await session.execute(stmt)
@@ -37,16 +41,25 @@ async def create_currency(
 
 	session.add(currency)
 	await session.commit()
+	await rate_engine.refresh()
+	await bump_versions(Currency)
 	return currency
 
 
-@router.get("/currencies/", response_model=List[Currency], status_code=status.HTTP_200_OK)
+@router.get(
+	"/currencies/", response_model=List[Currency], status_code=status.HTTP_200_OK,
+	dependencies=[Depends(currencies_catalog)]
+)
 async def get_all_currencies(
+		request: Request,
 		session: AsyncSession = Depends(get_session)
 ):
-	stmt = select(Currency)
-	result = await session.execute(stmt)
-	return result.scalars().all()
+	async def load():
+		stmt = select(Currency)
+		result = await session.execute(stmt)
+		return result.scalars().all()
+
+	return await currencies_catalog.render(request, List[Currency], load)
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -56,6 +69,8 @@ async def delete_currency(
 ):
 	await session.delete(currency)
 	await session.commit()
+	await rate_engine.refresh()
+	await bump_versions(Currency)
 	return {'message': "Devise supprimé avec succès"}
 
 
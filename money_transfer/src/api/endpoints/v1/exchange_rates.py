@@ -1,19 +1,26 @@
 import uuid
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, status, HTTPException, Depends, Response
+from fastapi import APIRouter, status, HTTPException, Depends, Response, Query, Request
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import aliased
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.permission import admin_required
-from src.db.models import ExchangeRates, Country, Currency
+from src.core.catalog_cache import CatalogCache, bump_versions
+from src.db.models import ExchangeRates, Country, Currency, ExchangeRateHistory
 from src.db.session import get_session
-from src.schemas.rates import CreateExchangeRate, ExchangeRateRead, UpdateExchangeRate, ExchangeRateWithCurrencyCode
+from src.schemas.rates import CreateExchangeRate, ExchangeRateRead, UpdateExchangeRate, ExchangeRateWithCurrencyCode, \
+	BatchConvertRequest, ConvertResult, ExchangeRateHistoryRead, BulkExchangeRateRequest
+from src.services.rate_engine import rate_engine, RateMatrix
 
 router = APIRouter()
 
+exchange_rates_catalog = CatalogCache(ExchangeRates, Currency)
+
 async def get_exchange_rate_or_404(id: uuid.UUID, session: AsyncSession = Depends(get_session)):
 	stmt = select(ExchangeRates).where(ExchangeRates.id == id)
 	result = await session.execute(stmt)
@@ -44,10 +51,49 @@ async def create_exchange_rate(
 	session.add(exchange_rate)
 	await session.commit()
 	await session.refresh(exchange_rate)
+	await rate_engine.refresh()
+	await bump_versions(ExchangeRates)
 
 	return {"message": "Exchange was successfully added! 🎉"}
 
 
+@router.post("/bulk", status_code=status.HTTP_200_OK, dependencies=[Depends(admin_required)])
+async def upsert_exchange_rates(data: BulkExchangeRateRequest, session: AsyncSession = Depends(get_session)):
+	"""
+	Crée ou met à jour plusieurs paires en une seule instruction et une seule transaction.
+	Pour une paire répétée dans le lot, la dernière valeur l'emporte.
+	"""
+	rates = {(item.from_currency_id, item.to_currency_id): item.rate for item in data.items}
+
+	currency_ids = {currency_id for pair in rates for currency_id in pair}
+	result = await session.execute(select(Currency.id).where(Currency.id.in_(currency_ids)))
+	missing = currency_ids - set(result.scalars().all())
+	if missing:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail=f"Currencies not found: {', '.join(sorted(str(currency_id) for currency_id in missing))}"
+		)
+
+	stmt = insert(ExchangeRates).values([
+		{"id": uuid.uuid4(), "from_currency_id": from_id, "to_currency_id": to_id, "rate": rate}
+		for (from_id, to_id), rate in rates.items()
+	])
+	stmt = stmt.on_conflict_do_update(
+		constraint="unique_currency_pair",
+		set_={"rate": stmt.excluded.rate},
+		where=ExchangeRates.rate.is_distinct_from(stmt.excluded.rate)
+	).returning(ExchangeRates.id)
+	result = await session.execute(stmt)
+	changed = len(result.all())
+	await session.commit()
+	if changed:
+		# Une seule reconstruction de la matrice (et un seul message pub/sub) pour tout le lot
+		await rate_engine.refresh()
+		await bump_versions(ExchangeRates)
+
+	return {"message": "Exchange rates successfully saved! 🎉", "received": len(rates), "changed": changed}
+
+
 @router.get("/", status_code=status.HTTP_200_OK, response_model=List[ExchangeRateRead])
 async def get_exchange_rates(session: AsyncSession = Depends(get_session)):
 	stmt = select(ExchangeRates).order_by(ExchangeRates.id)
@@ -56,36 +102,93 @@ async def get_exchange_rates(session: AsyncSession = Depends(get_session)):
 
 
 
-@router.get("/all-with-currency-code", status_code=status.HTTP_200_OK, response_model=List[ExchangeRateWithCurrencyCode])
-async def get_all_rate_with_currency_codes(session: AsyncSession = Depends(get_session)):
+@router.get(
+	"/all-with-currency-code", status_code=status.HTTP_200_OK, response_model=List[ExchangeRateWithCurrencyCode],
+	dependencies=[Depends(exchange_rates_catalog)]
+)
+async def get_all_rate_with_currency_codes(request: Request, session: AsyncSession = Depends(get_session)):
+
+	async def load():
+		# Creer des allias
+		FromCurrency = aliased(Currency)
+		ToCurrency = aliased(Currency)
+
+		# Construction de la requête avec jointures
+		# noinspection PyTypeChecker
+		query = (
+			select(
+				ExchangeRates.rate,
+				FromCurrency.code.label("from_currency"),
+				ToCurrency.code.label("to_currency")
+			)
+			.join(FromCurrency, ExchangeRates.from_currency_id == FromCurrency.id)
+			.join(ToCurrency, ExchangeRates.to_currency_id == ToCurrency.id)
+		)
+
+		results = await session.execute(query)
+		return results.all()
+
+	return await exchange_rates_catalog.render(request, List[ExchangeRateWithCurrencyCode], load)
 
-	# Creer des allias
+
+def rate_history_query(from_currency: str, to_currency: str):
 	FromCurrency = aliased(Currency)
 	ToCurrency = aliased(Currency)
-
-	# Construction de la requête avec jointures
 	# noinspection PyTypeChecker
-	query = (
+	return (
 		select(
-			ExchangeRates.rate,
 			FromCurrency.code.label("from_currency"),
-			ToCurrency.code.label("to_currency")
+			ToCurrency.code.label("to_currency"),
+			ExchangeRateHistory.rate,
+			ExchangeRateHistory.valid_from
 		)
-		.join(FromCurrency, ExchangeRates.from_currency_id == FromCurrency.id)
-		.join(ToCurrency, ExchangeRates.to_currency_id == ToCurrency.id)
+		.join(FromCurrency, ExchangeRateHistory.from_currency_id == FromCurrency.id)
+		.join(ToCurrency, ExchangeRateHistory.to_currency_id == ToCurrency.id)
+		.where(FromCurrency.code == from_currency.upper(), ToCurrency.code == to_currency.upper())
 	)
 
-	results = await session.execute(query)
-	rates_data = results.all()
-	# Transformation des résultats
-	return [
-		{
-			"from_currency": row.from_currency,
-			"to_currency": row.to_currency,
-			"rate": row.rate
-		}
-		for row in rates_data
-	]
+
+@router.get("/history/as-of", status_code=status.HTTP_200_OK, response_model=ExchangeRateHistoryRead)
+async def get_rate_as_of(
+		from_currency: str,
+		to_currency: str,
+		at: Optional[datetime] = None,
+		session: AsyncSession = Depends(get_session)
+):
+	"""Taux en vigueur pour une paire à une date donnée (par défaut : maintenant)."""
+	at = at or datetime.now(timezone.utc)
+	stmt = rate_history_query(from_currency, to_currency) \
+		.where(ExchangeRateHistory.valid_from <= at) \
+		.order_by(ExchangeRateHistory.valid_from.desc(), ExchangeRateHistory.id.desc()) \
+		.limit(1)
+	result = await session.execute(stmt)
+	row = result.first()
+	if not row or row.rate is None:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail=f"No exchange rate found from {from_currency.upper()} to {to_currency.upper()} at {at.isoformat()}."
+		)
+	return row._asdict()
+
+
+@router.get("/history", status_code=status.HTTP_200_OK, response_model=List[ExchangeRateHistoryRead])
+async def get_rate_history(
+		from_currency: str,
+		to_currency: str,
+		start: Optional[datetime] = None,
+		end: Optional[datetime] = None,
+		limit: int = Query(500, ge=1, le=5000),
+		session: AsyncSession = Depends(get_session)
+):
+	stmt = rate_history_query(from_currency, to_currency)
+	if start:
+		stmt = stmt.where(ExchangeRateHistory.valid_from >= start)
+	if end:
+		stmt = stmt.where(ExchangeRateHistory.valid_from <= end)
+	# valid_from vaut now() pour toutes les modifications d'une même transaction : id les départage
+	stmt = stmt.order_by(ExchangeRateHistory.valid_from, ExchangeRateHistory.id).limit(limit)
+	result = await session.execute(stmt)
+	return [row._asdict() for row in result.all()]
 
 
 @router.patch("/{id}", status_code=status.HTTP_200_OK, response_model=ExchangeRateRead, dependencies=[Depends(admin_required)])
@@ -99,6 +202,8 @@ async def update_exchange_rate(
 		setattr(exchange_rate, key, value)
 	await session.commit()
 	await session.refresh(exchange_rate)
+	await rate_engine.refresh()
+	await bump_versions(ExchangeRates)
 
 	return exchange_rate
 
@@ -110,16 +215,12 @@ async def delete_exchange_rate(
 ):
 	await session.delete(exchange_rate)
 	await session.commit()
+	await rate_engine.refresh()
+	await bump_versions(ExchangeRates)
 	return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@router.get("/convert", status_code=status.HTTP_200_OK)
-async def convert_currency(
-		from_currency: str,
-		to_currency: str,
-		amount: Decimal,
-		session: AsyncSession = Depends(get_session)
-):
+def compute_conversion(matrix: RateMatrix, from_currency: str, to_currency: str, amount: Decimal) -> dict:
 	if amount <= 0:
 		raise HTTPException(
 			status_code=status.HTTP_400_BAD_REQUEST,
@@ -129,48 +230,56 @@ async def convert_currency(
 	from_currency_upper = from_currency.upper()
 	to_currency_upper = to_currency.upper()
 
-	# Check if from_currency exists
-	from_currency_result = await session.execute(
-		select(Currency).where(Currency.code == from_currency_upper)
-	)
-	from_currency_db = from_currency_result.scalar_one_or_none()
-	if not from_currency_db:
-		raise HTTPException(
-			status_code=status.HTTP_404_NOT_FOUND,
-			detail=f"Currency with code {from_currency_upper} not found."
-		)
-
-	# Check if to_currency exists
-	to_currency_result = await session.execute(
-		select(Currency).where(Currency.code == to_currency_upper)
-	)
-	to_currency_db = to_currency_result.scalar_one_or_none()
-	if not to_currency_db:
-		raise HTTPException(
-			status_code=status.HTTP_404_NOT_FOUND,
-			detail=f"Currency with code {to_currency_upper} not found."
-		)
+	for code in (from_currency_upper, to_currency_upper):
+		if code not in matrix:
+			raise HTTPException(
+				status_code=status.HTTP_404_NOT_FOUND,
+				detail=f"Currency with code {code} not found."
+			)
 
-	# Check exchange rate
-	exchange_rate_result = await session.execute(
-		select(ExchangeRates).where(
-			ExchangeRates.from_currency_id == from_currency_db.id,
-			ExchangeRates.to_currency_id == to_currency_db.id
-		)
-	)
-	exchange_rate = exchange_rate_result.scalar_one_or_none()
-	if not exchange_rate:
+	rate = matrix.rate(from_currency_upper, to_currency_upper)
+	if rate is None:
 		raise HTTPException(
 			status_code=status.HTTP_404_NOT_FOUND,
 			detail=f"No exchange rate found from {from_currency_upper} to {to_currency_upper}."
 		)
 
-	converted_amount = amount * exchange_rate.rate
-
+	path = matrix.path(from_currency_upper, to_currency_upper)
 	return {
 		"from_currency": from_currency_upper,
 		"to_currency": to_currency_upper,
 		"original_amount": amount,
-		"converted_amount": converted_amount,
-		"rate": exchange_rate.rate
-	}
\ No newline at end of file
+		"converted_amount": amount * rate,
+		"rate": rate,
+		"rate_type": "direct" if len(path) == 2 else "derived",
+		"path": list(path)
+	}
+
+
+@router.get("/convert", status_code=status.HTTP_200_OK)
+async def convert_currency(
+		from_currency: str,
+		to_currency: str,
+		amount: Decimal
+):
+	# Conversion servie par la matrice en mémoire, sans requête SQL
+	matrix = await rate_engine.get_matrix()
+	return compute_conversion(matrix, from_currency, to_currency, amount)
+
+
+@router.post("/convert/batch", status_code=status.HTTP_200_OK, response_model=List[ConvertResult])
+async def convert_currency_batch(data: BatchConvertRequest):
+	"""Convertit plusieurs montants en un appel ; les erreurs sont rapportées élément par élément, dans l'ordre."""
+	matrix = await rate_engine.get_matrix()
+	results = []
+	for item in data.items:
+		try:
+			results.append(compute_conversion(matrix, item.from_currency, item.to_currency, item.amount))
+		except HTTPException as e:
+			results.append({
+				"from_currency": item.from_currency.upper(),
+				"to_currency": item.to_currency.upper(),
+				"original_amount": item.amount,
+				"error": e.detail
+			})
+	return results
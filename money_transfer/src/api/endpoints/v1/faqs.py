@@ -1,17 +1,20 @@
 import uuid
 from typing import List
 
-from fastapi import APIRouter, status, HTTPException, Depends
+from fastapi import APIRouter, status, HTTPException, Depends, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from src.auth.permission import admin_required
+from src.core.catalog_cache import CatalogCache, bump_versions
 from src.db.models import FAQs
 from src.db.session import get_session
 from src.schemas.faqs import CreateFAQ, ReadFAQ
 
 router = APIRouter()
 
+faqs_catalog = CatalogCache(FAQs)
+
 
 async def get_faq_or_404(id: uuid.UUID, session: AsyncSession = Depends(get_session)):
 	stmt = select(FAQs).where(FAQs.id == id)
@@ -33,16 +36,19 @@ async def create_faq(
 	session.add(faq)
 	await session.commit()
 	await session.refresh(faq)
+	await bump_versions(FAQs)
 
 	return faq
 
 
-@router.get('/', status_code=status.HTTP_200_OK, response_model=List[ReadFAQ])
-async def get_faqs(session: AsyncSession = Depends(get_session)):
-	stmt = select(FAQs);
-	results = await session.execute(stmt)
-	faqs = results.scalars().all()
-	return faqs
+@router.get('/', status_code=status.HTTP_200_OK, response_model=List[ReadFAQ], dependencies=[Depends(faqs_catalog)])
+async def get_faqs(request: Request, session: AsyncSession = Depends(get_session)):
+	async def load():
+		stmt = select(FAQs)
+		results = await session.execute(stmt)
+		return results.scalars().all()
+
+	return await faqs_catalog.render(request, List[ReadFAQ], load)
 
 
 @router.get("/{id}", status_code=status.HTTP_200_OK, response_model=ReadFAQ)
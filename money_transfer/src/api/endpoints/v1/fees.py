@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
@@ -7,12 +7,16 @@ from typing import List
 from sqlalchemy.orm import aliased
 
 from src.auth.permission import admin_required
+from src.core.catalog_cache import CatalogCache, bump_versions
 from src.db.models import Fee, Country
 from src.db.session import get_session
 from src.schemas.fees import FeeView, CreateFee, UpdateFee, FeeWithCountryName
+from src.services.fee_engine import fee_engine
 
 router = APIRouter()
 
+fees_catalog = CatalogCache(Fee, Country)
+
 
 @router.post("/", response_model=FeeView, status_code=status.HTTP_201_CREATED, dependencies=[Depends(admin_required)])
 async def create_fee(fee_data: CreateFee, session: AsyncSession = Depends(get_session)):
@@ -33,6 +37,8 @@ async def create_fee(fee_data: CreateFee, session: AsyncSession = Depends(get_se
 	session.add(fee)
 	await session.commit()
 	await session.refresh(fee)
+	await bump_versions(Fee)
+	await fee_engine.refresh()
 	return fee
 
 
@@ -44,36 +50,31 @@ async def get_all_fees(session: AsyncSession = Depends(get_session)):
 
 
 
-@router.get("/all-with-names", status_code=status.HTTP_200_OK, response_model=List[FeeWithCountryName])
-async def get_all_fees_with_country_name(session: AsyncSession = Depends(get_session)):
+@router.get(
+	"/all-with-names", status_code=status.HTTP_200_OK, response_model=List[FeeWithCountryName],
+	dependencies=[Depends(fees_catalog)]
+)
+async def get_all_fees_with_country_name(request: Request, session: AsyncSession = Depends(get_session)):
 
-	FromCountry = aliased(Country)
-	ToCountry = aliased(Country)
+	async def load():
+		FromCountry = aliased(Country)
+		ToCountry = aliased(Country)
 
-	# Construction de la requête avec jointures
-	query = (
-		select(
-			Fee.fee,
-			FromCountry.name.label("from_country"),
-			ToCountry.name.label("to_country")
+		# Construction de la requête avec jointures
+		query = (
+			select(
+				Fee.fee,
+				FromCountry.name.label("from_country"),
+				ToCountry.name.label("to_country")
+			)
+			.join(FromCountry, Fee.from_country_id == FromCountry.id)
+			.join(ToCountry, Fee.to_country_id == ToCountry.id)
 		)
-		.join(FromCountry, Fee.from_country_id == FromCountry.id)
-		.join(ToCountry, Fee.to_country_id == ToCountry.id)
-	)
-
-	result = await session.execute(query)
 
-	fees_data = result.all()
+		result = await session.execute(query)
+		return result.all()
 
-	# Transformation des résultats
-	return [
-		{
-			"from_country": row.from_country,
-			"to_country": row.to_country,
-			"fee": row.fee
-		}
-		for row in fees_data
-	]
+	return await fees_catalog.render(request, List[FeeWithCountryName], load)
 
 
 
@@ -122,6 +123,8 @@ async def update_fee(id: UUID, fee_data: UpdateFee, session: AsyncSession = Depe
 	fee.fee = fee_data.fee
 	await session.commit()
 	await session.refresh(fee)
+	await bump_versions(Fee)
+	await fee_engine.refresh()
 	return fee
 
 
@@ -134,4 +137,6 @@ async def delete_fee(id: UUID, session: AsyncSession = Depends(get_session)):
 
 	await session.delete(fee)
 	await session.commit()
+	await bump_versions(Fee)
+	await fee_engine.refresh()
 
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, status, Depends, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from sqlalchemy import text
 
@@ -21,4 +22,9 @@ async def healthcheck(session: AsyncSession = Depends(get_session)):
 		result.fetchone()
 		return {"status": "Healthy", "dependencies": {"database": "Healthy"}}
 	except Exception as e:
-		return {"status": "Degraded", "dependencies": {"database": "Unhealthy: " + str(e)}}
\ No newline at end of file
+		return {"status": "Degraded", "dependencies": {"database": "Unhealthy: " + str(e)}}
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+	return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
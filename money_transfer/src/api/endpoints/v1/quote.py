@@ -0,0 +1,103 @@
+import uuid
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+from fastapi import APIRouter, status, HTTPException, Query, Depends
+
+from src.auth.dependances import get_current_principal
+from src.schemas.quote import QuoteRead, QuoteRequest, LockedQuoteRead
+from src.schemas.user import UserRead
+from src.services.fee_engine import Corridor, fee_engine
+from src.services.quote_lock import lock_quote
+from src.services.rate_engine import rate_engine, RateMatrix
+
+router = APIRouter()
+
+# Précision du registre : montants et frais des transactions sont des entiers en unités de la
+# devise (Transaction.sender_amount, fee_amount, receiver_amount), pour toutes les devises
+LEDGER_UNIT = Decimal(1)
+
+
+def compute_quote(corridor: Corridor, matrix: RateMatrix, amount: Decimal, include_fee: bool) -> dict:
+	"""
+	Frais en pourcentage du montant envoyé, arrondis à l'unité.
+	Frais inclus : ils sont prélevés sur le montant, sinon ils s'y ajoutent.
+	Le montant reçu est arrondi à l'unité inférieure.
+
+	L'arrondi se fait à LEDGER_UNIT et non à la subdivision de la devise (centimes d'euro) :
+	le devis est enregistré tel quel par create_transaction, dans des colonnes entières. Un
+	devis au centime y serait tronqué et le client ne paierait pas le montant annoncé.
+	"""
+	for code in (corridor.from_currency, corridor.to_currency):
+		if code not in matrix:
+			raise HTTPException(
+				status_code=status.HTTP_404_NOT_FOUND,
+				detail=f"Currency with code {code} not found."
+			)
+	rate = matrix.rate(corridor.from_currency, corridor.to_currency)
+	if rate is None:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail=f"No exchange rate found from {corridor.from_currency} to {corridor.to_currency}."
+		)
+
+	fee_amount = (amount * corridor.fee_percent / 100).quantize(LEDGER_UNIT, rounding=ROUND_HALF_UP)
+	converted = amount - fee_amount if include_fee else amount
+	total_amount = amount if include_fee else amount + fee_amount
+	if converted <= 0:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="Le montant ne couvre pas les frais."
+		)
+
+	return {
+		"from_country": corridor.from_country,
+		"to_country": corridor.to_country,
+		"send_currency": corridor.from_currency,
+		"receive_currency": corridor.to_currency,
+		"include_fee": include_fee,
+		"send_amount": amount,
+		"fee_percent": corridor.fee_percent,
+		"fee_amount": fee_amount,
+		"total_amount": total_amount,
+		"rate": rate,
+		"rate_type": "direct" if len(matrix.path(corridor.from_currency, corridor.to_currency)) == 2 else "derived",
+		"receive_amount": (converted * rate).quantize(LEDGER_UNIT, rounding=ROUND_DOWN),
+	}
+
+
+async def quote_corridor(from_country_id: uuid.UUID, to_country_id: uuid.UUID, amount: Decimal, include_fee: bool) -> dict:
+	corridor = await fee_engine.get_corridor(from_country_id, to_country_id)
+	if corridor is None:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Aucun frais trouvé pour cette paire de pays"
+		)
+	if not corridor.can_send:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=f"Les envois depuis {corridor.from_country} ne sont pas disponibles."
+		)
+	matrix = await rate_engine.get_matrix()
+	return compute_quote(corridor, matrix, amount, include_fee)
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=QuoteRead)
+async def get_quote(
+		from_country_id: uuid.UUID,
+		to_country_id: uuid.UUID,
+		amount: int = Query(..., gt=0),
+		include_fee: bool = False
+):
+	"""Frais, taux et montant reçu pour un corridor, calculés en mémoire sans requête SQL."""
+	return await quote_corridor(from_country_id, to_country_id, Decimal(amount), include_fee)
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=LockedQuoteRead)
+async def lock_corridor_quote(
+		data: QuoteRequest,
+		user: UserRead = Depends(get_current_principal)
+):
+	"""Devis réservé à l'utilisateur pendant QUOTE_TTL_SECONDS, à passer en `quote_id` à POST /transactions/."""
+	quote = await quote_corridor(data.from_country_id, data.to_country_id, Decimal(data.amount), data.include_fee)
+	quote_id, expires_at = await lock_quote(quote, user.id)
+	return {**quote, "quote_id": quote_id, "expires_at": expires_at}
@@ -3,6 +3,7 @@ from typing import Dict, Any, List
 
 from fastapi import APIRouter, status, Path
 from fastapi.params import Depends
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import aliased
 from sqlmodel import select
@@ -41,16 +42,18 @@ async def convert(amount: Decimal, rate: Rates = Depends(get_rate)):
 
 @router.post("/rate", status_code=status.HTTP_200_OK)
 async def add_rate(data: RateRequest, session: AsyncSession = Depends(get_session)):
-	for currency, rate in data.conversion_rates.items():
-		query = select(Rate).where(Rate.currency == currency)
-		result = await session.execute(query)
-		existing_rate = result.scalar_one_or_none()
-		if existing_rate:
-			existing_rate.rate = rate
-		else:
-			rates = Rate(currency=currency, rate=rate)
-			session.add(rates)
-	await session.commit()
+	if data.conversion_rates:
+		# Un seul INSERT ... ON CONFLICT pour tout le flux du fournisseur
+		stmt = insert(Rate).values([
+			{"currency": currency, "rate": rate} for currency, rate in data.conversion_rates.items()
+		])
+		stmt = stmt.on_conflict_do_update(
+			constraint="unique_rate_currency",
+			set_={"rate": stmt.excluded.rate},
+			where=Rate.rate.is_distinct_from(stmt.excluded.rate)
+		)
+		await session.execute(stmt)
+		await session.commit()
 	return {"message": "Rate successfully added ☺️"}
 
 
@@ -1,17 +1,20 @@
 import uuid
 from typing import List
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, status, HTTPException, Request
 from fastapi.params import Depends
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.permission import admin_required
+from src.core.catalog_cache import CatalogCache, bump_versions
 from src.db.models import ReceivingType
 from src.db.session import get_session
 from src.schemas.rtype import ReceivingTypeRead, ReceivingTypeCreate, ReceivingTypeUpdate
 
 router = APIRouter()
 
+receiving_types_catalog = CatalogCache(ReceivingType)
+
 async def get_receiving_type_or_404(id: uuid.UUID, session: AsyncSession = Depends(get_session)):
 	stmt = select(ReceivingType).where(ReceivingType.id == id)
 	result = await session.execute(stmt)
@@ -29,14 +32,20 @@ async def type_create(
 	session.add(type)
 	await session.commit()
 	await session.refresh(type)
+	await bump_versions(ReceivingType)
 	return type
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[ReceivingTypeRead])
-async def get_receiving_types(session: AsyncSession = Depends(get_session)):
-	stmt = select(ReceivingType)
-	results = await session.execute(stmt)
-	receiving_types = results.scalars().all()
-	return receiving_types
+@router.get(
+	"/", status_code=status.HTTP_200_OK, response_model=List[ReceivingTypeRead],
+	dependencies=[Depends(receiving_types_catalog)]
+)
+async def get_receiving_types(request: Request, session: AsyncSession = Depends(get_session)):
+	async def load():
+		stmt = select(ReceivingType)
+		results = await session.execute(stmt)
+		return results.scalars().all()
+
+	return await receiving_types_catalog.render(request, List[ReceivingTypeRead], load)
 
 
 @router.get("/{id}", response_model=ReceivingTypeRead, status_code=status.HTTP_200_OK)
@@ -58,6 +67,7 @@ async def update_type(
 	session.add(receiving_type)
 	await session.commit()
 	await session.refresh(receiving_type)
+	await bump_versions(ReceivingType)
 	return receiving_type
 
 
@@ -68,4 +78,5 @@ async def delete_receiving_type(
 ) -> dict:
 	await session.delete(type_receiving)
 	await session.commit()
+	await bump_versions(ReceivingType)
 	return {"message": "Type de réception supprimé avec succès"}
\ No newline at end of file
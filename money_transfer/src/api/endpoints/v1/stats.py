@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from src.auth.permission import admin_required
+from src.db.models import TransactionDailyStats
+from src.db.session import get_session
+from src.schemas.stats import StatsDimension, TransactionStatsRead, TransactionStatsRow
+
+router = APIRouter()
+
+# Au plus 366 jours : le coût dépend de la période demandée, pas de l'historique
+MAX_PERIOD_DAYS = 366
+DEFAULT_PERIOD_DAYS = 30
+
+
+@router.get("/transactions", response_model=TransactionStatsRead, response_model_exclude_none=True, dependencies=[Depends(admin_required)])
+async def transaction_stats(
+	start_date: Optional[date] = None,
+	end_date: Optional[date] = None,
+	group_by: List[StatsDimension] = Query([StatsDimension.DAY]),
+	sender_country: Optional[str] = None,
+	receiver_country: Optional[str] = None,
+	currency: Optional[str] = None,
+	status_filter: Optional[str] = Query(None, alias="status"),
+	session: AsyncSession = Depends(get_session)
+):
+	"""
+	Volumes et montants par jour (UTC), corridor, devise et statut, lus uniquement dans
+	transaction_daily_stats. `currency` filtre la devise d'envoi ; `status` accepte une liste
+	séparée par des virgules, comme la recherche.
+	"""
+	end_date = end_date or datetime.now(timezone.utc).date()
+	start_date = start_date or end_date - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+	if start_date > end_date:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="La date de début doit précéder la date de fin"
+		)
+	if (end_date - start_date).days >= MAX_PERIOD_DAYS:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=f"La période ne peut pas dépasser {MAX_PERIOD_DAYS} jours"
+		)
+
+	dimensions = list(dict.fromkeys(group_by))
+	columns = [getattr(TransactionDailyStats, dimension.value) for dimension in dimensions]
+	stmt = (
+		select(
+			*columns,
+			func.sum(TransactionDailyStats.count).label("count"),
+			func.sum(TransactionDailyStats.sender_amount).label("sender_amount"),
+			func.sum(TransactionDailyStats.receiver_amount).label("receiver_amount"),
+			func.sum(TransactionDailyStats.fee_amount).label("fee_amount"),
+		)
+		.where(TransactionDailyStats.day.between(start_date, end_date))
+		.group_by(*columns)
+		.having(func.sum(TransactionDailyStats.count) != 0)
+		.order_by(*columns)
+	)
+	if sender_country:
+		stmt = stmt.where(TransactionDailyStats.sender_country == sender_country)
+	if receiver_country:
+		stmt = stmt.where(TransactionDailyStats.receiver_country == receiver_country)
+	if currency:
+		stmt = stmt.where(TransactionDailyStats.sender_currency == currency)
+	if status_filter:
+		statuses = [value.strip() for value in status_filter.split(",") if value.strip()]
+		stmt = stmt.where(TransactionDailyStats.status.in_(statuses))
+
+	rows = (await session.execute(stmt)).mappings().all()
+	return TransactionStatsRead(
+		start_date=start_date,
+		end_date=end_date,
+		group_by=dimensions,
+		rows=[TransactionStatsRow(**row) for row in rows]
+	)
@@ -1,28 +1,42 @@
 import os
 import uuid
-from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import List, Optional, Annotated
 
 import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from fastapi import APIRouter, status, HTTPException, Depends, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, status, HTTPException, Depends, BackgroundTasks, WebSocket, Response, Query
 from fastapi_mail import ConnectionConfig, MessageSchema, FastMail
-from sqlalchemy import or_
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from sqlmodel import select
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 
-from src.auth.dependances import get_current_user
+from src.auth.dependances import WebSocketCredentials, get_current_principal, get_websocket_credentials
 from src.auth.permission import agent_or_admin_required, admin_required
 from src.config import settings
-from src.db.models import Transaction, TransactionStatus, User
+from src.core.idempotency import transaction_idempotency
+from src.db.models import Transaction, TransactionStatus
 from src.db.session import get_session
 from src.schemas.notifications import Notification, NotificationResponse, NotificationSchema, NotificationCreate, PromotionNotification
-from src.schemas.transaction import TransactionRead, TransactionCreate, TransactionUpdate, EmailRequest, EmailSchema
+from src.schemas.user import UserRead
+from src.schemas.transaction import TransactionRead, TransactionCreate, TransactionUpdate, EmailRequest, EmailSchema, \
+    BulkStatusUpdate, BulkStatusUpdateResult, StatusChangeResult
+from src.services.quote_lock import claim_quote
+from src.services import outbox
+from src.services.outbox import outbox_dispatcher
+from src.services.reference_allocator import reference_allocator
+from src.services import transaction_export
+from src.services.transaction_export import ExportFormat, export_filename, media_type
+from src.services.websocket_hub import ADMIN_PENDING_TOPIC, corridor_topic, transaction_hub, transaction_topics, \
+    user_topic
+from src.services.transaction_search import TransactionFilters, search_page
 from src.firebase import messaging
-from src.utils.email_utils import send_transaction_email
-from src.utils.notification_utils import send_notification, send_one_signal_notification, get_player_ids_for_users
+from src.utils.notification_utils import send_notification, get_player_ids_for_users
+from src.utils.pagination import MAX_PAGE_SIZE, paginate
+from src.utils.utils import STATUS_TRANSITIONS
 
 import logging
 
@@ -31,24 +45,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
-
-manager = ConnectionManager()
-
-
 async def get_transaction_or_404(id: uuid.UUID, session: AsyncSession = Depends(get_session)):
     stmt = select(Transaction).options(selectinload(Transaction.sender)).where(Transaction.id == id)
     result = await session.execute(stmt)
@@ -56,65 +52,90 @@ async def get_transaction_or_404(id: uuid.UUID, session: AsyncSession = Depends(
     return transaction
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=TransactionRead)
+@router.post(
+    "/", status_code=status.HTTP_201_CREATED, response_model=TransactionRead,
+    dependencies=[Depends(transaction_idempotency)]
+)
 async def create_transaction(
         transaction_data: TransactionCreate,
-        sender: User = Depends(get_current_user),
+        sender: UserRead = Depends(get_current_principal),
         session: AsyncSession = Depends(get_session)
 ):
-    transaction = Transaction(**transaction_data.dict(), sender_id=sender.id)
-    session.add(transaction)
-    await session.commit()
-    await session.refresh(transaction)
+    data = transaction_data.model_dump(exclude={"quote_id"})
+    # Devis supprimé seulement après le commit : si l'insertion échoue, il reste utilisable
+    async with claim_quote(transaction_data.quote_id, sender.id) as quote:
+        if quote:
+            # Montants du devis verrouillé : une lecture Redis, aucun recalcul de taux ni de frais
+            data.update(
+                sender_country=quote["from_country"],
+                sender_currency=quote["send_currency"],
+                sender_amount=int(Decimal(quote["send_amount"])),
+                receiver_country=quote["to_country"],
+                receiver_currency=quote["receive_currency"],
+                receiver_amount=int(Decimal(quote["receive_amount"])),
+                conversion_rate=Decimal(quote["rate"]),
+                include_fee=quote["include_fee"],
+                fee_amount=int(Decimal(quote["fee_amount"])),
+            )
+        transaction = Transaction(**data, sender_id=sender.id, reference=await reference_allocator.allocate())
+        session.add(transaction)
+        await session.flush()
 
-    #Envoyer la notification
-    await manager.broadcast({
-        "type": "NEW_TRANSACTION",
-        "data": {
+        # Notification websocket et email livrés par l'outbox, enregistrés avec la transaction
+        outbox.enqueue(session, "NEW_TRANSACTION", {
             "id": str(transaction.id),
             "reference": transaction.reference,
             "amount": float(transaction.sender_amount),
             "currency": transaction.sender_currency,
             "status": transaction.status
-        }
-    })
+        }, outbox.WEBSOCKET, topics=transaction_topics(
+            transaction.sender_id, transaction.sender_country, transaction.receiver_country, transaction.status
+        ))
+        outbox.enqueue(session, "NEW_TRANSACTION", {"transaction_id": str(transaction.id)}, outbox.EMAIL)
+        await session.commit()
+    await session.refresh(transaction)
+    outbox_dispatcher.wake()
 
-    send_transaction_email.delay(transaction.id)
-    return transaction
+    # L'expéditeur vient du cache d'identité : il n'est pas dans la session
+    columns = {column.name: getattr(transaction, column.name) for column in Transaction.__table__.columns}
+    return TransactionRead(**columns, sender=sender)
 
 
 @router.websocket("/ws/transactions")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
+async def websocket_endpoint(websocket: WebSocket, credentials: WebSocketCredentials = Depends(get_websocket_credentials)):
+    """
+    Événements des transactions (voir src/services/websocket_hub.py). Abonné d'office à ses
+    propres transactions ; {"action": "subscribe", "topics": [...]} pour les autres sujets.
+    """
+    await transaction_hub.serve(websocket, credentials.principal, credentials.token_digest, credentials.expires_at)
 
 @router.get("/", response_model=List[TransactionRead])
 async def get_transactions(
+        response: Response,
         status: Optional[TransactionStatus] = None,
-        page: int = 1,
-        limit: int = 100,
+        page: int = Query(1, ge=1),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
         session: AsyncSession = Depends(get_session)
 ):
-    stmt = select(Transaction).options(selectinload(Transaction.sender)).order_by(Transaction.timestamp.desc())
+    stmt = select(Transaction).options(selectinload(Transaction.sender))
 
     if status:
         stmt = stmt.where(Transaction.status == status)
 
-    results = await session.execute(stmt.offset((page-1)*limit).limit(limit))
-    transactions = results.scalars().all()
-    return transactions
+    return await paginate(
+        session, stmt, Transaction.timestamp, Transaction.id, response, limit=limit, cursor=cursor, page=page
+    )
 
 
 @router.get("/me/transactions", status_code=status.HTTP_200_OK, response_model=List[TransactionRead])
 async def get_user_transactions(
-        user: User = Depends(get_current_user),
+        response: Response,
+        user: UserRead = Depends(get_current_principal),
         session: AsyncSession = Depends(get_session),
-        page: int = 1,
-        limit: int = 100,
+        page: int = Query(1, ge=1),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
         status: Optional[TransactionStatus] = None
 ):
 
@@ -126,64 +147,21 @@ async def get_user_transactions(
     if status:
         stmt = stmt.where(Transaction.status == status)
 
-    stmt = stmt.order_by(Transaction.timestamp.desc())\
-            .offset((page - 1) * limit) \
-            .limit(limit)
-    results = await session.execute(stmt)
-    transactions = results.scalars().all()
-
-    return transactions
+    return await paginate(
+        session, stmt, Transaction.timestamp, Transaction.id, response, limit=limit, cursor=cursor, page=page
+    )
 
 
 @router.get("/search")
 async def search_transactions(
-    q: str = None,
-    status: str = None,
-    start_date: str = None,
-    end_date: str = None,
+    response: Response,
+    filters: TransactionFilters = Depends(),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserRead = Depends(get_current_principal)
 ):
-    query = select(Transaction).options(
-        joinedload(Transaction.sender),
-    )
-
-    if q:
-        query = query.where(
-            or_(
-                Transaction.reference.ilike(f"%{q}%"),
-                Transaction.sender.has(User.full_name.ilike(f"%{q}%")),
-                Transaction.sender.has(User.phone.ilike(f"%{q}%")),
-                Transaction.recipient_name.ilike(f"%{q}%"),
-                Transaction.recipient_phone.ilike(f"%{q}%")
-            )
-        )
-
-    if status:
-        query = query.where(Transaction.status == status)
-
-    if start_date:
-        try:
-            start_date = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.where(Transaction.timestamp >= start_date)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="Format de date invalide (utilisez YYYY-MM-DD)"
-            )
-
-    if end_date:
-        try:
-            end_date = datetime.strptime(end_date, "%Y-%m-%d")
-            query = query.where(Transaction.timestamp <= end_date + timedelta(days=1))
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="Format de date invalide (utilisez YYYY-MM-DD)"
-            )
-
-    result = await session.execute(query)
-    transactions = result.scalars().all()
+    transactions = await search_page(session, filters, response, limit=limit, cursor=cursor)
 
     return [{
         "id": str(transaction.id),
@@ -204,6 +182,21 @@ async def search_transactions(
     } for transaction in transactions]
 
 
+@router.get("/export", dependencies=[Depends(admin_required)])
+async def export_transactions(
+    filters: TransactionFilters = Depends(),
+    format: ExportFormat = "csv",
+    gzip: bool = False
+):
+    """Toutes les transactions correspondant aux filtres de la recherche, envoyées au fil de la lecture."""
+    filename = export_filename(format, gzip)
+    return StreamingResponse(
+        transaction_export.export_transactions(filters, format, gzip),
+        media_type=media_type(format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.post("/notify/promotion", status_code=status.HTTP_200_OK)
 async def send_promotion_notification(
         payload: PromotionNotification,
@@ -268,21 +261,27 @@ async def get_transaction(
 async def send_transaction_notification(
         background_tasks: BackgroundTasks,
         transaction = Depends(get_transaction_or_404),
-        currency_user: User = Depends(get_current_user),
+        currency_user: UserRead = Depends(get_current_principal),
         session: AsyncSession = Depends(get_session)
 ):
-    if transaction.status == TransactionStatus.COMPLETED:
-        notification = NotificationCreate(
-            title="Transaction validée",
-            message=f"Votre transaction {transaction.reference} a été validée",
-            user_id=transaction.sender_id,
-            data={
-                "type": "transaction",
-                "transaction_id": str(transaction.id),
-                "status": "validé"
-            }
+    if transaction.status != TransactionStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La transaction n'est pas encore validée"
         )
-    await send_one_signal_notification(notification, session)
+    notification = NotificationCreate(
+        title="Transaction validée",
+        message=f"Votre transaction {transaction.reference} a été validée",
+        user_id=transaction.sender_id,
+        data={
+            "type": "transaction",
+            "transaction_id": str(transaction.id),
+            "status": "validé"
+        }
+    )
+    outbox.enqueue(session, "TRANSACTION_NOTIFICATION", notification.model_dump(mode="json"), outbox.PUSH)
+    await session.commit()
+    outbox_dispatcher.wake()
     return {"status": "notification_queued"}
 
 
@@ -290,30 +289,142 @@ async def send_transaction_notification(
 async def update_transaction_status(
         update_data: TransactionUpdate,
         transaction = Depends(get_transaction_or_404),
-        user: User = Depends(get_current_user),
+        user: UserRead = Depends(get_current_principal),
         session: AsyncSession = Depends(get_session),
 ):
+    if update_data.version is not None and update_data.version != transaction.version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cette transaction a été modifiée entre-temps, veuillez la recharger"
+        )
     previous_status = transaction.status
     if update_data.status:
         transaction.status = update_data.status
     session.add(transaction)
-    await session.commit()
-    await session.refresh(transaction)
-
-    # Envoyer une notification
     if previous_status != transaction.status:
-        await manager.broadcast({
-            "type": "STATUS_CHANGE",
-            "data": {
-                "id": str(transaction.id),
-                "reference": transaction.reference,
-                "old_status": previous_status,
-                "new_status": transaction.status
-            }
-        })
+        outbox.enqueue(session, "STATUS_CHANGE", {
+            "id": str(transaction.id),
+            "reference": transaction.reference,
+            "old_status": previous_status,
+            "new_status": transaction.status
+        }, outbox.WEBSOCKET, topics=transaction_topics(
+            transaction.sender_id, transaction.sender_country, transaction.receiver_country,
+            previous_status, transaction.status
+        ))
+    try:
+        await session.commit()
+    except StaleDataError:
+        # Modifiée par une autre requête entre la lecture et l'écriture
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cette transaction a été modifiée entre-temps, veuillez la recharger"
+        )
+    await session.refresh(transaction)
+    outbox_dispatcher.wake()
     return transaction
 
 
+BULK_STATUS_UPDATE = text("""
+    WITH changes AS (
+        SELECT * FROM unnest(CAST(:ids AS uuid[]), CAST(:statuses AS varchar[]), CAST(:versions AS integer[]))
+            AS c(id, status, version)
+    ), allowed AS (
+        SELECT * FROM unnest(CAST(:sources AS varchar[]), CAST(:targets AS varchar[])) AS a(source, target)
+    ), locked AS (
+        SELECT t.id, t.status, t.version
+        FROM transactions t JOIN changes c ON c.id = t.id
+        ORDER BY t.id
+        FOR UPDATE OF t
+    )
+    UPDATE transactions t
+    SET status = c.status, version = l.version + 1
+    FROM changes c
+    JOIN locked l ON l.id = c.id
+    JOIN allowed a ON a.source = l.status AND a.target = c.status
+    WHERE t.id = c.id AND (c.version IS NULL OR c.version = l.version)
+    RETURNING t.id, t.reference, l.status AS old_status, t.status, t.version,
+        t.sender_id, t.sender_country, t.receiver_country
+""")
+
+
+@router.post(
+    "/status/batch", response_model=BulkStatusUpdateResult, dependencies=[Depends(agent_or_admin_required)]
+)
+async def update_transaction_statuses(data: BulkStatusUpdate, session: AsyncSession = Depends(get_session)):
+    """
+    Change le statut de plusieurs transactions en une seule instruction. Seules les transitions
+    de STATUS_TRANSITIONS sont appliquées ; avec `version`, une transaction modifiée depuis sa
+    lecture est laissée telle quelle (« stale »). Les admins abonnés à admin:pending reçoivent
+    un seul événement pour le lot, les autres sujets un événement par transaction.
+    """
+    # Pour une transaction répétée dans le lot, la dernière demande l'emporte
+    changes = {item.id: item for item in data.items}
+    transitions = [(source, target) for source, targets in STATUS_TRANSITIONS.items() for target in targets]
+    result = await session.execute(BULK_STATUS_UPDATE, {
+        "ids": list(changes),
+        "statuses": [item.status.value for item in changes.values()],
+        "versions": [item.version for item in changes.values()],
+        "sources": [source.value for source, _ in transitions],
+        "targets": [target.value for _, target in transitions],
+    })
+    updated = {row.id: row for row in result.all()}
+
+    # Raison des refus, lue seulement s'il y en a
+    current = {}
+    if len(updated) < len(changes):
+        rows = await session.execute(
+            select(Transaction.id, Transaction.reference, Transaction.status, Transaction.version)
+            .where(Transaction.id.in_([tx_id for tx_id in changes if tx_id not in updated]))
+        )
+        current = {row.id: row for row in rows.all()}
+    for row in updated.values():
+        # Expéditeur et corridor : un événement par transaction, chacun ne voit que les siennes
+        outbox.enqueue(session, "STATUS_CHANGE", {
+            "id": str(row.id),
+            "reference": row.reference,
+            "old_status": row.old_status,
+            "new_status": row.status
+        }, outbox.WEBSOCKET, topics=[
+            user_topic(row.sender_id), corridor_topic(row.sender_country, row.receiver_country)
+        ])
+    if updated:
+        outbox.enqueue(session, "STATUS_CHANGE_BATCH", {
+            "count": len(updated),
+            "items": [
+                {
+                    "id": str(row.id),
+                    "reference": row.reference,
+                    "old_status": row.old_status,
+                    "new_status": row.status
+                }
+                for row in updated.values()
+            ]
+        }, outbox.WEBSOCKET, topics=[ADMIN_PENDING_TOPIC])
+    await session.commit()
+    outbox_dispatcher.wake()
+
+    results = []
+    for tx_id, item in changes.items():
+        row = updated.get(tx_id) or current.get(tx_id)
+        if tx_id in updated:
+            outcome = "updated"
+        elif row is None:
+            outcome = "not_found"
+        elif item.version is not None and item.version != row.version:
+            outcome = "stale"
+        else:
+            outcome = "invalid_transition"
+        results.append(StatusChangeResult(
+            id=tx_id,
+            outcome=outcome,
+            reference=row.reference if row else None,
+            status=row.status if row else None,
+            version=row.version if row else None
+        ))
+
+    return BulkStatusUpdateResult(updated=len(updated), results=results)
+
+
 
 @router.get('/{reference}', response_model=TransactionRead)
 async def get_transaction_by_reference_or_404(reference: str, session: AsyncSession = Depends(get_session)):
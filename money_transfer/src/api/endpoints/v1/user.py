@@ -15,10 +15,14 @@ from unidecode import unidecode
 
 from src.auth.auth import hash_password, verify_password, create_access_token, create_refresh_token, decode_token, create_reset_token, hash_pin, \
     verify_pin_hash
-from src.auth.dependances import get_current_user
+from src.auth.dependances import get_current_user, get_current_principal
 from src.auth.permission import admin_required
+from src.auth.revocation import revocation_cache
+from src.auth.user_cache import user_cache
 from src.config import settings
-from src.db.models import User, TokenBlacklist, PasswordResetOTP
+from src.core.idempotency import sign_up_idempotency
+from src.core.rate_limit import login_rate_limit, verify_pin_rate_limit, request_otp_rate_limit, verify_otp_rate_limit
+from src.db.models import User, PasswordResetOTP
 from src.db.session import get_session
 from src.schemas.notifications import NotificationCreate
 from src.schemas.user import UserRead, UserCreate, UserWithToken, UserLogin, UserUpdate, EmailModel, ChangePasswordRequest, ForgotPasswordRequest, \
@@ -51,13 +55,16 @@ async def authenticate_user(credential: str, password: str, session: AsyncSessio
 
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Identifiant incorrect")
-    if not verify_password(password, user.hash_password):
+    if not await verify_password(password, user.hash_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Mot de passe incorrect")
     return user
 
 
 
-@router.post('/sign-up', response_model=UserRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    '/sign-up', response_model=UserRead, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(sign_up_idempotency)]
+)
 async def create_user(user: UserCreate, session: AsyncSession = Depends(get_session)):
     result = await session.execute(
         select(User).where(User.phone == user.phone)
@@ -66,7 +73,7 @@ async def create_user(user: UserCreate, session: AsyncSession = Depends(get_sess
     if existing_user:
         raise HTTPException(status_code=400, detail="Phone number already registered")
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = User(**user.dict(exclude={'password'}), hash_password=hashed_password)
     session.add(user_data)
     await session.commit()
@@ -75,9 +82,10 @@ async def create_user(user: UserCreate, session: AsyncSession = Depends(get_sess
     return user_data
 
 
-@router.post("/login", response_model=UserWithToken)
-async def login(user_data: UserLogin, session: AsyncSession = Depends(get_session)):
+@router.post("/login", response_model=UserWithToken, dependencies=[Depends(login_rate_limit)])
+async def login(user_data: UserLogin, request: Request, session: AsyncSession = Depends(get_session)):
     user = await authenticate_user(credential=user_data.credential, password=user_data.password, session=session)
+    await login_rate_limit.reset(request, "credential")
 
     user_read = UserRead.from_orm(user)
     access_token = create_access_token({'sub': str(user.id)})
@@ -101,9 +109,7 @@ async def refresh_token(body: RefreshTokenRequest = Body(...), session: AsyncSes
     if not token_refresh:
         raise HTTPException(status_code=400, detail="Refresh token required")
 
-    stmt = select(TokenBlacklist).where(TokenBlacklist.token == token_refresh)
-    result = await session.execute(stmt)
-    if result.scalar_one_or_none():
+    if await revocation_cache.is_revoked(token_refresh, session):
         raise HTTPException(status_code=401, detail="Refresh token invalid or expired")
 
     payload = decode_token(token_refresh, settings.REFRESH_SECRET_KEY)
@@ -121,7 +127,7 @@ async def refresh_token(body: RefreshTokenRequest = Body(...), session: AsyncSes
 
 
 @router.get("/user-info", status_code=status.HTTP_200_OK, response_model=UserRead)
-async def user_info(current_user = Depends(get_current_user)):
+async def user_info(current_user: UserRead = Depends(get_current_principal)):
     return current_user
 
 
@@ -216,6 +222,7 @@ async def update_user(
         setattr(user, key, value)
     await session.commit()
     await session.refresh(user)
+    await user_cache.invalidate(user.id)
     return user
 
 
@@ -250,6 +257,7 @@ async def upload_profile_picture(
     except SQLAlchemyError:
         file_path.unlink(missing_ok=True)
         raise HTTPException(500, detail="Erreur de base de données")
+    await user_cache.invalidate(user.id)
     return user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -259,6 +267,7 @@ async def delete_user(
 ):
     await session.delete(user)
     await session.commit()
+    await user_cache.invalidate(user.id)
     return {"message": "Votre compte a été supprimé avec success!"}
 
 
@@ -266,7 +275,7 @@ async def delete_user(
 async def search_users(
         q: str,
         session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        current_user: UserRead = Depends(get_current_principal)
 ):
     if len(q) < 2:
         return []
@@ -297,7 +306,7 @@ async def search_users(
 async def logout(
         session: AsyncSession = Depends(get_session),
         credentials: HTTPAuthorizationCredentials = Security(security),
-        current_user: User = Depends(get_current_user)
+        current_user: UserRead = Depends(get_current_principal)
 ):
     token = credentials.credentials
     payload = decode_token(token, settings.SECRET_KEY)
@@ -307,15 +316,10 @@ async def logout(
         )
     expires_at = datetime.utcfromtimestamp(payload['exp'])
 
-    stmt = select(TokenBlacklist).where(TokenBlacklist.token == token)
-    result = await session.execute(stmt)
-    existing_token = result.scalar_one_or_none()
-    if existing_token:
+    if await revocation_cache.is_revoked(token, session):
         raise HTTPException(status_code=400, detail="Token déjà invalidé")
 
-    blacklisted_token = TokenBlacklist(token=token, expires_at=expires_at)
-    session.add(blacklisted_token)
-    await session.commit()
+    await revocation_cache.revoke(token, expires_at, session)
 
     return {"message": "Déconnexion réussie"}
 
@@ -327,7 +331,7 @@ async def change_password(
         session: AsyncSession = Depends(get_session),
         credentials: HTTPAuthorizationCredentials = Security(security),
 ):
-    if not verify_password(password_data.current_password, current_user.hash_password):
+    if not await verify_password(password_data.current_password, current_user.hash_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Mot de passe actuel incorrect"
@@ -344,21 +348,19 @@ async def change_password(
             detail= "Le mot de passe doit contenir au moins 8 caracteres."
         )
 
-    current_user.hash_password = hash_password(password_data.new_password)
+    current_user.hash_password = await hash_password(password_data.new_password)
 
     try:
         session.add(current_user)
         await session.commit()
         await session.refresh(current_user)
+        await user_cache.invalidate(current_user.id)
 
         # Invalided le token actual
         token = credentials.credentials
         payload = decode_token(token, settings.SECRET_KEY)
         expires_at = datetime.utcfromtimestamp(payload['exp'])
-
-        blacklisted_token = TokenBlacklist(token=token, expires_at=expires_at)
-        session.add(blacklisted_token)
-        await session.commit()
+        await revocation_cache.revoke(token, expires_at, session)
 
         return {"message": "Mot de passe mis à jour avec success"}
     except Exception as e:
@@ -398,12 +400,11 @@ async def delete_account(
         # Suppression de compte
         await session.delete(current_user)
         await session.commit()
+        await user_cache.invalidate(current_user.id)
 
         token = credentials.credentials
-        expire_at = datetime.utcfromtimestamp(decode_token(token, settings.SECRET_KEY)['exp'])
-        blacklisted_token = TokenBlacklist(token=token, expire_at=expire_at)
-        session.add(blacklisted_token)
-        await session.commit()
+        expires_at = datetime.utcfromtimestamp(decode_token(token, settings.SECRET_KEY)['exp'])
+        await revocation_cache.revoke(token, expires_at, session)
 
         return {"message": "Compte supprimé avec succès"}
     except Exception as e:
@@ -414,7 +415,7 @@ async def delete_account(
         )
 
 
-@router.post("/request-otp")
+@router.post("/request-otp", dependencies=[Depends(request_otp_rate_limit)])
 async def send_otp(request: OTPSendRequest, session: AsyncSession = Depends(get_session)):
     stmt = select(User).where(User.email == request.email)
     result = await session.execute(stmt)
@@ -447,7 +448,7 @@ async def send_otp(request: OTPSendRequest, session: AsyncSession = Depends(get_
     return {"message": "Code OTP envoyé"}
 
 
-@router.post("/verify-otp")
+@router.post("/verify-otp", dependencies=[Depends(verify_otp_rate_limit)])
 async def verify_otp(request: OTPVerifyRequest, session: AsyncSession = Depends(get_session)):
     stmt = select(PasswordResetOTP).where(
         PasswordResetOTP.email == request.email,
@@ -482,9 +483,10 @@ async def reset_password(request:  PasswordResetRequest, session: AsyncSession =
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
     # Mettre à jour le mot de passe
-    user.hash_password = hash_password(request.new_password)
+    user.hash_password = await hash_password(request.new_password)
 
     await session.commit()
+    await user_cache.invalidate(user.id)
 
     return {'message': "Mot de passe reinitialisé avec succès"}
 
@@ -498,15 +500,17 @@ async def set_pin(
     if len(pin_data.pin) != 4:
         raise HTTPException(400, detail="Le PIN doit contenir 4 chiffres")
 
-    current_user.pin_hash = hash_pin(pin_data.pin)
+    current_user.pin_hash = await hash_pin(pin_data.pin)
     await session.commit()
     await session.refresh(current_user)
+    await user_cache.invalidate(current_user.id)
     return {"message": "PIN défini avec succès"}
 
 
-@router.post("/verify-pin", status_code=status.HTTP_200_OK)
+@router.post("/verify-pin", status_code=status.HTTP_200_OK, dependencies=[Depends(verify_pin_rate_limit)])
 async def verify_pin(
         pin_data: PinVerify,
+        request: Request,
         current_user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_session)
 ):
@@ -515,7 +519,8 @@ async def verify_pin(
     if not current_user.pin_hash:
         raise HTTPException(400, detail="Aucun PIN défini")
 
-    if not verify_pin_hash(pin_data.pin, current_user.pin_hash):
+    if not await verify_pin_hash(pin_data.pin, current_user.pin_hash):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="PIN incorrect")
 
+    await verify_pin_rate_limit.reset(request, "user")
     return {"success": True}
\ No newline at end of file
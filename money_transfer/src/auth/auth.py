@@ -3,27 +3,26 @@ from datetime import timedelta, datetime
 
 from itsdangerous import URLSafeTimedSerializer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 
+from src.auth.hashing import hashing_pool
 from src.config import settings
 
 
 ACCESS_TOKEN_EXPIRE_MINUTE = 60 * 24
 REFRESH_TOKEN_EXPIRE_DAYS = 30
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
-def hash_password(password: str):
-	return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+	return await hashing_pool.hash(password)
 
-def verify_password(plain, hashed_password):
-	return pwd_context.verify(plain, hashed_password)
+async def verify_password(plain, hashed_password) -> bool:
+	return await hashing_pool.verify(plain, hashed_password)
 
 
-def hash_pin(pin: str) -> str:
-	return pwd_context.hash(pin)
+async def hash_pin(pin: str) -> str:
+	return await hashing_pool.hash(pin)
 
-def verify_pin_hash(plain_pin: str, hashed_pin: str) -> bool:
-	return pwd_context.verify(plain_pin, hashed_pin)
+async def verify_pin_hash(plain_pin: str, hashed_pin: str) -> bool:
+	return await hashing_pool.verify(plain_pin, hashed_pin)
 
 def create_token(data: dict, expires_delta: timedelta, secret_key: str):
 	to_encode = data.copy()
@@ -1,13 +1,19 @@
-from fastapi import Depends, HTTPException, Security, status
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Security, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.auth import decode_token
+from src.auth.revocation import revocation_cache, token_digest
+from src.auth.user_cache import user_cache
 from src.config import settings
-from src.db.models import User, TokenBlacklist
-from src.db.session import get_session
+from src.db.models import User
+from src.db.session import Session, get_session
+from src.schemas.user import UserRead
 
 security  = HTTPBearer()
 
@@ -16,25 +22,19 @@ async def get_user_or_id(user_id: str, session: AsyncSession = Depends(get_sessi
 	result = await session.execute(stmt)
 	return result.scalar_one_or_none()
 
-async def get_current_user(
-		credentials: HTTPAuthorizationCredentials = Security(security),
-		session: AsyncSession = Depends(get_session)
-) -> User:
+async def authenticate_token(token: str, session: AsyncSession) -> str:
+	"""Identifiant de l'utilisateur d'un token d'accès valide et non révoqué."""
 	credentials_exception = HTTPException(
 		status_code=status.HTTP_401_UNAUTHORIZED,
 		detail="Impossible de valider les identifants",
 		headers={"WWW-Authenticate": "Bearer"}
 	)
 	try:
-		token = credentials.credentials
 		payload = decode_token(token, settings.SECRET_KEY)
 		if not payload:
 			raise credentials_exception
 
-		stmt = select(TokenBlacklist).where(TokenBlacklist.token == token)
-		result = await session.execute(stmt)
-		black_token = result.scalar_one_or_none()
-		if black_token:
+		if await revocation_cache.is_revoked(token, session):
 			raise HTTPException(status_code=401, detail="Token révoqué")
 
 		user_id = payload.get("sub")
@@ -42,9 +42,65 @@ async def get_current_user(
 			raise credentials_exception
 	except JWTError:
 		raise credentials_exception
+	return user_id
+
+async def get_current_user_id(
+		credentials: HTTPAuthorizationCredentials = Security(security),
+		session: AsyncSession = Depends(get_session)
+) -> str:
+	return await authenticate_token(credentials.credentials, session)
+
+async def get_current_user(
+		user_id: str = Depends(get_current_user_id),
+		session: AsyncSession = Depends(get_session)
+) -> User:
+	"""Charge la ligne User complète, pour les routes qui la modifient."""
 	user = await get_user_or_id(user_id=user_id, session=session)
 
 	if not user:
 		raise HTTPException(status_code=404, detail="User not found")
 	return user
 
+async def get_current_principal(
+		user_id: str = Depends(get_current_user_id),
+		session: AsyncSession = Depends(get_session)
+) -> UserRead:
+	"""Identité et rôle de l'utilisateur courant, servis depuis le cache utilisateur quand c'est possible."""
+	principal = await user_cache.get(user_id)
+	if principal is not None:
+		return principal
+
+	generation = await user_cache.generation(user_id)
+	user = await get_user_or_id(user_id=user_id, session=session)
+	if not user:
+		raise HTTPException(status_code=404, detail="User not found")
+	return await user_cache.set(user, generation)
+
+@dataclass
+class WebSocketCredentials:
+	principal: UserRead
+	token_digest: bytes
+	# Expiration du token (secondes epoch), la connexion est fermée à cette échéance
+	expires_at: float
+
+
+async def get_websocket_credentials(websocket: WebSocket, token: Optional[str] = None) -> WebSocketCredentials:
+	"""
+	get_current_principal pour un websocket. Un navigateur ne peut pas y ajouter d'en-tête
+	Authorization : le token est aussi accepté en paramètre `?token=`. La session est fermée
+	avant l'ouverture de la connexion, qui ne garde pas de connexion à la base.
+	"""
+	if token is None:
+		scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+		if scheme.lower() != "bearer":
+			token = None
+	if not token:
+		raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Token manquant")
+	try:
+		async with Session() as session:
+			user_id = await authenticate_token(token, session)
+			principal = await get_current_principal(user_id, session)
+	except HTTPException as e:
+		raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+	# Token déjà validé par authenticate_token, qui n'expose que son sujet
+	return WebSocketCredentials(principal, token_digest(token), float(decode_token(token, settings.SECRET_KEY)["exp"]))
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.config import settings
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+HASH_IN_FLIGHT = Gauge("auth_hash_in_flight", "Opérations de hachage en cours ou en attente")
+HASH_QUEUE_DEPTH = Gauge("auth_hash_queue_depth", "Opérations de hachage en attente d'un worker libre")
+HASH_LATENCY = Histogram("auth_hash_latency_seconds", "Durée des opérations de hachage, attente comprise", ["operation"])
+HASH_REJECTED = Counter("auth_hash_rejected_total", "Opérations de hachage refusées, pool saturé", ["operation"])
+
+
+def _hash(secret: str) -> str:
+	return pwd_context.hash(secret)
+
+
+def _verify(secret: str, hashed: str) -> bool:
+	return pwd_context.verify(secret, hashed)
+
+
+class HashingPool:
+	"""
+	Exécute argon2 hors de la boucle d'événements, dans un pool borné.
+	Au-delà de `workers + queue_size` opérations en cours, les appels sont refusés (503).
+	"""
+
+	def __init__(self, kind: str, workers: int, queue_size: int):
+		self.kind = kind
+		self.workers = workers
+		self.capacity = workers + queue_size
+		self._pending = 0
+		self._executor: Executor | None = None
+
+	def _get_executor(self) -> Executor:
+		if self._executor is None:
+			if self.kind == "process":
+				self._executor = ProcessPoolExecutor(max_workers=self.workers)
+			else:
+				self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+		return self._executor
+
+	def _set_gauges(self):
+		HASH_IN_FLIGHT.set(self._pending)
+		HASH_QUEUE_DEPTH.set(max(self._pending - self.workers, 0))
+
+	async def run(self, operation: str, fn, *args):
+		if self._pending >= self.capacity:
+			HASH_REJECTED.labels(operation).inc()
+			raise HTTPException(
+				status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+				detail="Service momentanément surchargé, veuillez réessayer",
+				headers={"Retry-After": "1"}
+			)
+
+		self._pending += 1
+		self._set_gauges()
+		start = time.perf_counter()
+		try:
+			loop = asyncio.get_running_loop()
+			return await loop.run_in_executor(self._get_executor(), fn, *args)
+		finally:
+			self._pending -= 1
+			self._set_gauges()
+			HASH_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+	def shutdown(self):
+		if self._executor is not None:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
+
+	async def hash(self, secret: str) -> str:
+		return await self.run("hash", _hash, secret)
+
+	async def verify(self, secret: str, hashed: str) -> bool:
+		return await self.run("verify", _verify, secret, hashed)
+
+
+hashing_pool = HashingPool(
+	kind=settings.HASH_POOL_KIND,
+	workers=settings.HASH_POOL_WORKERS,
+	queue_size=settings.HASH_POOL_QUEUE_SIZE
+)
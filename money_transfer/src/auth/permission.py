@@ -1,16 +1,15 @@
 from fastapi import Depends, HTTPException, status
 
-from src.auth.dependances import get_current_user
-from src.db.models import User
-from src.schemas.user import UserRole
+from src.auth.dependances import get_current_principal
+from src.schemas.user import UserRole, UserRead
 
 
-async def admin_required(current_user: User = Depends(get_current_user)):
+async def admin_required(current_user: UserRead = Depends(get_current_principal)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Permission denied")
     return current_user
 
-async def agent_or_admin_required(current_user: User = Depends(get_current_user)):
+async def agent_or_admin_required(current_user: UserRead = Depends(get_current_principal)):
     if current_user.role not in [UserRole.ADMIN, UserRole.AGENT]:
         raise HTTPException(status_code=403, detail="Permission denied")
     return current_user
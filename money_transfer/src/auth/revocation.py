@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import settings
+from src.db import partitions, redis
+from src.db.models import TokenBlacklist
+from src.db.session import Session, engine
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth:revocations"
+
+# Recouvrement entre deux synchronisations, pour les révocations commitées en retard
+SYNC_OVERLAP = timedelta(minutes=5)
+
+# Horloge de la base, celle de revoked_at (valeur par défaut côté serveur)
+DB_UTC_NOW = text("SELECT timezone('utc', now())")
+
+
+def token_digest(token: str) -> bytes:
+	return hashlib.sha256(token.encode()).digest()
+
+
+class TokenRevocationCache:
+	"""
+	Copie en mémoire des tokens révoqués (empreinte sha256 -> expiration).
+	La table TokenBlacklist reste l'enregistrement durable ; les autres workers
+	sont prévenus via Redis pub/sub et la table est relue périodiquement.
+	Tant que l'écoute pub/sub est coupée, ou que la resynchronisation qui suit
+	la reconnexion n'a pas abouti, la copie peut être en retard : la table est
+	interrogée.
+	"""
+
+	def __init__(self):
+		self._revoked: dict[bytes, datetime] = {}
+		self._synced_until: datetime | None = None
+		self._resynced = False
+		self._lock = asyncio.Lock()
+
+	@property
+	def loaded(self) -> bool:
+		return self._synced_until is not None
+
+	@property
+	def up_to_date(self) -> bool:
+		return self.loaded and self._resynced and redis.is_listening()
+
+	def _remember(self, digest: bytes, expires_at: datetime):
+		self._revoked[digest] = expires_at
+
+	def _prune(self):
+		now = datetime.utcnow()
+		self._revoked = {digest: exp for digest, exp in self._revoked.items() if exp > now}
+
+	async def sync(self):
+		"""Charge les révocations ajoutées depuis la dernière synchronisation."""
+		async with self._lock:
+			async with Session() as session:
+				now = (await session.execute(DB_UTC_NOW)).scalar_one()
+				stmt = select(TokenBlacklist.token_digest, TokenBlacklist.expires_at).where(
+					TokenBlacklist.expires_at > now
+				)
+				if self._synced_until is not None:
+					stmt = stmt.where(TokenBlacklist.revoked_at > self._synced_until - SYNC_OVERLAP)
+				result = await session.execute(stmt)
+				for digest, expires_at in result.all():
+					self._remember(bytes(digest), expires_at)
+			self._prune()
+			self._synced_until = now
+
+	async def resync(self):
+		"""Après une (re)connexion pub/sub : rattrape les révocations publiées pendant la coupure."""
+		self._resynced = False
+		await self.sync()
+		self._resynced = True
+
+	async def run_periodic_sync(self):
+		while True:
+			await asyncio.sleep(settings.REVOCATION_SYNC_INTERVAL_SECONDS)
+			try:
+				await self.sync()
+			except Exception:
+				logger.exception("Token revocation sync failed")
+
+	def contains_digest(self, digest: bytes) -> bool:
+		"""Révocation connue de ce worker, sans lecture de la table."""
+		return digest in self._revoked
+
+	async def is_revoked(self, token: str, session: AsyncSession) -> bool:
+		digest = token_digest(token)
+		if digest in self._revoked:
+			return True
+		if not self.up_to_date:
+			# Cache pas encore chargé ou révocations d'autres workers peut-être manquées : on interroge la table
+			stmt = select(TokenBlacklist.expires_at).where(TokenBlacklist.token_digest == digest)
+			result = await session.execute(stmt)
+			return result.first() is not None
+		return False
+
+	async def revoke(self, token: str, expires_at: datetime, session: AsyncSession):
+		digest = token_digest(token)
+		stmt = insert(TokenBlacklist).values(token_digest=digest, expires_at=expires_at).on_conflict_do_nothing()
+		await session.execute(stmt)
+		await session.commit()
+
+		self._remember(digest, expires_at)
+		await redis.publish(REVOCATION_CHANNEL, {"digest": digest.hex(), "expires_at": expires_at.isoformat()})
+
+	async def on_message(self, message: dict):
+		self._remember(bytes.fromhex(message["digest"]), datetime.fromisoformat(message["expires_at"]))
+
+
+async def purge_expired_revocations():
+	"""
+	Crée les partitions mensuelles à venir et supprime celles dont tous les tokens ont expiré.
+	Les lignes tombées dans la partition par défaut sont purgées une à une.
+	"""
+	async with engine.begin() as conn:
+		if not await partitions.try_lock(conn, "tokenblacklist-maintenance"):
+			return
+		today = datetime.utcnow().date()
+		await partitions.ensure_monthly_partitions(
+			conn, TokenBlacklist.__tablename__, today, months_ahead=settings.REVOCATION_PARTITION_MONTHS_AHEAD
+		)
+		await partitions.drop_partitions_before(conn, TokenBlacklist.__tablename__, partitions.month_start(today))
+		await conn.execute(text("DELETE FROM tokenblacklist_default WHERE expires_at < timezone('utc', now())"))
+
+
+revocation_cache = TokenRevocationCache()
+redis.subscribe(REVOCATION_CHANNEL, revocation_cache.on_message, on_resync=revocation_cache.resync)
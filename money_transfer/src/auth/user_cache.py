@@ -0,0 +1,122 @@
+import logging
+import uuid
+
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.db import redis
+from src.schemas.user import UserRead
+
+logger = logging.getLogger(__name__)
+
+USER_INVALIDATION_CHANNEL = "auth:user-invalidations"
+
+# Doit survivre à toute lecture en cours d'un utilisateur (quelques millisecondes en pratique)
+GENERATION_TTL_SECONDS = 86400
+
+# N'écrit l'entrée que si aucune invalidation n'a eu lieu depuis la lecture de la génération
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+	return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class UserCache:
+	"""
+	Cache court (mémoire du worker + Redis) de l'identité et du rôle des utilisateurs authentifiés.
+	Toute écriture sur un utilisateur doit appeler `invalidate`.
+
+	Une lecture de la base peut se terminer après une invalidation concurrente : `generation`
+	est lue avant la ligne et `set` n'écrit que si elle n'a pas changé (génération Redis
+	`user:<id>:gen` incrémentée par `invalidate`, compteur local des invalidations reçues).
+	"""
+
+	def __init__(self, ttl: int, maxsize: int = 10_000):
+		self.ttl = ttl
+		self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+		# Invalidations vues par ce worker, tous utilisateurs confondus
+		self._invalidations = 0
+
+	@staticmethod
+	def _key(user_id) -> str:
+		return f"user:{user_id}"
+
+	@staticmethod
+	def _generation_key(user_id) -> str:
+		return f"user:{user_id}:gen"
+
+	async def get(self, user_id) -> UserRead | None:
+		key = self._key(user_id)
+		user = self._local.get(key)
+		if user is not None:
+			return user
+		try:
+			raw = await redis.redis_client.get(key)
+		except RedisError as e:
+			logger.warning(f"User cache read error: {e}")
+			return None
+		if raw is None:
+			return None
+		user = UserRead.model_validate_json(raw)
+		self._local[key] = user
+		return user
+
+	async def generation(self, user_id) -> tuple[int, str | None]:
+		"""À lire avant de charger l'utilisateur depuis la base, puis à passer à `set`."""
+		invalidations = self._invalidations
+		try:
+			return invalidations, await redis.redis_client.get(self._generation_key(user_id)) or "0"
+		except RedisError as e:
+			logger.warning(f"User cache generation read error: {e}")
+			return invalidations, None
+
+	async def set(self, user, generation: tuple[int, str | None]) -> UserRead:
+		"""Met en cache `user`, sauf s'il a été invalidé depuis `generation` : la lecture est peut-être périmée."""
+		user_read = UserRead.model_validate(user)
+		invalidations, redis_generation = generation
+		if redis_generation is None:
+			# Génération inconnue : sans Redis, une invalidation d'un autre worker pourrait être manquée
+			return user_read
+		key = self._key(user_read.id)
+		try:
+			stored = await redis.redis_client.eval(
+				SET_IF_GENERATION_SCRIPT, 2, key, self._generation_key(user_read.id),
+				redis_generation, user_read.model_dump_json(), self.ttl
+			)
+		except RedisError as e:
+			logger.warning(f"User cache write error: {e}")
+			return user_read
+		if stored and invalidations == self._invalidations:
+			self._local[key] = user_read
+		return user_read
+
+	async def invalidate(self, user_id: uuid.UUID | str):
+		key = self._key(user_id)
+		self._invalidations += 1
+		self._local.pop(key, None)
+		try:
+			# La génération change avant la suppression : une écriture tardive de `set` est refusée
+			async with redis.redis_client.pipeline(transaction=True) as pipe:
+				pipe.incr(self._generation_key(user_id))
+				pipe.expire(self._generation_key(user_id), GENERATION_TTL_SECONDS)
+				pipe.delete(key)
+				await pipe.execute()
+		except RedisError as e:
+			logger.warning(f"User cache invalidation error: {e}")
+		await redis.publish(USER_INVALIDATION_CHANNEL, {"user_id": str(user_id)})
+
+	async def on_message(self, message: dict):
+		self._invalidations += 1
+		self._local.pop(self._key(message["user_id"]), None)
+
+	async def clear_local(self):
+		self._invalidations += 1
+		self._local.clear()
+
+
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS)
+redis.subscribe(USER_INVALIDATION_CHANNEL, user_cache.on_message, on_resync=user_cache.clear_local)
@@ -41,6 +41,47 @@ class Settings(BaseSettings):
     ONESIGNALAPPID: str
     ONESIGNALAPIKEY: str
 
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = 60
+    REVOCATION_PARTITION_MONTHS_AHEAD: int = 2
+    REVOCATION_PURGE_INTERVAL_MINUTES: int = 60
+
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    RATE_LIMIT_ENABLED: bool = True
+
+    RATE_MAX_HOPS: int = 3
+
+    HASH_POOL_KIND: str = "thread"
+    HASH_POOL_WORKERS: int = 4
+    HASH_POOL_QUEUE_SIZE: int = 32
+
+    CATALOG_CACHE_MAX_AGE_SECONDS: int = 60
+    CATALOG_CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = 3600
+    CATALOG_SNAPSHOT_DIR: str = "/dev/shm/money-transfer-catalog"
+
+    QUOTE_TTL_SECONDS: int = 120
+
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_SECONDS: int = 10
+
+    TRANSACTION_PARTITION_MONTHS_AHEAD: int = 3
+    TRANSACTION_RETENTION_MONTHS: int = 24
+    TRANSACTION_ARCHIVE_DIR: str = "archives/transactions"
+
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_MAX_RETRY_DELAY_SECONDS: int = 300
+    # Au-delà, l'événement est abandonné (dead_at renseigné) et n'est plus retenté
+    OUTBOX_MAX_ATTEMPTS: int = 20
+
+    WEBSOCKET_QUEUE_SIZE: int = 100
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = 5.0
+    WEBSOCKET_MAX_TOPICS: int = 50
+
+    # Clé de permutation des références (SECRET_KEY si vide) : ne jamais la changer sans re-numéroter
+    REFERENCE_KEY: str = ""
+
     model_config = SettingsConfigDict(env_file=".env", extra='ignore')
 
     def active_database_url(self):
@@ -0,0 +1,244 @@
+"""
+Requêtes conditionnelles pour les données de référence (pays, devises, frais, taux...).
+Chaque table a un compteur de version dans Redis, incrémenté après chaque écriture admin ;
+l'ETag d'un endpoint est dérivé des versions des tables qu'il lit. Un If-None-Match
+identique reçoit un 304 sans aucun accès à la base.
+
+Pour chaque ETag, le JSON rendu et sa version gzip sont construits une seule fois puis
+écrits dans CATALOG_SNAPSHOT_DIR (tmpfs par défaut), où les autres workers les relisent
+au lieu de refaire les requêtes et la sérialisation.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Sequence, Type
+
+from fastapi import HTTPException, Request, Response, status
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+from sqlmodel import SQLModel
+
+from src.config import settings
+from src.db import redis
+
+logger = logging.getLogger(__name__)
+
+
+def version_key(model: Type[SQLModel]) -> str:
+	return f"catalog:version:{model.__tablename__}"
+
+
+async def get_versions(models: Sequence[Type[SQLModel]]) -> Dict[str, int] | None:
+	"""Versions courantes des tables, ou None si Redis est indisponible."""
+	keys = [version_key(model) for model in models]
+	try:
+		values = await redis.redis_client.mget(keys)
+		if any(value is None for value in values):
+			# Compteur absent (Redis vidé) : on repart d'un horodatage pour ne jamais
+			# réutiliser une version déjà servie avec un autre contenu
+			async with redis.redis_client.pipeline(transaction=False) as pipe:
+				for key in keys:
+					pipe.set(key, time.time_ns(), nx=True)
+				pipe.mget(keys)
+				values = (await pipe.execute())[-1]
+	except RedisError as e:
+		logger.warning(f"Catalog versions unavailable: {e}")
+		return None
+	return {model.__tablename__: int(value) for model, value in zip(models, values)}
+
+
+async def bump_versions(*models: Type[SQLModel]):
+	"""À appeler après le commit d'une écriture sur ces tables."""
+	try:
+		async with redis.redis_client.pipeline(transaction=False) as pipe:
+			for model in models:
+				pipe.set(version_key(model), time.time_ns(), nx=True)
+				pipe.incr(version_key(model))
+			await pipe.execute()
+	except RedisError as e:
+		logger.error(f"Catalog version bump failed for {[model.__tablename__ for model in models]}: {e}")
+
+
+def cache_control() -> str:
+	return (
+		f"public, max-age={settings.CATALOG_CACHE_MAX_AGE_SECONDS}, "
+		f"stale-while-revalidate={settings.CATALOG_CACHE_STALE_WHILE_REVALIDATE_SECONDS}"
+	)
+
+
+def gzip_etag(etag: str) -> str:
+	"""ETag de la représentation gzip : distinct, puisque les octets diffèrent."""
+	return etag[:-1] + '-gzip"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+	if not if_none_match:
+		return False
+	if if_none_match.strip() == "*":
+		return True
+	# Comparaison faible (RFC 9110 §13.1.2) : un proxy peut avoir préfixé W/
+	accepted = {etag, gzip_etag(etag)}
+	return any(candidate.strip().removeprefix("W/") in accepted for candidate in if_none_match.split(","))
+
+
+def accepts_gzip(request: Request) -> bool:
+	"""Accept-Encoding avec ses poids (RFC 9110 §12.5.3) : `gzip;q=0` refuse gzip, `*` vaut pour gzip s'il n'est pas cité."""
+	weights = {}
+	for entry in request.headers.get("accept-encoding", "").lower().split(","):
+		coding, *params = [part.strip() for part in entry.split(";")]
+		if not coding:
+			continue
+		weight = 1.0
+		for param in params:
+			name, _, value = param.partition("=")
+			if name.strip() == "q":
+				try:
+					weight = float(value)
+				except ValueError:
+					weight = 0.0
+		weights[coding] = weight
+	weight = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+	return weight > 0
+
+
+@dataclass
+class Snapshot:
+	etag: str
+	body: bytes
+	gzipped: bytes
+
+
+class SnapshotStore:
+	"""
+	Rendus JSON partagés entre workers, un fichier par (endpoint, ETag), écrits de façon
+	atomique (fichier temporaire puis os.replace). Chaque processus garde le dernier rendu
+	de chaque endpoint en mémoire.
+	"""
+
+	def __init__(self, directory: str):
+		self.directory = Path(directory)
+		self._memo: Dict[str, Snapshot] = {}
+		self._locks: Dict[str, asyncio.Lock] = {}
+		self._shared = True
+
+	def _ensure_directory(self) -> bool:
+		if self._shared:
+			try:
+				self.directory.mkdir(parents=True, exist_ok=True)
+			except OSError as e:
+				logger.warning(f"Catalog snapshots not shared between workers ({self.directory}): {e}")
+				self._shared = False
+		return self._shared
+
+	@staticmethod
+	def _slug(path: str) -> str:
+		return re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+
+	def _paths(self, slug: str, etag: str) -> tuple[Path, Path]:
+		name = slug + "-" + etag.strip('"')
+		return self.directory / f"{name}.json", self.directory / f"{name}.json.gz"
+
+	def _write(self, target: Path, data: bytes):
+		fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+		try:
+			with os.fdopen(fd, "wb") as f:
+				f.write(data)
+			os.replace(tmp, target)
+		except BaseException:
+			os.unlink(tmp)
+			raise
+
+	def _read(self, slug: str, etag: str) -> Snapshot | None:
+		body_path, gzip_path = self._paths(slug, etag)
+		try:
+			return Snapshot(etag, body_path.read_bytes(), gzip_path.read_bytes())
+		except OSError:
+			return None
+
+	def _store(self, slug: str, snapshot: Snapshot):
+		body_path, gzip_path = self._paths(slug, snapshot.etag)
+		try:
+			# gzip d'abord : un .json présent garantit que son .json.gz l'est aussi
+			self._write(gzip_path, snapshot.gzipped)
+			self._write(body_path, snapshot.body)
+			for stale in self.directory.glob(f"{slug}-*.json*"):
+				if stale not in (body_path, gzip_path):
+					stale.unlink(missing_ok=True)
+		except OSError as e:
+			logger.warning(f"Catalog snapshot {body_path.name} not written: {e}")
+
+	async def get(self, path: str, etag: str, render: Callable[[], Awaitable[bytes]]) -> Snapshot:
+		slug = self._slug(path)
+		snapshot = self._memo.get(slug)
+		if snapshot and snapshot.etag == etag:
+			return snapshot
+		async with self._locks.setdefault(slug, asyncio.Lock()):
+			snapshot = self._memo.get(slug)
+			if snapshot and snapshot.etag == etag:
+				return snapshot
+			# Accès disque et compression hors de la boucle d'événements
+			shared = await asyncio.to_thread(self._ensure_directory)
+			snapshot = shared and await asyncio.to_thread(self._read, slug, etag)
+			if not snapshot:
+				body = await render()
+				snapshot = Snapshot(etag, body, await asyncio.to_thread(gzip.compress, body, compresslevel=9, mtime=0))
+				if shared:
+					await asyncio.to_thread(self._store, slug, snapshot)
+			self._memo[slug] = snapshot
+			return snapshot
+
+
+snapshots = SnapshotStore(settings.CATALOG_SNAPSHOT_DIR)
+
+
+class CatalogCache:
+	"""
+	Dépendance FastAPI : à déclarer dans `dependencies=[...]` de la route, avec les
+	modèles lus par l'endpoint. Lève un 304 avant que la session ne soit utilisée.
+	"""
+
+	def __init__(self, *models: Type[SQLModel]):
+		self.models = models
+
+	async def __call__(self, request: Request, response: Response):
+		request.state.catalog_etag = None
+		versions = await get_versions(self.models)
+		if versions is None:
+			return
+		fingerprint = request.url.path + "|" + "|".join(f"{table}:{version}" for table, version in versions.items())
+		etag = f'"{hashlib.sha256(fingerprint.encode()).hexdigest()[:32]}"'
+		request.state.catalog_etag = etag
+		headers = {"ETag": etag, "Cache-Control": cache_control(), "Vary": "Accept-Encoding"}
+		if etag_matches(request.headers.get("if-none-match"), etag):
+			if accepts_gzip(request):
+				headers["ETag"] = gzip_etag(etag)
+			raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+		response.headers.update(headers)
+
+	async def render(self, request: Request, response_type: Any, load: Callable[[], Awaitable[Any]]) -> Response:
+		"""
+		Réponse de l'endpoint, servie depuis le rendu partagé de l'ETag courant.
+		`load` n'est appelé que si aucun worker n'a encore rendu cette version.
+		"""
+		async def build() -> bytes:
+			adapter = TypeAdapter(response_type)
+			return adapter.dump_json(adapter.validate_python(await load(), from_attributes=True))
+
+		etag = request.state.catalog_etag
+		if etag is None:
+			return Response(await build(), media_type="application/json")
+
+		snapshot = await snapshots.get(request.url.path, etag, build)
+		headers = {"Cache-Control": cache_control(), "Vary": "Accept-Encoding"}
+		if accepts_gzip(request):
+			headers.update({"ETag": gzip_etag(etag), "Content-Encoding": "gzip"})
+			return Response(snapshot.gzipped, media_type="application/json", headers=headers)
+		headers["ETag"] = etag
+		return Response(snapshot.body, media_type="application/json", headers=headers)
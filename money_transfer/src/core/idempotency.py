@@ -0,0 +1,204 @@
+"""
+En-tête Idempotency-Key pour les écritures rejouées par les clients (réseau mobile instable).
+
+La première requête réserve la clé dans Redis (marqueur « en cours »), exécute l'endpoint,
+puis IdempotencyMiddleware enregistre sa réponse 2xx pendant IDEMPOTENCY_TTL_SECONDS. Les
+doublons reçoivent cette réponse telle quelle (en-tête Idempotent-Replayed) ; ceux qui
+arrivent pendant l'exécution attendent qu'elle se termine au lieu de la relancer. Une
+réponse en erreur libère la clé : le client peut réessayer.
+
+La clé est propre à l'utilisateur du token et à l'endpoint ; réutilisée avec un autre
+corps de requête, elle est refusée.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Dict
+
+from fastapi import HTTPException, Request, Response, status
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+from src.core.rate_limit import token_subject
+from src.db import redis
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+STATE_KEY = "idempotency_claim"
+# En-têtes de la réponse d'origine rejoués avec elle
+STORED_HEADERS = {"content-type", "location"}
+
+IDEMPOTENCY_REQUESTS = Counter(
+	"idempotency_requests_total", "Requêtes portant un Idempotency-Key", ["scope", "outcome"]
+)
+
+# Supprime la clé seulement si elle porte encore notre marqueur
+RELEASE_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value and cjson.decode(value)['claim'] == ARGV[1] then
+	return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotentReplay(Exception):
+	"""Levée par la dépendance ; transformée en réponse par `replay_handler`."""
+
+	def __init__(self, record: dict):
+		self.record = record
+
+
+async def replay_handler(request: Request, exc: IdempotentReplay) -> Response:
+	record = exc.record
+	headers = {name: value for name, value in record["headers"]}
+	headers[REPLAYED_HEADER] = "true"
+	return Response(base64.b64decode(record["body"]), status_code=record["status"], headers=headers)
+
+
+class Idempotency:
+	"""
+	Dépendance FastAPI : à déclarer dans `dependencies=[...]` de la route. Sans en-tête
+	Idempotency-Key, la requête passe normalement.
+	"""
+
+	def __init__(self, scope: str):
+		self.scope = scope
+
+	async def _key(self, request: Request, idempotency_key: str) -> str:
+		principal = await token_subject(request) or "anonymous"
+		return f"idempotency:{self.scope}:{principal}:{idempotency_key}"
+
+	@staticmethod
+	async def _fingerprint(request: Request) -> str:
+		# HMAC : le corps (mot de passe à l'inscription) ne doit pas être retrouvable depuis Redis
+		digest = hmac.new(settings.SECRET_KEY.encode(), f"{request.method} {request.url.path}\n".encode(), hashlib.sha256)
+		digest.update(await request.body())
+		return digest.hexdigest()
+
+	async def __call__(self, request: Request):
+		idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+		if idempotency_key is None:
+			return
+		if not 0 < len(idempotency_key) <= 255:
+			raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Idempotency-Key invalide")
+
+		key = await self._key(request, idempotency_key)
+		fingerprint = await self._fingerprint(request)
+		claim = secrets.token_hex(8)
+		marker = json.dumps({"state": "in_flight", "claim": claim, "fingerprint": fingerprint})
+		deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+		delay = 0.05
+		try:
+			while True:
+				if await redis.redis_client.set(key, marker, nx=True, ex=settings.IDEMPOTENCY_LOCK_SECONDS):
+					IDEMPOTENCY_REQUESTS.labels(self.scope, "executed").inc()
+					setattr(request.state, STATE_KEY, (key, claim, fingerprint))
+					return
+				stored = await redis.redis_client.get(key)
+				if stored is None:
+					# Libérée entre-temps (échec de la requête en cours) : on retente la réservation
+					continue
+				record = json.loads(stored)
+				if record["fingerprint"] != fingerprint:
+					IDEMPOTENCY_REQUESTS.labels(self.scope, "mismatch").inc()
+					raise HTTPException(
+						status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+						detail="Cette clé d'idempotence a déjà été utilisée pour une autre requête"
+					)
+				if record["state"] == "done":
+					IDEMPOTENCY_REQUESTS.labels(self.scope, "replayed").inc()
+					raise IdempotentReplay(record)
+				if time.monotonic() >= deadline:
+					IDEMPOTENCY_REQUESTS.labels(self.scope, "timeout").inc()
+					raise HTTPException(
+						status_code=status.HTTP_409_CONFLICT,
+						detail="Une requête identique est en cours de traitement, veuillez réessayer",
+						headers={"Retry-After": "1"}
+					)
+				await asyncio.sleep(delay)
+				delay = min(delay * 2, 0.5)
+		except RedisError as e:
+			# Sans Redis, on retombe sur le comportement sans clé plutôt que de refuser l'écriture
+			logger.warning(f"Idempotency store unavailable for {self.scope}: {e}")
+			IDEMPOTENCY_REQUESTS.labels(self.scope, "unavailable").inc()
+
+
+async def complete(key: str, fingerprint: str, status_code: int, headers: Dict[str, str], body: bytes):
+	record = {
+		"state": "done",
+		"fingerprint": fingerprint,
+		"status": status_code,
+		"headers": [[name, value] for name, value in headers.items() if name in STORED_HEADERS],
+		"body": base64.b64encode(body).decode(),
+	}
+	try:
+		await redis.redis_client.set(key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL_SECONDS)
+	except RedisError as e:
+		logger.error(f"Idempotent response not stored for {key}: {e}")
+
+
+async def release(key: str, claim: str):
+	try:
+		await redis.redis_client.eval(RELEASE_SCRIPT, 1, key, claim)
+	except RedisError as e:
+		# Le marqueur expirera de lui-même après IDEMPOTENCY_LOCK_SECONDS
+		logger.error(f"Idempotency key not released for {key}: {e}")
+
+
+class IdempotencyMiddleware:
+	"""
+	Enregistre la réponse des requêtes dont la dépendance `Idempotency` a réservé la clé.
+	ASGI pur : le corps est recopié au passage, la réponse n'est pas retardée.
+	"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		response: dict = {"status": None, "headers": {}, "body": bytearray()}
+
+		async def capture(message: Message):
+			if scope.get("state", {}).get(STATE_KEY):
+				if message["type"] == "http.response.start":
+					response["status"] = message["status"]
+					response["headers"] = {
+						name.decode("latin-1").lower(): value.decode("latin-1") for name, value in message.get("headers", [])
+					}
+				elif message["type"] == "http.response.body":
+					response["body"].extend(message.get("body", b""))
+			await send(message)
+
+		try:
+			await self.app(scope, receive, capture)
+		except BaseException:
+			claim = scope.get("state", {}).get(STATE_KEY)
+			if claim:
+				await release(*claim[:2])
+			raise
+
+		claim = scope.get("state", {}).get(STATE_KEY)
+		if not claim:
+			return
+		key, claim_id, fingerprint = claim
+		if response["status"] is not None and 200 <= response["status"] < 300:
+			await complete(key, fingerprint, response["status"], response["headers"], bytes(response["body"]))
+		else:
+			await release(key, claim_id)
+
+
+transaction_idempotency = Idempotency("transactions")
+sign_up_idempotency = Idempotency("sign_up")
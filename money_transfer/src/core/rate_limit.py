@@ -0,0 +1,173 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List
+
+from cachetools import TTLCache
+from fastapi import HTTPException, Request, status
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+
+from src.auth.auth import decode_token
+from src.config import settings
+from src.db import redis
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_HITS = Counter(
+	"rate_limit_requests_total", "Requêtes soumises au limiteur de débit", ["scope", "key_type", "outcome"]
+)
+
+KeyExtractor = Callable[[Request], Awaitable[str | None]]
+
+# Fenêtre glissante approchée : le compteur de la fenêtre précédente est pondéré
+# par la part de celle-ci qui chevauche encore la fenêtre glissante.
+SLIDING_WINDOW_SCRIPT = """
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+if previous * weight + current >= limit then
+	return 0
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], window * 2)
+return 1
+"""
+
+
+async def client_ip(request: Request) -> str | None:
+	# X-Real-IP est remplacé par nginx ($remote_addr) ; X-Forwarded-For, auquel nginx ajoute
+	# l'adresse à la suite de celles envoyées par le client, n'est pas fiable
+	return request.headers.get("x-real-ip") or (request.client.host if request.client else None)
+
+
+def body_field(name: str) -> KeyExtractor:
+	async def extract(request: Request) -> str | None:
+		try:
+			body = await request.json()
+		except ValueError:
+			return None
+		value = body.get(name) if isinstance(body, dict) else None
+		return str(value).strip().lower() if value else None
+	return extract
+
+
+async def token_subject(request: Request) -> str | None:
+	"""Sujet du token Bearer, lu sans accès à la base."""
+	authorization = request.headers.get("authorization", "")
+	scheme, _, token = authorization.partition(" ")
+	if scheme.lower() != "bearer" or not token:
+		return None
+	payload = decode_token(token, settings.SECRET_KEY)
+	return payload.get("sub") if payload else None
+
+
+@dataclass
+class Limit:
+	key_type: str
+	extract: KeyExtractor
+	limit: int
+	window: int
+
+
+class RateLimiter:
+	"""
+	Dépendance FastAPI : à déclarer dans `dependencies=[...]` de la route pour
+	qu'elle passe avant tout hachage ou accès à la base.
+	"""
+
+	_fallback: TTLCache = TTLCache(maxsize=100_000, ttl=3600)
+
+	def __init__(self, scope: str, limits: List[Limit]):
+		self.scope = scope
+		self.limits = limits
+
+	async def _hit_redis(self, keys: List[str], limit: Limit, weight: float) -> bool:
+		allowed = await redis.redis_client.eval(SLIDING_WINDOW_SCRIPT, 2, *keys, limit.limit, limit.window, weight)
+		return bool(allowed)
+
+	def _hit_local(self, keys: List[str], limit: Limit, weight: float) -> bool:
+		previous = self._fallback.get(keys[0], 0)
+		current = self._fallback.get(keys[1], 0)
+		if previous * weight + current >= limit.limit:
+			return False
+		self._fallback[keys[1]] = current + 1
+		return True
+
+	def _keys(self, value: str, limit: Limit, now: float) -> List[str]:
+		window_index = int(now // limit.window)
+		base = f"ratelimit:{self.scope}:{limit.key_type}:{value}"
+		return [f"{base}:{window_index - 1}", f"{base}:{window_index}"]
+
+	async def _hit(self, value: str, limit: Limit) -> tuple[bool, int]:
+		now = time.time()
+		weight = 1 - (now % limit.window) / limit.window
+		keys = self._keys(value, limit, now)
+		retry_after = math.ceil(limit.window - now % limit.window)
+		try:
+			return await self._hit_redis(keys, limit, weight), retry_after
+		except RedisError as e:
+			logger.warning(f"Rate limiter falling back to process memory: {e}")
+			return self._hit_local(keys, limit, weight), retry_after
+
+	async def __call__(self, request: Request):
+		if not settings.RATE_LIMIT_ENABLED:
+			return
+		for limit in self.limits:
+			value = await limit.extract(request)
+			if value is None:
+				continue
+			allowed, retry_after = await self._hit(value, limit)
+			RATE_LIMIT_HITS.labels(self.scope, limit.key_type, "allowed" if allowed else "rejected").inc()
+			if not allowed:
+				raise HTTPException(
+					status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+					detail="Trop de tentatives, veuillez réessayer plus tard",
+					headers={"Retry-After": str(retry_after)}
+				)
+
+	async def reset(self, request: Request, key_type: str):
+		"""
+		Efface le compteur `key_type` après une tentative réussie : seuls les échecs qui se
+		suivent finissent par bloquer un identifiant. Les tentatives restent comptées avant
+		le hachage, le compteur n'est remis à zéro qu'une fois le secret vérifié.
+		"""
+		if not settings.RATE_LIMIT_ENABLED:
+			return
+		for limit in self.limits:
+			if limit.key_type != key_type:
+				continue
+			value = await limit.extract(request)
+			if value is None:
+				continue
+			keys = self._keys(value, limit, time.time())
+			for key in keys:
+				self._fallback.pop(key, None)
+			try:
+				await redis.redis_client.delete(*keys)
+			except RedisError as e:
+				logger.warning(f"Rate limiter reset failed: {e}")
+
+
+login_rate_limit = RateLimiter("login", [
+	Limit("ip", client_ip, limit=30, window=60),
+	Limit("credential", body_field("credential"), limit=5, window=300),
+])
+
+verify_pin_rate_limit = RateLimiter("verify_pin", [
+	Limit("ip", client_ip, limit=30, window=60),
+	Limit("user", token_subject, limit=5, window=300),
+])
+
+request_otp_rate_limit = RateLimiter("request_otp", [
+	Limit("ip", client_ip, limit=10, window=3600),
+	Limit("credential", body_field("email"), limit=3, window=900),
+])
+
+verify_otp_rate_limit = RateLimiter("verify_otp", [
+	Limit("ip", client_ip, limit=20, window=60),
+	Limit("credential", body_field("email"), limit=5, window=900),
+])
@@ -1,12 +1,11 @@
 import enum
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
-import random
 from typing import List, Optional
 
-from sqlalchemy import Index, UniqueConstraint
+from sqlalchemy import Identity, Index, UniqueConstraint, text
 from sqlmodel import SQLModel, Field, Column, DECIMAL, Relationship
 import sqlalchemy.dialects.postgresql as pg
 
@@ -21,9 +20,16 @@ class UserRole(str, Enum):
 
 
 class TokenBlacklist(SQLModel, table=True):
-    id: int | None = Field(default=None, primary_key=True)
-    token: str = Field(index=True, unique=True)
-    expires_at: datetime
+    """Révocations, indexées par l'empreinte sha256 du token et partitionnées par mois d'expiration."""
+    __tablename__ = "tokenblacklist"
+    __table_args__ = {"postgresql_partition_by": "RANGE (expires_at)"}
+
+    token_digest: bytes = Field(sa_column=Column(pg.BYTEA, primary_key=True))
+    expires_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, primary_key=True))
+    revoked_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=text("timezone('utc', now())"), index=True)
+    )
 
 
 class User(SQLModel, table=True):
@@ -89,9 +95,12 @@ class Country(SQLModel, table=True):
 
 class Rate(SQLModel, table=True):
     __tablename__ = "rates"
-    __table_args__ = (Index('idx_rate', 'rate'), )
+    __table_args__ = (
+        Index('idx_rate', 'rate'),
+        UniqueConstraint('currency', name='unique_rate_currency'),
+    )
     id: uuid.UUID = Field(sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4))
-    currency: str = Field(sa_column=Column(pg.VARCHAR, nullable=False, index=True))
+    currency: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
     rate: Decimal = Field(sa_column=Column(DECIMAL(precision=10, scale=2), nullable=False))
 
 
@@ -120,19 +129,46 @@ class PaymentType(SQLModel, table=True):
 
 
 
-def generate_reference():
-    return f"{random.randint(10**7, 10**8 - 1)}"
+# Verrou optimiste : l'ORM ajoute « AND version = ... » à ses UPDATE et incrémente la version
+transaction_version = Column("version", pg.INTEGER, nullable=False, server_default=text("1"))
+
 
 class Transaction(SQLModel, table=True):
     __tablename__ = "transactions"
+    __mapper_args__ = {"version_id_col": transaction_version}
+    # Partitions mensuelles (UTC), voir src/services/transaction_partitions.py. La clé de partition fait
+    # partie de la clé primaire et des contraintes d'unicité
     __table_args__ = (
-        Index("idx_transaction_status", "status"),
-        Index("idx_transaction_reference", "reference")
+        # Différable pour update_script/update_reference_script.py. L'unicité globale des références est
+        # assurée par transaction_references ; cette contrainte sert à la recherche par référence
+        UniqueConstraint(
+            "reference", "timestamp", name="transactions_reference_key", deferrable=True, initially="IMMEDIATE"
+        ),
+        # Pagination par curseur (timestamp, id) décroissant
+        Index("idx_transaction_timestamp_id", text("timestamp DESC"), text("id DESC")),
+        Index("idx_transaction_status_timestamp_id", "status", text("timestamp DESC"), text("id DESC")),
+        Index(
+            "idx_transaction_sender_visible_timestamp_id", "sender_id", text("timestamp DESC"), text("id DESC"),
+            postgresql_where=text("NOT is_hidden")
+        ),
+        # Recherche (voir src/services/transaction_search.py)
+        Index(
+            "idx_transaction_search_text_trgm", "search_text",
+            postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"}
+        ),
+        Index(
+            "idx_transaction_corridor_timestamp_id", "sender_country", "receiver_country",
+            text("timestamp DESC"), text("id DESC")
+        ),
+        Index("idx_transaction_currency_amount", "sender_currency", "sender_amount"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
 
     id: uuid.UUID = Field(sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4))
-    timestamp: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), default=datetime.now))
-    reference: str = Field(sa_column=Column(pg.VARCHAR(8), unique=True), default_factory=generate_reference)
+    timestamp: datetime = Field(sa_column=Column(
+        pg.TIMESTAMP(timezone=True), primary_key=True, default=datetime.now, server_default=text("now()")
+    ))
+    reference: str = Field(sa_column=Column(pg.VARCHAR(8)))
     sender_id: uuid.UUID = Field(foreign_key="users.id")
     sender_country: str = Field(sa_column=Column(pg.VARCHAR(50), nullable=False))
     sender_currency: str = Field(sa_column=Column(pg.VARCHAR(10), nullable=False))
@@ -149,10 +185,58 @@ class Transaction(SQLModel, table=True):
     is_hidden: bool = Field(sa_column=Column(pg.BOOLEAN, default=False), default=False)
     fee_amount: int = Field(sa_column=Column(pg.INTEGER, nullable=False, default="0"))
     status: TransactionStatus = Field(sa_column=Column(pg.VARCHAR(20), nullable=False), default=TransactionStatus.PENDING)
+    version: int = Field(default=1, sa_column=transaction_version)
+    # Maintenu par le trigger transactions_search_text
+    search_text: Optional[str] = Field(default=None, sa_column=Column(pg.TEXT, nullable=True), exclude=True)
 
     sender: User = Relationship(back_populates='transactions')
 
 
+class TransactionDailyStats(SQLModel, table=True):
+    """Agrégats par jour (UTC), corridor, devises et statut ; maintenus par les triggers transactions_daily_stats_*."""
+    __tablename__ = "transaction_daily_stats"
+
+    day: date = Field(sa_column=Column(pg.DATE, primary_key=True))
+    sender_country: str = Field(sa_column=Column(pg.VARCHAR(50), primary_key=True))
+    # '' quand la transaction n'a pas de pays / devise de réception
+    receiver_country: str = Field(sa_column=Column(pg.VARCHAR(50), primary_key=True))
+    sender_currency: str = Field(sa_column=Column(pg.VARCHAR(10), primary_key=True))
+    receiver_currency: str = Field(sa_column=Column(pg.VARCHAR(10), primary_key=True))
+    status: str = Field(sa_column=Column(pg.VARCHAR(20), primary_key=True))
+    count: int = Field(sa_column=Column(pg.BIGINT, nullable=False, server_default=text("0")))
+    sender_amount: int = Field(sa_column=Column(pg.BIGINT, nullable=False, server_default=text("0")))
+    receiver_amount: int = Field(sa_column=Column(pg.BIGINT, nullable=False, server_default=text("0")))
+    fee_amount: int = Field(sa_column=Column(pg.BIGINT, nullable=False, server_default=text("0")))
+
+
+class TransactionReference(SQLModel, table=True):
+    """Références attribuées, partitions archivées comprises ; maintenue par les triggers transactions_references_*."""
+    __tablename__ = "transaction_references"
+
+    reference: str = Field(sa_column=Column(pg.VARCHAR(8), primary_key=True))
+
+
+class TransactionOutbox(SQLModel, table=True):
+    """Événement à livrer à une destination (`sink`), écrit dans la transaction qui le produit. Voir src/services/outbox.py."""
+    __tablename__ = "transaction_outbox"
+    __table_args__ = (Index("idx_transaction_outbox_pending", "id", postgresql_where=text("dead_at IS NULL")),)
+
+    id: Optional[int] = Field(default=None, sa_column=Column(pg.BIGINT, Identity(always=False), primary_key=True))
+    created_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
+    )
+    available_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
+    )
+    sink: str = Field(sa_column=Column(pg.VARCHAR(20), nullable=False))
+    event_type: str = Field(sa_column=Column(pg.VARCHAR(50), nullable=False))
+    payload: dict = Field(sa_column=Column(pg.JSONB, nullable=False))
+    attempts: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")))
+    last_error: Optional[str] = Field(default=None, sa_column=Column(pg.TEXT, nullable=True))
+    # Abandonné après OUTBOX_MAX_ATTEMPTS échecs : conservé pour analyse, plus jamais réservé
+    dead_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=True))
+
+
 class Fee(SQLModel, table=True):
     __tablename__ = 'fees'
     __table_args__ = (Index('idx_from_to', 'from_country_id', 'to_country_id'),)
@@ -180,6 +264,20 @@ class ExchangeRates(SQLModel, table=True):
     to_currency: Currency = Relationship(sa_relationship_kwargs={"foreign_keys": "[ExchangeRates.to_currency_id]"})
 
 
+class ExchangeRateHistory(SQLModel, table=True):
+    """Historique append-only de ex_rates, alimenté par trigger. rate NULL : paire supprimée à cette date."""
+    __tablename__ = "ex_rate_history"
+    __table_args__ = (
+        Index("idx_ex_rate_history_pair_valid_from", "from_currency_id", "to_currency_id", "valid_from"),
+        Index("idx_ex_rate_history_valid_from_brin", "valid_from", postgresql_using="brin"),
+    )
+    id: int | None = Field(default=None, sa_column=Column(pg.BIGINT, primary_key=True, autoincrement=True))
+    from_currency_id: uuid.UUID = Field(sa_column=Column(pg.UUID, nullable=False))
+    to_currency_id: uuid.UUID = Field(sa_column=Column(pg.UUID, nullable=False))
+    rate: Optional[Decimal] = Field(default=None, sa_column=Column(DECIMAL, nullable=True))
+    valid_from: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")))
+
+
 class FAQs(SQLModel, table=True):
     __tablename__ = "faqs"
 
@@ -0,0 +1,106 @@
+"""
+Gestion des partitions mensuelles (PARTITION BY RANGE sur une colonne de date).
+Les partitions suivent la convention `<table>_pYYYYMM` et couvrent [1er du mois, 1er du mois suivant).
+"""
+import logging
+import re
+from datetime import date, datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value: date | datetime) -> date:
+	return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+	month = value.month - 1 + months
+	return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+	return f"{table}_p{month:%Y%m}"
+
+
+async def try_lock(conn: AsyncConnection, key: str) -> bool:
+	"""Verrou consultatif de transaction, pour qu'un seul worker fasse la maintenance à la fois."""
+	result = await conn.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), {"key": key})
+	return bool(result.scalar())
+
+
+async def ensure_monthly_partitions(conn: AsyncConnection, table: str, start: date, months_ahead: int):
+	first = month_start(start)
+	for offset in range(months_ahead + 1):
+		lower = add_months(first, offset)
+		upper = add_months(lower, 1)
+		# Bornes en UTC pour les colonnes timestamptz (le fuseau est ignoré pour les timestamp sans fuseau)
+		await conn.execute(text(
+			f"CREATE TABLE IF NOT EXISTS {partition_name(table, lower)} PARTITION OF {table} "
+			f"FOR VALUES FROM ('{lower.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+		))
+
+
+def _monthly(table: str, names: List[str]) -> List[Tuple[str, date]]:
+	pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+	partitions = []
+	for name in names:
+		match = pattern.match(name)
+		if match:
+			partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+	return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def list_monthly_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, date]]:
+	result = await conn.execute(text(
+		"SELECT child.relname FROM pg_inherits "
+		"JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+		"JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+		"WHERE parent.relname = :table"
+	), {"table": table})
+	return _monthly(table, result.scalars().all())
+
+
+async def list_detached_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, date]]:
+	"""Tables `<table>_pYYYYMM` qui ne sont plus des partitions (détachées, pas encore supprimées)."""
+	result = await conn.execute(text(
+		"SELECT relname FROM pg_class "
+		"WHERE relkind = 'r' AND relnamespace = current_schema()::regnamespace "
+		"AND relname LIKE :prefix AND NOT relispartition"
+	), {"prefix": f"{table}_p%"})
+	return _monthly(table, result.scalars().all())
+
+
+async def partitions_before(conn: AsyncConnection, table: str, cutoff: date) -> List[str]:
+	"""Partitions dont toutes les valeurs sont antérieures à `cutoff`."""
+	return [
+		name for name, lower in await list_monthly_partitions(conn, table)
+		if add_months(lower, 1) <= cutoff
+	]
+
+
+async def detach_partition(conn: AsyncConnection, table: str, name: str):
+	"""
+	DETACH ... CONCURRENTLY : ne bloque ni lectures ni écritures sur `table`, mais doit être
+	exécuté hors transaction (connexion en AUTOCOMMIT) et sans partition par défaut. Un
+	détachement interrompu est terminé avec FINALIZE.
+	"""
+	pending = await conn.execute(text(
+		"SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = to_regclass(:name)"
+	), {"name": name})
+	if pending.scalar():
+		await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} FINALIZE"))
+	else:
+		await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY"))
+	logger.info(f"Partition {name} détachée de {table}")
+
+
+async def drop_partitions_before(conn: AsyncConnection, table: str, cutoff: date) -> List[str]:
+	dropped = await partitions_before(conn, table, cutoff)
+	for name in dropped:
+		await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+		logger.info(f"Partition {name} supprimée")
+	return dropped
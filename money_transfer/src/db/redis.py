@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+redis_client = aioredis.from_url(settings.active_redis_url(), decode_responses=True)
+
+# Identifie ce worker dans les messages qu'il publie
+INSTANCE_ID = uuid.uuid4().hex
+
+MessageHandler = Callable[[dict], Awaitable[None]]
+ResyncHandler = Callable[[], Awaitable[None]]
+
+_handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
+_resync_handlers: List[ResyncHandler] = []
+
+# Abonné et resynchronisé : les messages publiés sont reçus
+_listening = False
+
+
+def subscribe(channel: str, handler: MessageHandler, on_resync: ResyncHandler | None = None):
+	"""
+	Enregistre un handler appelé pour chaque message publié sur `channel`.
+	`on_resync` est rappelé à chaque (re)connexion, pour rattraper les messages manqués.
+	"""
+	_handlers[channel].append(handler)
+	if on_resync is not None:
+		_resync_handlers.append(on_resync)
+
+
+def is_listening() -> bool:
+	"""Faux avant le premier abonnement et pendant une coupure : des messages peuvent être perdus."""
+	return _listening
+
+
+def is_own_message(message: dict) -> bool:
+	return message.get("origin") == INSTANCE_ID
+
+
+async def publish(channel: str, message: dict) -> bool:
+	try:
+		await redis_client.publish(channel, json.dumps({**message, "origin": INSTANCE_ID}, default=str))
+		return True
+	except RedisError as e:
+		logger.error(f"Redis publish error on {channel}: {e}")
+		return False
+
+
+async def publish_many(channel: str, messages: List[dict]) -> bool:
+	"""Plusieurs messages en un aller-retour (pipeline sans MULTI)."""
+	try:
+		async with redis_client.pipeline(transaction=False) as pipe:
+			for message in messages:
+				pipe.publish(channel, json.dumps({**message, "origin": INSTANCE_ID}, default=str))
+			await pipe.execute()
+		return True
+	except RedisError as e:
+		logger.error(f"Redis publish error on {channel}: {e}")
+		return False
+
+
+async def listen(retry_delay: float = 2.0):
+	"""Boucle d'écoute pub/sub, lancée une fois par worker au démarrage de l'application."""
+	global _listening
+	if not _handlers:
+		return
+	while True:
+		pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+		try:
+			await pubsub.subscribe(*_handlers.keys())
+			for resync in _resync_handlers:
+				try:
+					await resync()
+				except Exception:
+					logger.exception("Pub/sub resync failed")
+			_listening = True
+			async for message in pubsub.listen():
+				channel = message["channel"]
+				try:
+					data = json.loads(message["data"])
+				except (TypeError, ValueError):
+					logger.warning(f"Invalid pub/sub payload on {channel}")
+					continue
+				for handler in _handlers.get(channel, []):
+					try:
+						await handler(data)
+					except Exception:
+						logger.exception(f"Pub/sub handler failed on {channel}")
+		except asyncio.CancelledError:
+			_listening = False
+			await pubsub.aclose()
+			raise
+		except (RedisError, OSError) as e:
+			_listening = False
+			logger.error(f"Redis pub/sub connection lost: {e}")
+			await pubsub.aclose()
+			await asyncio.sleep(retry_delay)
@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import BaseModel, Field
+
+
+class QuoteRequest(BaseModel):
+	from_country_id: uuid.UUID
+	to_country_id: uuid.UUID
+	amount: int = Field(..., gt=0)
+	include_fee: bool = False
+
+
+class QuoteRead(BaseModel):
+	from_country: str
+	to_country: str
+	send_currency: str
+	receive_currency: str
+	include_fee: bool
+	send_amount: Decimal
+	fee_percent: Decimal
+	fee_amount: Decimal
+	total_amount: Decimal
+	rate: Decimal
+	rate_type: str
+	receive_amount: Decimal
+
+
+class LockedQuoteRead(QuoteRead):
+	quote_id: str
+	expires_at: datetime
@@ -1,7 +1,9 @@
 import uuid
+from datetime import datetime
 from decimal import Decimal
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class BaseSchema(BaseModel):
@@ -45,6 +47,10 @@ class UpdateExchangeRate(ExchangeRate):
 	rate: Decimal
 
 
+class BulkExchangeRateRequest(BaseModel):
+	items: List[CreateExchangeRate] = Field(..., min_length=1, max_length=1000)
+
+
 class ExchangeRateRead(ExchangeRate):
 	id: uuid.UUID
 	rate: Decimal
@@ -54,3 +60,31 @@ class ExchangeRateWithCurrencyCode(BaseSchema):
 	from_currency: str
 	to_currency: str
 	rate: Decimal
+
+
+class ConvertItem(BaseModel):
+	from_currency: str
+	to_currency: str
+	amount: Decimal
+
+
+class BatchConvertRequest(BaseModel):
+	items: List[ConvertItem] = Field(..., min_length=1, max_length=500)
+
+
+class ConvertResult(BaseModel):
+	from_currency: str
+	to_currency: str
+	original_amount: Decimal
+	converted_amount: Optional[Decimal] = None
+	rate: Optional[Decimal] = None
+	rate_type: Optional[str] = None
+	path: Optional[List[str]] = None
+	error: Optional[str] = None
+
+
+class ExchangeRateHistoryRead(BaseSchema):
+	from_currency: str
+	to_currency: str
+	rate: Optional[Decimal] = None
+	valid_from: datetime
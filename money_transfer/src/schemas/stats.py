@@ -0,0 +1,35 @@
+from datetime import date
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class StatsDimension(str, Enum):
+	DAY = "day"
+	SENDER_COUNTRY = "sender_country"
+	RECEIVER_COUNTRY = "receiver_country"
+	SENDER_CURRENCY = "sender_currency"
+	RECEIVER_CURRENCY = "receiver_currency"
+	STATUS = "status"
+
+
+class TransactionStatsRow(BaseModel):
+	# Seules les dimensions demandées dans group_by sont renseignées
+	day: Optional[date] = None
+	sender_country: Optional[str] = None
+	receiver_country: Optional[str] = None
+	sender_currency: Optional[str] = None
+	receiver_currency: Optional[str] = None
+	status: Optional[str] = None
+	count: int
+	sender_amount: int
+	receiver_amount: int
+	fee_amount: int
+
+
+class TransactionStatsRead(BaseModel):
+	start_date: date
+	end_date: date
+	group_by: List[StatsDimension]
+	rows: List[TransactionStatsRow]
@@ -2,9 +2,9 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from pydantic.v1 import condecimal, root_validator
 
 from src.schemas.user import UserRead
@@ -28,8 +28,33 @@ class TransactionBase(BaseModel):
 
 
 
+# Champs repris du devis verrouillé quand `quote_id` est fourni
+QUOTED_FIELDS = (
+    "sender_country", "sender_currency", "sender_amount",
+    "receiver_country", "receiver_currency", "receiver_amount",
+    "conversion_rate", "include_fee", "fee_amount",
+)
+
+
 class TransactionCreate(TransactionBase):
-    pass
+    quote_id: Optional[str] = None
+    sender_country: Optional[str] = None
+    sender_currency: Optional[str] = None
+    sender_amount: Optional[int] = None
+    receiver_country: Optional[str] = None
+    receiver_currency: Optional[str] = None
+    receiver_amount: Optional[int] = None
+    conversion_rate: Optional[Decimal] = None
+    include_fee: Optional[bool] = None
+    fee_amount: Optional[int] = None
+
+    @model_validator(mode="after")
+    def require_amounts_without_quote(self):
+        if self.quote_id is None:
+            missing = [field for field in QUOTED_FIELDS if getattr(self, field) is None]
+            if missing:
+                raise ValueError(f"Champs requis sans quote_id : {', '.join(missing)}")
+        return self
 
 
 class TransactionRead(TransactionBase):
@@ -38,11 +63,37 @@ class TransactionRead(TransactionBase):
     status: TransactionStatus
     reference: str
     is_hidden: bool
+    version: int
     sender: UserRead
 
 
 class TransactionUpdate(BaseModel):
     status: Optional[TransactionStatus] = None
+    # Version lue par le client : refusée (409) si la transaction a été modifiée depuis
+    version: Optional[int] = None
+
+
+class StatusChange(BaseModel):
+    id: uuid.UUID
+    status: TransactionStatus
+    version: Optional[int] = None
+
+
+class BulkStatusUpdate(BaseModel):
+    items: List[StatusChange] = Field(..., min_length=1, max_length=500)
+
+
+class StatusChangeResult(BaseModel):
+    id: uuid.UUID
+    outcome: Literal["updated", "not_found", "stale", "invalid_transition"]
+    reference: Optional[str] = None
+    status: Optional[TransactionStatus] = None
+    version: Optional[int] = None
+
+
+class BulkStatusUpdateResult(BaseModel):
+    updated: int
+    results: List[StatusChangeResult]
 
 
 class EmailSchema(BaseModel):
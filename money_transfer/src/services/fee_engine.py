@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from src.db import redis
+from src.db.models import Country, Currency, Fee
+from src.db.session import Session
+
+logger = logging.getLogger(__name__)
+
+FEES_CHANNEL = "fees:changed"
+
+
+@dataclass(frozen=True)
+class Corridor:
+	from_country: str
+	to_country: str
+	from_currency: str
+	to_currency: str
+	can_send: bool
+	fee_percent: Decimal
+
+
+class FeeEngine:
+	"""
+	Frais par corridor (pays d'envoi, pays de réception) en mémoire, avec les devises
+	des deux pays. Reconstruit à chaque modification des frais ou des pays ; les autres
+	workers sont prévenus via Redis pub/sub.
+	"""
+
+	def __init__(self):
+		self.corridors: Dict[Tuple[uuid.UUID, uuid.UUID], Corridor] | None = None
+		self._lock = asyncio.Lock()
+
+	async def rebuild(self):
+		async with self._lock:
+			FromCountry = aliased(Country)
+			ToCountry = aliased(Country)
+			FromCurrency = aliased(Currency)
+			ToCurrency = aliased(Currency)
+			# noinspection PyTypeChecker
+			stmt = (
+				select(
+					Fee.from_country_id, Fee.to_country_id, Fee.fee,
+					FromCountry.name, ToCountry.name, FromCountry.can_send,
+					FromCurrency.code, ToCurrency.code
+				)
+				.join(FromCountry, Fee.from_country_id == FromCountry.id)
+				.join(ToCountry, Fee.to_country_id == ToCountry.id)
+				.join(FromCurrency, FromCountry.currency_id == FromCurrency.id)
+				.join(ToCurrency, ToCountry.currency_id == ToCurrency.id)
+			)
+			async with Session() as session:
+				rows = (await session.execute(stmt)).all()
+			self.corridors = {
+				(from_id, to_id): Corridor(
+					from_country=from_name,
+					to_country=to_name,
+					from_currency=from_code,
+					to_currency=to_code,
+					can_send=can_send,
+					fee_percent=Decimal(fee)
+				)
+				for from_id, to_id, fee, from_name, to_name, can_send, from_code, to_code in rows
+			}
+
+	async def get_corridor(self, from_country_id: uuid.UUID, to_country_id: uuid.UUID) -> Corridor | None:
+		if self.corridors is None:
+			await self.rebuild()
+		return self.corridors.get((from_country_id, to_country_id))
+
+	async def refresh(self):
+		"""À appeler après le commit d'une modification de frais ou de pays."""
+		await self.rebuild()
+		await redis.publish(FEES_CHANNEL, {})
+
+	async def on_message(self, message: dict):
+		if not redis.is_own_message(message):
+			await self.rebuild()
+
+
+fee_engine = FeeEngine()
+redis.subscribe(FEES_CHANNEL, fee_engine.on_message, on_resync=fee_engine.rebuild)
@@ -0,0 +1,218 @@
+"""
+Outbox des événements de transaction. Les endpoints n'exécutent plus d'effets de bord après
+le commit : ils ajoutent à la session une ligne transaction_outbox par destination, validée
+ou annulée avec la transaction elle-même. OutboxDispatcher (une tâche par worker) les livre
+par lots :
+
+- websocket : publiés sur le canal Redis TRANSACTION_EVENTS_CHANNEL, chaque worker les
+  remet à ses propres clients abonnés aux sujets de l'événement (src/services/websocket_hub.py) ;
+- email : tâche Celery send_transaction_email ;
+- push : notification OneSignal.
+
+Les lignes sont réservées par FOR UPDATE SKIP LOCKED (les workers se partagent la file) et
+supprimées une fois livrées, dans la même transaction. Livraison « au moins une fois » : si
+le worker s'arrête après la livraison mais avant le commit, l'événement sera livré de
+nouveau ; les messages websocket portent `event_id` pour que les clients dédoublonnent. Un
+échec est retenté plus tard, avec un délai croissant plafonné à OUTBOX_MAX_RETRY_DELAY_SECONDS.
+
+Après OUTBOX_MAX_ATTEMPTS échecs, l'événement est abandonné : dead_at est renseigné, la ligne
+reste dans la table avec last_error mais n'est plus réservée (gauge outbox_dead_events). Pour
+le relancer une fois la cause corrigée :
+    UPDATE transaction_outbox SET dead_at = NULL, attempts = 0, available_at = now() WHERE id = ...
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Sequence, Set
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import Row, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.db import redis
+from src.db.models import TransactionOutbox
+from src.db.session import Session
+from src.schemas.notifications import NotificationCreate
+from src.services.websocket_hub import TRANSACTION_EVENTS_CHANNEL
+from src.utils.email_utils import send_transaction_email
+from src.utils.notification_utils import get_player_ids_for_users, send_one_signal_notification
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET = "websocket"
+EMAIL = "email"
+PUSH = "push"
+
+OUTBOX_EVENTS = Counter("outbox_events_total", "Événements de l'outbox traités", ["sink", "outcome"])
+OUTBOX_LAG = Gauge("outbox_lag_seconds", "Retard du plus ancien événement livrable (depuis sa date de disponibilité)")
+OUTBOX_DEAD = Gauge("outbox_dead_events", "Événements abandonnés après OUTBOX_MAX_ATTEMPTS échecs")
+
+CLAIM = text("""
+	SELECT id, sink, event_type, payload, attempts
+	FROM transaction_outbox
+	WHERE dead_at IS NULL AND available_at <= now()
+	ORDER BY id
+	LIMIT :limit
+	FOR UPDATE SKIP LOCKED
+""")
+DELETE_DELIVERED = text("DELETE FROM transaction_outbox WHERE id = ANY(CAST(:ids AS bigint[]))")
+RESCHEDULE_FAILED = text("""
+	UPDATE transaction_outbox
+	SET attempts = attempts + 1,
+		available_at = now() + make_interval(secs => least(power(2, attempts), :max_delay)),
+		dead_at = CASE WHEN attempts + 1 >= :max_attempts THEN now() END,
+		last_error = :error
+	WHERE id = ANY(CAST(:ids AS bigint[]))
+	RETURNING dead_at IS NOT NULL
+""")
+# Les événements en attente d'un nouvel essai ne comptent pas dans le retard : un échec
+# répété ne doit pas masquer l'état de la file
+OUTBOX_STATE = text("""
+	SELECT
+		extract(epoch FROM now() - min(available_at) FILTER (WHERE dead_at IS NULL AND available_at <= now())),
+		count(*) FILTER (WHERE dead_at IS NOT NULL)
+	FROM transaction_outbox
+""")
+
+Sink = Callable[[Sequence[Row]], Awaitable[Set[int]]]
+
+
+def enqueue(session: AsyncSession, event_type: str, payload: dict, *sinks: str, topics: Sequence[str] = ()):
+	"""
+	À appeler avant le commit de la transaction qui produit l'événement. `payload` doit être
+	sérialisable en JSON ; `topics` : sujets websocket des connexions à qui le remettre.
+	"""
+	session.add_all([
+		TransactionOutbox(
+			sink=sink, event_type=event_type, payload={**payload, "topics": list(topics)} if sink == WEBSOCKET else payload
+		)
+		for sink in sinks
+	])
+
+
+async def deliver_websocket(events: Sequence[Row]) -> Set[int]:
+	messages = []
+	for event in events:
+		data = dict(event.payload)
+		topics = data.pop("topics", [])
+		messages.append({"type": event.event_type, "event_id": event.id, "topics": topics, "data": data})
+	if not await redis.publish_many(TRANSACTION_EVENTS_CHANNEL, messages):
+		return set()
+	return {event.id for event in events}
+
+
+async def deliver_email(events: Sequence[Row]) -> Set[int]:
+	def send() -> Set[int]:
+		delivered = set()
+		for event in events:
+			try:
+				send_transaction_email.delay(event.payload["transaction_id"])
+			except Exception:
+				# Broker indisponible : les suivants échoueraient aussi
+				logger.exception(f"Outbox email event {event.id} not queued")
+				break
+			delivered.add(event.id)
+		return delivered
+
+	# L'envoi au broker est bloquant
+	return await asyncio.to_thread(send)
+
+
+async def deliver_push(events: Sequence[Row]) -> Set[int]:
+	delivered = set()
+	async with Session() as session:
+		for event in events:
+			notification = NotificationCreate(**event.payload)
+			if not notification.player_ids and notification.user_id:
+				notification.player_ids = await get_player_ids_for_users([notification.user_id], session)
+				if not notification.player_ids:
+					# Aucun appareil enregistré : rien à livrer
+					delivered.add(event.id)
+					continue
+			if await send_one_signal_notification(notification, session):
+				delivered.add(event.id)
+	return delivered
+
+
+class OutboxDispatcher:
+
+	def __init__(self, sinks: Dict[str, Sink], batch_size: int, poll_interval: float):
+		self.sinks = sinks
+		self.batch_size = batch_size
+		self.poll_interval = poll_interval
+		self._wake = asyncio.Event()
+
+	def wake(self):
+		"""Après un commit qui a écrit dans l'outbox : livre sans attendre la prochaine scrutation."""
+		self._wake.set()
+
+	async def _deliver(self, sink: str, events: List[Row]) -> tuple[Set[int], str | None]:
+		deliver = self.sinks.get(sink)
+		if deliver is None:
+			return set(), f"Destination inconnue : {sink}"
+		try:
+			return await deliver(events), "Échec de livraison"
+		except Exception as e:
+			logger.exception(f"Outbox sink {sink} failed")
+			return set(), repr(e)
+
+	async def dispatch_batch(self) -> int:
+		"""Livre un lot d'événements en attente ; renvoie le nombre d'événements réservés."""
+		async with Session() as session:
+			events = (await session.execute(CLAIM, {"limit": self.batch_size})).all()
+			by_sink: Dict[str, List[Row]] = defaultdict(list)
+			for event in events:
+				by_sink[event.sink].append(event)
+
+			for sink, sink_events in by_sink.items():
+				delivered, error = await self._deliver(sink, sink_events)
+				failed = [event.id for event in sink_events if event.id not in delivered]
+				if delivered:
+					await session.execute(DELETE_DELIVERED, {"ids": list(delivered)})
+				dead = 0
+				if failed:
+					dead = sum((await session.execute(RESCHEDULE_FAILED, {
+						"ids": failed, "error": error, "max_delay": settings.OUTBOX_MAX_RETRY_DELAY_SECONDS,
+						"max_attempts": settings.OUTBOX_MAX_ATTEMPTS,
+					})).scalars())
+					if dead:
+						logger.error(f"Outbox sink {sink}: {dead} events dead after {settings.OUTBOX_MAX_ATTEMPTS} attempts: {error}")
+				OUTBOX_EVENTS.labels(sink, "delivered").inc(len(delivered))
+				OUTBOX_EVENTS.labels(sink, "failed").inc(len(failed) - dead)
+				OUTBOX_EVENTS.labels(sink, "dead").inc(dead)
+			await session.commit()
+		return len(events)
+
+	async def update_lag(self):
+		async with Session() as session:
+			lag, dead = (await session.execute(OUTBOX_STATE)).one()
+		OUTBOX_LAG.set(lag or 0)
+		OUTBOX_DEAD.set(dead)
+
+	async def run(self):
+		"""Boucle lancée une fois par worker au démarrage de l'application."""
+		while True:
+			self._wake.clear()
+			claimed = 0
+			try:
+				claimed = await self.dispatch_batch()
+				await self.update_lag()
+			except asyncio.CancelledError:
+				raise
+			except Exception:
+				logger.exception("Outbox dispatch failed")
+			if claimed >= self.batch_size:
+				# Lot plein : il reste probablement des événements
+				continue
+			try:
+				await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+			except asyncio.TimeoutError:
+				pass
+
+
+outbox_dispatcher = OutboxDispatcher(
+	{WEBSOCKET: deliver_websocket, EMAIL: deliver_email, PUSH: deliver_push},
+	batch_size=settings.OUTBOX_BATCH_SIZE,
+	poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+)
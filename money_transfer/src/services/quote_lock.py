@@ -0,0 +1,134 @@
+"""
+Devis verrouillés : le devis calculé est gardé dans Redis pendant QUOTE_TTL_SECONDS et
+le client reçoit un identifiant signé, lié à l'utilisateur. La création de transaction
+le consomme et reprend les montants du devis au lieu de ceux du client : le devis est
+d'abord réservé (marqueur quote:<id>:claim, qui expire avec lui), puis supprimé une fois
+la transaction commitée. Un échec avant le commit lève la réservation.
+"""
+import json
+import logging
+import secrets
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.db import redis
+
+logger = logging.getLogger(__name__)
+
+serializer = URLSafeTimedSerializer(secret_key=settings.SECRET_KEY, salt="quote-lock")
+
+# La clé Redis survit un peu à la signature : passé le TTL, c'est la signature qui répond « expiré »
+KEY_GRACE_SECONDS = 5
+
+
+# Réserve le devis s'il existe et n'est pas déjà réservé ; la réservation expire avec lui
+CLAIM_SCRIPT = """
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl <= 0 then
+	return {'missing', ''}
+end
+if not redis.call('SET', KEYS[2], ARGV[1], 'NX', 'PX', ttl) then
+	return {'claimed', ''}
+end
+return {'ok', redis.call('GET', KEYS[1])}
+"""
+
+# Lève la réservation seulement si elle porte encore notre marqueur
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+	return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def quote_key(lock_id: str) -> str:
+	return f"quote:{lock_id}"
+
+
+def claim_key(lock_id: str) -> str:
+	return f"quote:{lock_id}:claim"
+
+
+async def lock_quote(quote: dict, user_id: uuid.UUID) -> tuple[str, datetime]:
+	lock_id = secrets.token_urlsafe(16)
+	try:
+		await redis.redis_client.set(
+			quote_key(lock_id), json.dumps(quote, default=str), ex=settings.QUOTE_TTL_SECONDS + KEY_GRACE_SECONDS
+		)
+	except RedisError as e:
+		logger.error(f"Quote lock not stored: {e}")
+		raise HTTPException(
+			status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+			detail="Impossible de réserver ce devis pour le moment, veuillez réessayer"
+		)
+	quote_id = serializer.dumps({"q": lock_id, "u": str(user_id)})
+	return quote_id, datetime.now(timezone.utc) + timedelta(seconds=settings.QUOTE_TTL_SECONDS)
+
+
+@asynccontextmanager
+async def claim_quote(quote_id: str | None, user_id: uuid.UUID) -> AsyncIterator[dict | None]:
+	"""
+	Devis verrouillé par `user_id`, utilisable une seule fois, à garder pendant l'écriture
+	de la transaction :
+
+		async with claim_quote(quote_id, user.id) as quote:
+			...
+			await session.commit()
+
+	Le devis est supprimé seulement à la sortie normale du bloc, après le commit. Si le bloc
+	échoue, la réservation est levée et le client peut réessayer avec le même devis. Sans
+	`quote_id`, le bloc s'exécute avec None.
+	"""
+	if quote_id is None:
+		yield None
+		return
+	try:
+		payload = serializer.loads(quote_id, max_age=settings.QUOTE_TTL_SECONDS)
+	except SignatureExpired:
+		raise HTTPException(
+			status_code=status.HTTP_410_GONE,
+			detail="Ce devis a expiré, veuillez en demander un nouveau"
+		)
+	except BadSignature:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Devis invalide")
+
+	if payload.get("u") != str(user_id):
+		raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Ce devis appartient à un autre utilisateur")
+
+	keys = [quote_key(payload["q"]), claim_key(payload["q"])]
+	token = secrets.token_urlsafe(16)
+	try:
+		outcome, stored = await redis.redis_client.eval(CLAIM_SCRIPT, 2, *keys, token)
+	except RedisError as e:
+		logger.error(f"Quote lock not readable: {e}")
+		raise HTTPException(
+			status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+			detail="Impossible de vérifier ce devis pour le moment, veuillez réessayer"
+		)
+	if outcome == "missing":
+		raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ce devis a déjà été utilisé")
+	if outcome == "claimed":
+		raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ce devis est déjà en cours d'utilisation")
+
+	try:
+		yield json.loads(stored)
+	except BaseException:
+		try:
+			await redis.redis_client.eval(RELEASE_SCRIPT, 1, keys[1], token)
+		except RedisError as e:
+			# La réservation expire avec le devis
+			logger.error(f"Quote claim not released: {e}")
+		raise
+	try:
+		await redis.redis_client.delete(*keys)
+	except RedisError as e:
+		# La réservation reste en place jusqu'à l'expiration du devis : il ne peut pas resservir
+		logger.error(f"Consumed quote not deleted: {e}")
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from src.config import settings
+from src.db import redis
+from src.db.models import Currency, ExchangeRates
+from src.db.session import Session
+
+logger = logging.getLogger(__name__)
+
+RATES_CHANNEL = "rates:changed"
+
+
+class RateMatrix:
+	"""
+	Taux de change en matrice dense N×N, indexée par code devise. Immuable une fois construite.
+	Les paires absentes sont déduites par des devises intermédiaires : chemin le plus court
+	(en nombre de conversions), puis meilleur taux à longueur égale. Une devise vers
+	elle-même vaut 1, sauf taux explicite.
+	"""
+
+	def __init__(self, codes: List[str], rates: List[Optional[Decimal]], paths: List[Optional[Tuple[str, ...]]]):
+		self.codes = codes
+		self.index = {code: i for i, code in enumerate(codes)}
+		self.size = len(codes)
+		self.rates = rates
+		self.paths = paths
+
+	@classmethod
+	def build(cls, codes: List[str], pairs: List[tuple], max_hops: int = 1) -> "RateMatrix":
+		codes = sorted(codes)
+		index = {code: i for i, code in enumerate(codes)}
+		size = len(codes)
+		edges: Dict[int, Dict[int, Decimal]] = {i: {} for i in range(size)}
+		for from_code, to_code, rate in pairs:
+			edges[index[from_code]][index[to_code]] = rate
+
+		rates: List[Optional[Decimal]] = [None] * (size * size)
+		paths: List[Optional[Tuple[str, ...]]] = [None] * (size * size)
+		for source in range(size):
+			# Même devise : le taux saisi s'il existe, sinon 1
+			rates[source * size + source] = edges[source].get(source, Decimal(1))
+			paths[source * size + source] = (codes[source], codes[source])
+			visited = {source}
+			frontier = {source: (Decimal(1), (codes[source],))}
+			for _ in range(max_hops):
+				reached: Dict[int, Tuple[Decimal, Tuple[str, ...]]] = {}
+				for node, (rate, path) in frontier.items():
+					for target, edge_rate in edges[node].items():
+						if target in visited:
+							continue
+						candidate = rate * edge_rate
+						if target not in reached or candidate > reached[target][0]:
+							reached[target] = (candidate, path + (codes[target],))
+				if not reached:
+					break
+				for target, (rate, path) in reached.items():
+					visited.add(target)
+					rates[source * size + target] = rate
+					paths[source * size + target] = path
+				frontier = reached
+		return cls(codes, rates, paths)
+
+	def __contains__(self, code: str) -> bool:
+		return code in self.index
+
+	def rate(self, from_code: str, to_code: str) -> Optional[Decimal]:
+		return self.rates[self.index[from_code] * self.size + self.index[to_code]]
+
+	def path(self, from_code: str, to_code: str) -> Optional[Tuple[str, ...]]:
+		return self.paths[self.index[from_code] * self.size + self.index[to_code]]
+
+
+class RateEngine:
+	"""
+	Moteur de conversion local au worker. La matrice est reconstruite à chaque
+	modification des taux ou des devises puis remplacée d'un bloc ; les autres
+	workers sont prévenus via Redis pub/sub.
+	"""
+
+	def __init__(self):
+		self.matrix: RateMatrix | None = None
+		self._lock = asyncio.Lock()
+
+	async def rebuild(self):
+		async with self._lock:
+			FromCurrency = aliased(Currency)
+			ToCurrency = aliased(Currency)
+			async with Session() as session:
+				codes = (await session.execute(select(Currency.code))).scalars().all()
+				pairs = (await session.execute(
+					select(FromCurrency.code, ToCurrency.code, ExchangeRates.rate)
+					.join(FromCurrency, ExchangeRates.from_currency_id == FromCurrency.id)
+					.join(ToCurrency, ExchangeRates.to_currency_id == ToCurrency.id)
+				)).all()
+			self.matrix = RateMatrix.build(list(codes), list(pairs), max_hops=settings.RATE_MAX_HOPS)
+
+	async def get_matrix(self) -> RateMatrix:
+		if self.matrix is None:
+			await self.rebuild()
+		return self.matrix
+
+	async def refresh(self):
+		"""À appeler après le commit d'une modification de taux ou de devise."""
+		await self.rebuild()
+		await redis.publish(RATES_CHANNEL, {})
+
+	async def on_message(self, message: dict):
+		if not redis.is_own_message(message):
+			await self.rebuild()
+
+
+rate_engine = RateEngine()
+redis.subscribe(RATES_CHANNEL, rate_engine.on_message, on_resync=rate_engine.rebuild)
@@ -0,0 +1,156 @@
+"""
+Références de transaction à 8 chiffres, uniques par construction. Un compteur issu de la
+séquence transaction_reference_seq passe par une permutation à clé (réseau de Feistel) de
+[0, 90 000 000) : deux compteurs distincts donnent toujours deux références distinctes,
+sans lecture de la table ni nouvel essai, et les références successives ne se suivent pas.
+
+Chaque nextval réserve un bloc de compteurs (INCREMENT BY de la séquence), consommé en
+mémoire par le worker. Les références d'un bloc déjà présentes dans transaction_references
+(anciennes références aléatoires, ou clé changée) sont écartées à la réservation : les
+références existantes ne sont pas modifiées et ne peuvent pas être réattribuées.
+"""
+import asyncio
+import hashlib
+from collections import deque
+from typing import Deque, List
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.db.session import Session
+
+REFERENCE_SEQUENCE = "transaction_reference_seq"
+REFERENCE_OFFSET = 10_000_000
+REFERENCE_DOMAIN = 90_000_000
+
+
+class FeistelPermutation:
+	"""
+	Permutation de [0, domain) : Feistel équilibré sur 2×14 bits (2^28 ≥ 90 000 000), avec
+	« cycle walking » pour les valeurs hors domaine (environ 3 tours de réseau en moyenne).
+	"""
+
+	HALF_BITS = 14
+	HALF_MASK = (1 << HALF_BITS) - 1
+
+	def __init__(self, key: bytes, domain: int = REFERENCE_DOMAIN, rounds: int = 6):
+		assert domain <= 1 << (2 * self.HALF_BITS)
+		self.key = hashlib.sha256(key).digest()
+		self.domain = domain
+		self.rounds = rounds
+		self._tables: List[List[int]] | None = None
+
+	@property
+	def ready(self) -> bool:
+		return self._tables is not None
+
+	def prepare(self):
+		"""Précalcule les fonctions de tour (6 × 2^14 blake2b) ; à appeler hors de la boucle d'événements."""
+		self._round_tables()
+
+	def _round_tables(self) -> List[List[int]]:
+		# Une demi-valeur n'a que 2^14 états : fonctions de tour précalculées une fois
+		if self._tables is None:
+			self._tables = [
+				[
+					int.from_bytes(
+						hashlib.blake2b(bytes((index,)) + half.to_bytes(2, "big"), key=self.key, digest_size=4).digest(),
+						"big"
+					) & self.HALF_MASK
+					for half in range(1 << self.HALF_BITS)
+				]
+				for index in range(self.rounds)
+			]
+		return self._tables
+
+	def _encrypt(self, value: int) -> int:
+		left, right = value >> self.HALF_BITS, value & self.HALF_MASK
+		for table in self._round_tables():
+			left, right = right, left ^ table[right]
+		return (left << self.HALF_BITS) | right
+
+	def _decrypt(self, value: int) -> int:
+		left, right = value >> self.HALF_BITS, value & self.HALF_MASK
+		for table in reversed(self._round_tables()):
+			left, right = right ^ table[left], left
+		return (left << self.HALF_BITS) | right
+
+	def permute(self, value: int) -> int:
+		if not 0 <= value < self.domain:
+			raise ValueError(f"{value} hors de [0, {self.domain})")
+		value = self._encrypt(value)
+		while value >= self.domain:
+			value = self._encrypt(value)
+		return value
+
+	def invert(self, value: int) -> int:
+		if not 0 <= value < self.domain:
+			raise ValueError(f"{value} hors de [0, {self.domain})")
+		value = self._decrypt(value)
+		while value >= self.domain:
+			value = self._decrypt(value)
+		return value
+
+
+class ReferenceAllocator:
+
+	def __init__(self, permutation: FeistelPermutation):
+		self.permutation = permutation
+		# Références encore libres de chaque bloc réservé
+		self._blocks: Deque[List[str]] = deque()
+		# Lu sur la séquence à chaque réservation ; sert seulement à estimer le nombre de blocs
+		self._block_size = 100
+		self._lock = asyncio.Lock()
+
+	async def _reserve(self, blocks: int):
+		"""`blocks` blocs de compteurs en une seule requête, sans les références déjà attribuées."""
+		if not self.permutation.ready:
+			await asyncio.to_thread(self.permutation.prepare)
+		async with Session() as session:
+			rows = (await session.execute(
+				text(
+					f"SELECT nextval('{REFERENCE_SEQUENCE}'), (SELECT increment_by FROM pg_sequences "
+					f"WHERE schemaname = current_schema() AND sequencename = '{REFERENCE_SEQUENCE}') "
+					"FROM generate_series(1, :blocks)"
+				),
+				{"blocks": blocks}
+			)).all()
+			reserved = [
+				[self.format(counter) for counter in range(start, min(start + size, REFERENCE_DOMAIN))]
+				for start, size in rows
+			]
+			taken = set((await session.execute(
+				text("SELECT reference FROM transaction_references WHERE reference = ANY(:references)"),
+				{"references": [reference for block in reserved for reference in block]}
+			)).scalars())
+		for (_, size), block in zip(rows, reserved):
+			self._block_size = size
+			self._blocks.append([reference for reference in block if reference not in taken])
+
+	async def _references(self, count: int) -> List[str]:
+		async with self._lock:
+			available = sum(len(block) for block in self._blocks)
+			while available < count:
+				await self._reserve(-(-(count - available) // self._block_size))
+				available = sum(len(block) for block in self._blocks)
+			references: List[str] = []
+			while len(references) < count:
+				block = self._blocks.popleft()
+				taken = block[:count - len(references)]
+				references.extend(taken)
+				if len(taken) < len(block):
+					self._blocks.appendleft(block[len(taken):])
+			return references
+
+	def format(self, counter: int) -> str:
+		return str(REFERENCE_OFFSET + self.permutation.permute(counter))
+
+	async def allocate(self) -> str:
+		return (await self._references(1))[0]
+
+	async def allocate_many(self, count: int) -> List[str]:
+		"""Pour les traitements par lots : les blocs manquants sont réservés en une requête."""
+		return await self._references(count)
+
+
+reference_allocator = ReferenceAllocator(FeistelPermutation((settings.REFERENCE_KEY or settings.SECRET_KEY).encode()))
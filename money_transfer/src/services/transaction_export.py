@@ -0,0 +1,132 @@
+"""
+Export des transactions en CSV ou NDJSON, éventuellement compressé en gzip. Les lignes
+sont lues par un curseur côté serveur, EXPORT_CHUNK_ROWS à la fois, et chaque lot est
+écrit puis envoyé avant de lire le suivant : la mémoire reste constante quel que soit le
+nombre de lignes exportées. Mêmes filtres que la recherche (TransactionFilters).
+"""
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Iterable, List, Literal
+
+from sqlalchemy import Row
+from sqlmodel import select
+
+from src.db.models import Transaction, User
+from src.db.session import Session
+from src.services.transaction_search import TransactionFilters, apply_filters
+
+EXPORT_CHUNK_ROWS = 2000
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+EXPORT_COLUMNS = [
+	Transaction.id,
+	Transaction.reference,
+	Transaction.timestamp,
+	Transaction.status,
+	Transaction.sender_id,
+	User.full_name.label("sender_name"),
+	User.phone.label("sender_phone"),
+	User.email.label("sender_email"),
+	Transaction.sender_country,
+	Transaction.sender_currency,
+	Transaction.sender_amount,
+	Transaction.receiver_country,
+	Transaction.receiver_currency,
+	Transaction.receiver_amount,
+	Transaction.conversion_rate,
+	Transaction.fee_amount,
+	Transaction.include_fee,
+	Transaction.payment_type,
+	Transaction.recipient_name,
+	Transaction.recipient_phone,
+	Transaction.recipient_type,
+]
+FIELD_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+# Une cellule commençant par l'un de ces caractères serait évaluée comme formule par un tableur
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def export_filename(export_format: ExportFormat, gzip: bool) -> str:
+	return f"transactions.{export_format}" + (".gz" if gzip else "")
+
+
+def media_type(export_format: ExportFormat, gzip: bool) -> str:
+	return "application/gzip" if gzip else MEDIA_TYPES[export_format]
+
+
+def _csv_cell(value):
+	if value is None:
+		return ""
+	if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+		return "'" + value
+	return value
+
+
+def _json_value(value):
+	# uuid, datetime, Decimal
+	return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _write_csv(rows: Iterable[Row], header: bool) -> str:
+	buffer = io.StringIO()
+	writer = csv.writer(buffer)
+	if header:
+		writer.writerow(FIELD_NAMES)
+	writer.writerows([_csv_cell(value) for value in row] for row in rows)
+	return buffer.getvalue()
+
+
+def _write_ndjson(rows: Iterable[Row]) -> str:
+	return "".join(
+		json.dumps(dict(zip(FIELD_NAMES, row)), ensure_ascii=False, separators=(",", ":"), default=_json_value) + "\n"
+		for row in rows
+	)
+
+
+async def export_transactions(
+		filters: TransactionFilters,
+		export_format: ExportFormat = "csv",
+		gzip: bool = False
+) -> AsyncIterator[bytes]:
+	"""
+	Générateur pour StreamingResponse. Il ouvre sa propre session : celle de get_session est
+	refermée avant que la réponse ne soit envoyée.
+	"""
+	stmt = apply_filters(
+		select(*EXPORT_COLUMNS).join(User, User.id == Transaction.sender_id, isouter=True),
+		filters
+	).order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+
+	# wbits=31 : flux au format gzip
+	compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+	def encode(text: str) -> bytes:
+		data = text.encode()
+		return compressor.compress(data) if compressor else data
+
+	header = True
+	async with Session() as session:
+		result = await session.stream(stmt, execution_options={"yield_per": EXPORT_CHUNK_ROWS})
+		async for rows in result.partitions():
+			if export_format == "csv":
+				chunk = encode(_write_csv(rows, header))
+			else:
+				chunk = encode(_write_ndjson(rows))
+			header = False
+			if chunk:
+				yield chunk
+
+	tail: List[bytes] = []
+	if header and export_format == "csv":
+		# Aucun résultat : l'en-tête seul
+		tail.append(encode(_write_csv([], True)))
+	if compressor:
+		tail.append(compressor.flush())
+	if any(tail):
+		yield b"".join(tail)
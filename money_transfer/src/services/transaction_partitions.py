@@ -0,0 +1,92 @@
+"""
+Partitions mensuelles de transactions (RANGE sur timestamp, mois UTC).
+
+Les partitions à venir sont créées par ensure_transaction_partitions (planifiée). Celles
+dont toutes les transactions ont plus de TRANSACTION_RETENTION_MONTHS mois sont archivées
+par update_script/archive_transactions.py : détachées sans bloquer la table, copiées par
+COPY dans un fichier CSV gzip, puis supprimées. Les agrégats de transaction_daily_stats
+ne sont pas modifiés par le détachement : les statistiques gardent tout l'historique.
+De même, les références archivées restent dans transaction_references et ne sont pas réattribuées.
+
+Un fichier d'archive se recharge dans une table à part (le recharger dans transactions
+compterait ses lignes deux fois dans les agrégats) :
+    gunzip -c transactions_p202401.csv.gz | psql -c "\\copy transactions_p202401 FROM STDIN CSV HEADER"
+"""
+import gzip
+import logging
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.db import partitions
+from src.db.models import Transaction
+from src.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = Transaction.__tablename__
+
+
+async def ensure_transaction_partitions():
+	"""Sans partition pour le mois d'une transaction, son insertion échoue : elles sont créées à l'avance."""
+	async with engine.begin() as conn:
+		if not await partitions.try_lock(conn, "transactions-partitions"):
+			return
+		await partitions.ensure_monthly_partitions(
+			conn, TABLE, datetime.now(timezone.utc).date(), months_ahead=settings.TRANSACTION_PARTITION_MONTHS_AHEAD
+		)
+
+
+def retention_cutoff(today: date, months: int) -> date:
+	return partitions.add_months(partitions.month_start(today), -months)
+
+
+async def _write_archive(driver_connection, name: str, directory: Path) -> Path:
+	"""COPY de la table détachée vers `<name>.csv.gz`, écrit à côté puis renommé une fois complet."""
+	path = directory / f"{name}.csv.gz"
+	partial = directory / f"{name}.csv.gz.part"
+	with gzip.open(partial, "wb") as output:
+		copied = await driver_connection.copy_from_table(name, output=output, format="csv", header=True)
+		output.flush()
+	rows = await driver_connection.fetchval(f"SELECT count(*) FROM {name}")
+	if copied != f"COPY {rows}":
+		raise RuntimeError(f"Archive incomplète pour {name} : {copied}, {rows} lignes attendues")
+	with open(partial, "rb") as written:
+		os.fsync(written.fileno())
+	partial.replace(path)
+	return path
+
+
+async def archive_transaction_partitions(
+		directory: Path, cutoff: date, dry_run: bool = False
+) -> List[Path]:
+	"""
+	Archive les partitions entièrement antérieures à `cutoff`, de la plus ancienne à la plus
+	récente. Reprend aussi les tables déjà détachées par une exécution interrompue.
+	"""
+	archives = []
+	# DETACH ... CONCURRENTLY ne s'exécute pas dans une transaction
+	async with engine.connect() as conn:
+		conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+		attached = await partitions.partitions_before(conn, TABLE, cutoff)
+		detached = [name for name, _ in await partitions.list_detached_partitions(conn, TABLE)]
+		if dry_run:
+			for name in detached + attached:
+				logger.info(f"{name} serait archivée dans {directory}")
+			return []
+
+		directory.mkdir(parents=True, exist_ok=True)
+		for name in attached:
+			await partitions.detach_partition(conn, TABLE, name)
+		raw = await conn.get_raw_connection()
+		for name in sorted(detached + attached):
+			path = await _write_archive(raw.driver_connection, name, directory)
+			# Supprimée seulement une fois l'archive vérifiée et écrite sur disque
+			await conn.execute(text(f"DROP TABLE {name}"))
+			logger.info(f"{name} archivée dans {path}")
+			archives.append(path)
+	return archives
@@ -0,0 +1,110 @@
+"""
+Recherche et filtres des transactions. Le texte recherché (référence, bénéficiaire,
+expéditeur) est dénormalisé par trigger dans transactions.search_text, en minuscules et
+sans accents, et indexé en trigrammes (pg_trgm) : un LIKE '%...%' passe par l'index GIN
+et les résultats sont classés par word_similarity. Les filtres sont partagés avec l'export.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+from sqlmodel.sql.expression import Select
+
+from src.db.models import Transaction
+from src.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+@dataclass
+class TransactionFilters:
+	"""Dépendance FastAPI (`filters: TransactionFilters = Depends()`), aussi instanciable directement."""
+	q: Optional[str] = None
+	# Un ou plusieurs statuts séparés par des virgules, comme les envoie le dashboard
+	status: Optional[str] = None
+	start_date: Optional[date] = None
+	end_date: Optional[date] = None
+	min_amount: Optional[int] = None
+	max_amount: Optional[int] = None
+	sender_country: Optional[str] = None
+	receiver_country: Optional[str] = None
+	currency: Optional[str] = None
+
+	def __post_init__(self):
+		self.q = (self.q or "").strip() or None
+
+	@property
+	def statuses(self) -> list[str]:
+		return [value.strip() for value in (self.status or "").split(",") if value.strip()]
+
+
+def normalized_query(q: str):
+	"""Même normalisation que transaction_search_document() côté base."""
+	return func.lower(func.unaccent(q))
+
+
+def search_rank(q: str):
+	return func.word_similarity(normalized_query(q), Transaction.search_text)
+
+
+def apply_filters(stmt: Select, filters: TransactionFilters) -> Select:
+	if filters.q:
+		escaped = filters.q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+		stmt = stmt.where(
+			Transaction.search_text.like(func.concat("%", normalized_query(escaped), "%"), escape="\\")
+		)
+	if filters.statuses:
+		stmt = stmt.where(Transaction.status.in_(filters.statuses))
+	if filters.start_date:
+		stmt = stmt.where(Transaction.timestamp >= datetime.combine(filters.start_date, time.min, timezone.utc))
+	if filters.end_date:
+		# Date de fin incluse
+		end = datetime.combine(filters.end_date + timedelta(days=1), time.min, timezone.utc)
+		stmt = stmt.where(Transaction.timestamp < end)
+	if filters.min_amount is not None:
+		stmt = stmt.where(Transaction.sender_amount >= filters.min_amount)
+	if filters.max_amount is not None:
+		stmt = stmt.where(Transaction.sender_amount <= filters.max_amount)
+	if filters.sender_country:
+		stmt = stmt.where(Transaction.sender_country == filters.sender_country)
+	if filters.receiver_country:
+		stmt = stmt.where(Transaction.receiver_country == filters.receiver_country)
+	if filters.currency:
+		stmt = stmt.where(Transaction.sender_currency == filters.currency)
+	return stmt
+
+
+async def search_page(
+		session: AsyncSession,
+		filters: TransactionFilters,
+		response: Response,
+		limit: int,
+		cursor: Optional[str] = None
+) -> Sequence[Transaction]:
+	"""
+	Une page de résultats, avec l'expéditeur chargé. Avec `q` : par pertinence puis du plus
+	récent au plus ancien, sinon par date seulement. Le curseur de la page suivante est
+	renvoyé dans l'en-tête X-Next-Cursor.
+	"""
+	keys = [Transaction.timestamp, Transaction.id]
+	types = [datetime.fromisoformat, uuid.UUID]
+	if filters.q:
+		keys.insert(0, search_rank(filters.q))
+		types.insert(0, float)
+
+	stmt = apply_filters(select(Transaction, *keys[:-2]).options(joinedload(Transaction.sender)), filters)
+	stmt = stmt.order_by(*(key.desc() for key in keys))
+	if cursor:
+		stmt = stmt.where(tuple_(*keys) < tuple_(*decode_cursor(cursor, *types)))
+
+	# Une ligne de plus pour savoir s'il reste une page
+	rows = (await session.execute(stmt.limit(limit + 1))).all()
+	if len(rows) > limit:
+		rows = rows[:limit]
+		transaction, *rank = rows[-1]
+		response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*rank, transaction.timestamp, transaction.id)
+	return [row[0] for row in rows]
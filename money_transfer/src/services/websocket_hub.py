@@ -0,0 +1,345 @@
+"""
+Diffusion websocket entre workers. Les événements sont publiés sur un canal Redis (voir
+src/services/outbox.py) avec la liste des sujets qu'ils concernent ; chaque worker les
+remet à ses propres connexions abonnées à l'un de ces sujets, et à elles seules.
+
+Sujets des transactions :
+- `user:<id>` : les transactions d'un utilisateur, abonnement automatique à la connexion ;
+- `admin:pending` : les transactions qui entrent ou sortent du statut « En cours » (admins) ;
+- `corridor:<pays d'envoi>:<pays de réception>` : un corridor (admins et agents), pays vide
+  quand il n'est pas renseigné (`corridor:France:`).
+
+Le client s'abonne en envoyant `{"action": "subscribe", "topics": [...]}` (ou
+"unsubscribe") et reçoit en réponse `{"type": "SUBSCRIPTIONS", "topics": [...], "refused": [...]}`.
+
+Le routage passe par un index en mémoire sujet -> connexions. Un message est sérialisé
+une seule fois par worker, puis déposé sans attente dans la file bornée de chaque
+connexion destinataire ; une tâche d'écriture par connexion l'envoie. Un client lent
+ne retarde donc pas les autres : quand sa file est pleine, ou qu'un envoi dépasse
+WEBSOCKET_SEND_TIMEOUT_SECONDS, il est déconnecté (code 1013, « réessayer plus tard ») et
+se reconnecte.
+
+Le token n'est vérifié qu'à l'ouverture : la connexion est ensuite fermée (code 1008) à son
+expiration, ou dès qu'une révocation du token est publiée sur REVOCATION_CHANNEL. Quand un
+utilisateur est modifié (USER_INVALIDATION_CHANNEL), son rôle est relu et les sujets qu'il ne
+peut plus suivre lui sont retirés. Après une coupure pub/sub, tout est revérifié.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from prometheus_client import Counter, Gauge
+from sqlmodel import select
+
+from src.auth.revocation import REVOCATION_CHANNEL, revocation_cache
+from src.auth.user_cache import USER_INVALIDATION_CHANNEL
+from src.config import settings
+from src.db import redis
+from src.db.models import User
+from src.db.session import Session
+from src.schemas.user import UserRead, UserRole
+from src.utils.utils import TransactionStatus
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_EVENTS_CHANNEL = "transactions:events"
+
+ADMIN_PENDING_TOPIC = "admin:pending"
+
+# 1013 Try Again Later
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# 1008 Policy Violation : token expiré ou révoqué, utilisateur supprimé
+POLICY_VIOLATION_CLOSE_CODE = 1008
+# 1011 Internal Error
+INTERNAL_ERROR_CLOSE_CODE = 1011
+
+USAGE = 'Message attendu : {"action": "subscribe" | "unsubscribe", "topics": [...]}'
+
+WEBSOCKET_CONNECTIONS = Gauge("websocket_connections", "Connexions websocket ouvertes sur ce worker")
+WEBSOCKET_EVICTIONS = Counter("websocket_evictions_total", "Connexions websocket fermées car trop lentes", ["reason"])
+WEBSOCKET_MESSAGES = Counter("websocket_messages_total", "Messages websocket déposés dans les files d'envoi")
+
+
+def user_topic(user_id) -> str:
+	return f"user:{user_id}"
+
+
+def corridor_topic(sender_country: str | None, receiver_country: str | None) -> str:
+	return f"corridor:{sender_country or ''}:{receiver_country or ''}"
+
+
+def transaction_topics(sender_id, sender_country: str, receiver_country: str, *statuses: str) -> List[str]:
+	"""Sujets d'un événement de transaction ; `statuses` : ancien et nouveau statut."""
+	topics = [user_topic(sender_id), corridor_topic(sender_country, receiver_country)]
+	if TransactionStatus.PENDING in statuses:
+		topics.append(ADMIN_PENDING_TOPIC)
+	return topics
+
+
+def can_subscribe(principal: UserRead, topic: str) -> bool:
+	if topic == user_topic(principal.id):
+		return True
+	if principal.role == UserRole.ADMIN:
+		return topic == ADMIN_PENDING_TOPIC or topic.startswith(("user:", "corridor:"))
+	if principal.role == UserRole.AGENT:
+		return topic.startswith("corridor:")
+	return False
+
+
+def default_topics(principal: UserRead) -> List[str]:
+	return [user_topic(principal.id)]
+
+
+async def load_principals(user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, UserRead]:
+	async with Session() as session:
+		users = (await session.execute(select(User).where(User.id.in_(user_ids)))).scalars().all()
+	return {user.id: UserRead.model_validate(user) for user in users}
+
+
+class HubConnection:
+
+	def __init__(self, websocket: WebSocket, principal: UserRead, token_digest: bytes, expires_at: float, queue_size: int):
+		self.websocket = websocket
+		self.principal = principal
+		self.token_digest = token_digest
+		# Expiration du token (secondes epoch)
+		self.expires_at = expires_at
+		self.topics: Set[str] = set()
+		self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+		self.close_code: int | None = None
+		self.close_reason = ""
+		self.writer: asyncio.Task | None = None
+
+	def offer(self, text: str) -> bool:
+		try:
+			self.queue.put_nowait(text)
+			return True
+		except asyncio.QueueFull:
+			return False
+
+	def close(self, code: int, reason: str = ""):
+		"""Arrête l'envoi ; serve() ferme ensuite la connexion avec ce code."""
+		if self.close_code is None:
+			self.close_code, self.close_reason = code, reason
+			self.writer.cancel()
+
+	def evict(self, reason: str):
+		if self.close_code is None:
+			WEBSOCKET_EVICTIONS.labels(reason).inc()
+			self.close(SLOW_CONSUMER_CLOSE_CODE)
+
+	async def write(self, send_timeout: float):
+		while True:
+			text = await self.queue.get()
+			try:
+				await asyncio.wait_for(self.websocket.send_text(text), send_timeout)
+			except asyncio.TimeoutError:
+				self.evict("send_timeout")
+				return
+			except WebSocketDisconnect:
+				return
+
+
+class WebSocketHub:
+
+	def __init__(
+			self,
+			channel: str,
+			queue_size: int,
+			send_timeout: float,
+			max_topics: int,
+			authorize: Callable[[UserRead, str], bool],
+			initial_topics: Callable[[UserRead], Iterable[str]],
+			load_principals: Callable[[List[uuid.UUID]], Awaitable[Dict[uuid.UUID, UserRead]]],
+	):
+		self.channel = channel
+		self.queue_size = queue_size
+		self.send_timeout = send_timeout
+		self.max_topics = max_topics
+		self.authorize = authorize
+		self.initial_topics = initial_topics
+		self.load_principals = load_principals
+		self.connections: Set[HubConnection] = set()
+		# Index de routage : sujet -> connexions abonnées
+		self.subscriptions: Dict[str, Set[HubConnection]] = {}
+		# Pour les révocations et les changements de rôle
+		self.by_token: Dict[bytes, Set[HubConnection]] = {}
+		self.by_user: Dict[uuid.UUID, Set[HubConnection]] = {}
+
+	async def publish(self, message: dict) -> bool:
+		"""Remet `message` aux abonnés de `message["topics"]` sur tous les workers, celui-ci compris."""
+		return await redis.publish(self.channel, message)
+
+	def subscribe(self, connection: HubConnection, topics: Iterable[str]) -> List[str]:
+		"""Abonne la connexion aux sujets autorisés ; renvoie les sujets refusés."""
+		refused = []
+		for topic in topics:
+			if topic in connection.topics:
+				continue
+			if len(connection.topics) >= self.max_topics or not self.authorize(connection.principal, topic):
+				refused.append(topic)
+				continue
+			connection.topics.add(topic)
+			self.subscriptions.setdefault(topic, set()).add(connection)
+		return refused
+
+	def unsubscribe(self, connection: HubConnection, topics: Iterable[str]):
+		for topic in topics:
+			connection.topics.discard(topic)
+			subscribers = self.subscriptions.get(topic)
+			if subscribers is not None:
+				subscribers.discard(connection)
+				if not subscribers:
+					del self.subscriptions[topic]
+
+	def send(self, connection: HubConnection, text: str):
+		if connection.offer(text):
+			WEBSOCKET_MESSAGES.inc()
+		else:
+			connection.evict("queue_full")
+
+	def route(self, topics: Iterable[str], text: str):
+		"""Remet un message déjà sérialisé, une seule fois, à chaque connexion de ce worker abonnée à l'un des sujets."""
+		recipients = set()
+		for topic in topics:
+			recipients.update(self.subscriptions.get(topic, ()))
+		for connection in recipients:
+			self.send(connection, text)
+
+	async def on_message(self, message: dict):
+		self.route(message.get("topics") or [], json.dumps(
+			{key: value for key, value in message.items() if key not in ("origin", "topics")}, default=str
+		))
+
+	async def on_revocation(self, message: dict):
+		for connection in list(self.by_token.get(bytes.fromhex(message["digest"]), ())):
+			connection.close(POLICY_VIOLATION_CLOSE_CODE, "Token révoqué")
+
+	async def on_user_invalidation(self, message: dict):
+		await self.refresh_principals([uuid.UUID(message["user_id"])])
+
+	async def refresh_principals(self, user_ids: Iterable[uuid.UUID]):
+		"""Relit les utilisateurs connectés à ce worker et retire les sujets qu'ils ne peuvent plus suivre."""
+		user_ids = [user_id for user_id in user_ids if user_id in self.by_user]
+		if not user_ids:
+			return
+		principals = await self.load_principals(user_ids)
+		for user_id in user_ids:
+			principal = principals.get(user_id)
+			for connection in list(self.by_user.get(user_id, ())):
+				if principal is None:
+					connection.close(POLICY_VIOLATION_CLOSE_CODE, "Utilisateur introuvable")
+					continue
+				connection.principal = principal
+				refused = sorted(topic for topic in connection.topics if not self.authorize(principal, topic))
+				if refused:
+					self.unsubscribe(connection, refused)
+					self.send(connection, json.dumps(
+						{"type": "SUBSCRIPTIONS", "topics": sorted(connection.topics), "refused": refused}
+					))
+
+	async def resync(self):
+		"""Après une (re)connexion pub/sub : révocations et modifications d'utilisateurs ont pu être manquées."""
+		for digest, connections in list(self.by_token.items()):
+			if revocation_cache.contains_digest(digest):
+				for connection in list(connections):
+					connection.close(POLICY_VIOLATION_CLOSE_CODE, "Token révoqué")
+		await self.refresh_principals(list(self.by_user))
+
+	def _handle(self, connection: HubConnection, text: str):
+		try:
+			request = json.loads(text)
+			action, topics = request["action"], request["topics"]
+			if action not in ("subscribe", "unsubscribe") or not isinstance(topics, list) \
+					or not all(isinstance(topic, str) for topic in topics):
+				raise ValueError
+		except (ValueError, KeyError, TypeError):
+			self.send(connection, json.dumps({"type": "ERROR", "detail": USAGE}))
+			return
+		refused = []
+		if action == "subscribe":
+			refused = self.subscribe(connection, topics)
+		else:
+			self.unsubscribe(connection, topics)
+		self.send(connection, json.dumps(
+			{"type": "SUBSCRIPTIONS", "topics": sorted(connection.topics), "refused": refused}
+		))
+
+	async def _read(self, connection: HubConnection):
+		# receive() et non receive_text() : une trame binaire n'a pas de clé "text" (KeyError)
+		try:
+			while True:
+				message = await connection.websocket.receive()
+				if message["type"] == "websocket.disconnect":
+					raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+				if message.get("text") is not None:
+					self._handle(connection, message["text"])
+				else:
+					self.send(connection, json.dumps({"type": "ERROR", "detail": f"Trame texte attendue. {USAGE}"}))
+		except WebSocketDisconnect:
+			pass
+
+	async def serve(self, websocket: WebSocket, principal: UserRead, token_digest: bytes, expires_at: float):
+		"""
+		Point d'entrée d'un endpoint websocket authentifié : rend la main quand la connexion est fermée.
+		`token_digest` et `expires_at` (secondes epoch) : token présenté à l'ouverture.
+		"""
+		await websocket.accept()
+		connection = HubConnection(websocket, principal, token_digest, expires_at, self.queue_size)
+		connection.writer = asyncio.create_task(connection.write(self.send_timeout))
+		reader = asyncio.create_task(self._read(connection))
+		self.connections.add(connection)
+		self.by_token.setdefault(token_digest, set()).add(connection)
+		self.by_user.setdefault(principal.id, set()).add(connection)
+		self.subscribe(connection, self.initial_topics(principal))
+		WEBSOCKET_CONNECTIONS.inc()
+		try:
+			# Révocation publiée entre l'authentification et l'enregistrement de la connexion
+			if revocation_cache.contains_digest(token_digest):
+				connection.close(POLICY_VIOLATION_CLOSE_CODE, "Token révoqué")
+			done, _ = await asyncio.wait(
+				{reader, connection.writer}, timeout=max(0.0, expires_at - time.time()), return_when=asyncio.FIRST_COMPLETED
+			)
+			if not done:
+				connection.close(POLICY_VIOLATION_CLOSE_CODE, "Token expiré")
+		finally:
+			self.connections.discard(connection)
+			self.unsubscribe(connection, list(connection.topics))
+			for index, key in ((self.by_token, token_digest), (self.by_user, principal.id)):
+				index[key].discard(connection)
+				if not index[key]:
+					del index[key]
+			WEBSOCKET_CONNECTIONS.dec()
+			for task in (reader, connection.writer):
+				task.cancel()
+			# wait et non gather : si serve() est elle-même annulée, c'est sa propre annulation qui remonte
+			await asyncio.wait({reader, connection.writer})
+			for task in (reader, connection.writer):
+				if not task.cancelled() and task.exception() is not None:
+					logger.error("Websocket connection task failed", exc_info=task.exception())
+					connection.close(INTERNAL_ERROR_CLOSE_CODE)
+			if connection.close_code is not None:
+				try:
+					await asyncio.wait_for(
+						websocket.close(code=connection.close_code, reason=connection.close_reason), self.send_timeout
+					)
+				except (asyncio.TimeoutError, RuntimeError, WebSocketDisconnect, OSError):
+					pass
+
+
+transaction_hub = WebSocketHub(
+	TRANSACTION_EVENTS_CHANNEL,
+	queue_size=settings.WEBSOCKET_QUEUE_SIZE,
+	send_timeout=settings.WEBSOCKET_SEND_TIMEOUT_SECONDS,
+	max_topics=settings.WEBSOCKET_MAX_TOPICS,
+	authorize=can_subscribe,
+	initial_topics=default_topics,
+	load_principals=load_principals,
+)
+redis.subscribe(TRANSACTION_EVENTS_CHANNEL, transaction_hub.on_message)
+redis.subscribe(REVOCATION_CHANNEL, transaction_hub.on_revocation)
+redis.subscribe(USER_INVALIDATION_CHANNEL, transaction_hub.on_user_invalidation, on_resync=transaction_hub.resync)
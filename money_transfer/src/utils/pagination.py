@@ -0,0 +1,74 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel.sql.expression import Select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(*values) -> str:
+    """Curseur opaque : clé de tri de la dernière ligne servie (dates, UUID, nombres)."""
+    encoded = [value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, uuid.UUID) else value
+               for value in values]
+    raw = json.dumps(encoded, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> tuple:
+    """`types` convertit chaque élément, par ex. `decode_cursor(c, datetime.fromisoformat, uuid.UUID)`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur de pagination invalide")
+
+
+async def paginate(
+        session: AsyncSession,
+        stmt: Select,
+        timestamp_column,
+        id_column,
+        response: Response,
+        limit: int,
+        cursor: Optional[str] = None,
+        page: int = 1
+) -> Sequence:
+    """
+    Pagination par curseur (timestamp, id) décroissant ; sans curseur, page par OFFSET
+    comme auparavant. Le curseur de la page suivante est renvoyé dans l'en-tête
+    X-Next-Cursor, absent sur la dernière page.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE or page < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit doit être compris entre 1 et {MAX_PAGE_SIZE}, page doit être au moins 1"
+        )
+    stmt = stmt.order_by(timestamp_column.desc(), id_column.desc())
+    if cursor:
+        stmt = stmt.where(
+            tuple_(timestamp_column, id_column) < tuple_(*decode_cursor(cursor, datetime.fromisoformat, uuid.UUID))
+        )
+    else:
+        stmt = stmt.offset((page - 1) * limit)
+
+    # Une ligne de plus pour savoir s'il reste une page
+    result = await session.execute(stmt.limit(limit + 1))
+    rows = result.scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, timestamp_column.key), getattr(last, id_column.key)
+        )
+    return rows
@@ -4,4 +4,10 @@ from enum import Enum
 class TransactionStatus(str, Enum):
     PENDING = "En cours"
     COMPLETED = "Éffectuée"
-    CANCELLED = "Annulée" 
\ No newline at end of file
+    CANCELLED = "Annulée"
+
+
+# Changements de statut autorisés par la mise à jour groupée
+STATUS_TRANSITIONS = {
+    TransactionStatus.PENDING: {TransactionStatus.COMPLETED, TransactionStatus.CANCELLED},
+}
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from src.auth.revocation import purge_expired_revocations
+from src.config import settings
+from src.services.transaction_partitions import ensure_transaction_partitions
+
+scheduler = AsyncIOScheduler(timezone="UTC")
+
+# Chaque worker uvicorn planifie les mêmes tâches : elles se protègent par verrou consultatif.
+scheduler.add_job(
+    purge_expired_revocations,
+    "interval",
+    minutes=settings.REVOCATION_PURGE_INTERVAL_MINUTES,
+    id="purge_expired_revocations",
+    next_run_time=datetime.now(timezone.utc),
+    coalesce=True,
+    max_instances=1,
+)
+scheduler.add_job(
+    ensure_transaction_partitions,
+    "interval",
+    hours=12,
+    id="ensure_transaction_partitions",
+    next_run_time=datetime.now(timezone.utc),
+    coalesce=True,
+    max_instances=1,
+)
@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+from src.services.rate_engine import RateMatrix
+
+
+def test_same_currency_defaults_to_one():
+	matrix = RateMatrix.build(["EUR", "XOF"], [("EUR", "XOF", Decimal("655.957"))])
+	assert matrix.rate("XOF", "XOF") == Decimal(1)
+	assert matrix.path("XOF", "XOF") == ("XOF", "XOF")
+
+
+def test_same_currency_uses_explicit_rate():
+	matrix = RateMatrix.build(["EUR", "XOF"], [("XOF", "XOF", Decimal("0.99")), ("EUR", "XOF", Decimal("655.957"))])
+	assert matrix.rate("XOF", "XOF") == Decimal("0.99")
+	assert matrix.rate("EUR", "XOF") == Decimal("655.957")
+
+
+def test_derived_pair_does_not_loop_through_source():
+	matrix = RateMatrix.build(
+		["EUR", "USD", "XOF"],
+		[("XOF", "XOF", Decimal("0.99")), ("EUR", "USD", Decimal("1.1")), ("USD", "XOF", Decimal("600"))],
+		max_hops=2,
+	)
+	assert matrix.rate("EUR", "XOF") == Decimal("660.0")
+	assert matrix.path("EUR", "XOF") == ("EUR", "USD", "XOF")
@@ -0,0 +1,41 @@
+"""
+Archive les partitions mensuelles de transactions plus anciennes que la rétention
+(voir src/services/transaction_partitions.py) : une archive CSV gzip par mois, puis la
+partition est supprimée.
+
+Usage (depuis money_transfer/) :
+    python update_script/archive_transactions.py --dry-run
+    python update_script/archive_transactions.py --months 24 --directory /srv/archives/transactions
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Ajoute le dossier racine du projet au sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import settings
+from src.services.transaction_partitions import archive_transaction_partitions, retention_cutoff
+
+
+async def main(months: int, directory: Path, dry_run: bool):
+    cutoff = retention_cutoff(datetime.now(timezone.utc).date(), months)
+    print(f"Archivage des transactions antérieures au {cutoff} dans {directory}")
+    archives = await archive_transaction_partitions(directory, cutoff, dry_run=dry_run)
+    for path in archives:
+        print(f"{path} ({path.stat().st_size / 1024 / 1024:.1f} Mo)")
+    print(f"{len(archives)} partition(s) archivée(s).")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=settings.TRANSACTION_RETENTION_MONTHS, help="mois conservés")
+    parser.add_argument("--directory", type=Path, default=Path(settings.TRANSACTION_ARCHIVE_DIR))
+    parser.add_argument("--dry-run", action="store_true", help="lister les partitions sans rien modifier")
+    args = parser.parse_args()
+    asyncio.run(main(args.months, args.directory, args.dry_run))
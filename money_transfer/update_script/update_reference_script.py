@@ -1,40 +1,69 @@
-import asyncio
-import random
-from sqlalchemy import select, update
-
-from src.db.models import Transaction
-from src.db.session import Session
+"""
+Re-numérote les transactions avec reference_allocator, par lots, sans charger la table.
 
+Facultatif : l'allocateur écarte déjà les références présentes dans transaction_references,
+les anciennes références aléatoires peuvent rester en place. Chaque lot reçoit des
+références neuves, jamais attribuées ; les anciennes sont retirées de
+transaction_references par le trigger de mise à jour.
 
-import sys
+Usage (depuis money_transfer/) :
+    python update_script/update_reference_script.py --batch-size 5000
+    python update_script/update_reference_script.py --after <dernier id affiché>   # reprise
+"""
+import argparse
+import asyncio
 import os
+import sys
+import time
+import uuid
 
 # Ajoute le dossier racine du projet au sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from sqlalchemy import String, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+
+from src.db.models import Transaction
+from src.db.session import Session
+from src.services.reference_allocator import reference_allocator
 
-def generate_numeric_reference():
-    return f"{random.randint(10000000, 99999999)}"
 
-async def update_references():
-    async with Session() as session:
-        # Récupérer toutes les transactions
-        result = await session.execute(select(Transaction))
-        transactions = result.scalars().all()
+async def rekey_batch(session, ids):
+    assigned = dict(zip(ids, await reference_allocator.allocate_many(len(ids))))
+    rows = values(column("id", UUID(as_uuid=True)), column("reference", String), name="rekeyed").data(
+        list(assigned.items())
+    )
+    await session.execute(
+        update(Transaction)
+        .where(Transaction.id == rows.c.id)
+        .values(reference=rows.c.reference)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return len(assigned)
 
-        used_refs = set()
 
-        for tx in transactions:
-            # Génère une référence unique à 8 chiffres
-            new_ref = generate_numeric_reference()
-            while new_ref in used_refs:
-                new_ref = generate_numeric_reference()
+async def update_references(batch_size: int, after: uuid.UUID | None):
+    total = 0
+    start = time.perf_counter()
+    async with Session() as session:
+        while True:
+            stmt = select(Transaction.id).order_by(Transaction.id).limit(batch_size)
+            if after:
+                stmt = stmt.where(Transaction.id > after)
+            ids = (await session.execute(stmt)).scalars().all()
+            if not ids:
+                break
+            after = ids[-1]
+            total += await rekey_batch(session, ids)
+            print(f"{total} références mises à jour ({time.perf_counter() - start:.1f} s), dernier id : {after}")
 
-            used_refs.add(new_ref)
-            tx.reference = new_ref  # mettre à jour l'objet
+    print(f"{total} références mises à jour.")
 
-        await session.commit()
-        print(f"{len(transactions)} références mises à jour.")
 
 if __name__ == "__main__":
-    asyncio.run(update_references())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--after", type=uuid.UUID, default=None, help="reprendre après cet id")
+    args = parser.parse_args()
+    asyncio.run(update_references(args.batch_size, args.after))